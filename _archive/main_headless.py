@@ -1,14 +1,20 @@
 from __future__ import annotations
 
 from datetime import date, datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional
 
+from roombooker.async_engine import AsyncBookingEngine
+from roombooker.availability import AvailabilityCache, to_minutes
 from roombooker.booking_engine import BookingEngine
 from roombooker.calendar_sync import CalendarSync
-from roombooker.config import HARDCODED_ROOMS
+from roombooker.config import BOOKING_WINDOW_DAYS
+from roombooker.http_engine import HttpBookingEngine
 from roombooker.mqtt_notifier import MqttNotifier
+from roombooker.planner import m2t, task_blocks
+from roombooker.prearm import PreArmer, should_prearm, window_opens_at
+from roombooker.room_catalog import RoomCatalog
 from roombooker.server_logger import ServerLogger
-from roombooker.storage import load_accounts, load_jobs, load_rooms, resolve_data_dir
+from roombooker.storage import load_accounts, load_jobs, resolve_data_dir
 
 
 def resolve_job_date(day: str) -> str | None:
@@ -39,28 +45,25 @@ def resolve_job_date(day: str) -> str | None:
     return None
 
 
-def build_tasks(start: str, end: str, resolved_date: str, rooms: Dict[str, str]):
-    tasks: List[Dict[str, object]] = []
+def job_matches_date(day: str, target: date) -> bool:
+    if day == target.strftime("%d.%m.%Y"):
+        return True
+    weekdays = ["Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag", "Samstag", "Sonntag"]
+    return day in weekdays and weekdays.index(day) == target.weekday()
+
+
+def build_tasks(start: str, end: str, resolved_date: str, rooms: Dict[str, str], preferred: Optional[List[str]] = None):
+    # Blockgrenzen an die freien Abschnitte im letzten Scan legen (sonst feste 4h-Blöcke)
     try:
-        fmt = "%H:%M"
-        current = datetime.strptime(start, fmt)
-        target = datetime.strptime(end, fmt)
-        while current < target:
-            next_slot = current + timedelta(hours=4)
-            if next_slot > target:
-                next_slot = target
-            tasks.append(
-                {
-                    "start": current.strftime(fmt),
-                    "end": next_slot.strftime(fmt),
-                    "date": resolved_date,
-                    "all_rooms": rooms,
-                }
-            )
-            current = next_slot
-    except Exception:
+        start_m, end_m = to_minutes(start), to_minutes(end)
+    except ValueError:
         return []
-    return tasks
+    snapshot = AvailabilityCache().get(resolved_date)
+    occupancy = snapshot.for_rooms(preferred) if snapshot is not None and preferred else None
+    return [
+        {"start": m2t(block_start), "end": m2t(block_end), "date": resolved_date, "all_rooms": rooms}
+        for block_start, block_end in task_blocks(start_m, end_m, occupancy)
+    ]
 
 
 def main() -> None:
@@ -78,7 +81,9 @@ def main() -> None:
         logger.log("Keine aktiven Jobs gefunden.")
         return
 
-    rooms = load_rooms() or HARDCODED_ROOMS
+    catalog = RoomCatalog(logger)
+    rooms = catalog.rooms()
+    catalog.refresh_in_background(accounts)
     if not rooms:
         logger.log("Keine Räume gefunden.")
         return
@@ -87,12 +92,34 @@ def main() -> None:
     if "ROOMBOOKER_EVENT_SUMMARY" in __import__("os").environ:
         summary = __import__("os").environ["ROOMBOOKER_EVENT_SUMMARY"]
 
-    engine = BookingEngine(logger)
+    engine_mode = __import__("os").environ.get("ROOMBOOKER_ENGINE", "sync")
+    if engine_mode == "async":
+        max_parallel = int(__import__("os").environ.get("ROOMBOOKER_MAX_PARALLEL", "4"))
+        engine = AsyncBookingEngine(logger, max_concurrency=max_parallel)
+    elif engine_mode == "http":
+        engine = HttpBookingEngine(logger)
+    else:
+        engine = BookingEngine(logger)
     all_successes: List[Dict[str, object]] = []
 
     # 14-Tage-Limit berechnen
     limit_date = date.today() + timedelta(days=14)
 
+    # Pre-Arm: Der Tag direkt hinter dem Fenster wird in wenigen Minuten buchbar
+    prearm_day = date.today() + timedelta(days=BOOKING_WINDOW_DAYS + 1)
+    if should_prearm(prearm_day):
+        prearm_jobs = [job for job in jobs if job_matches_date(job.day, prearm_day)]
+        if prearm_jobs:
+            armer = PreArmer(logger, use_http=engine_mode == "http")
+            try:
+                armed = []
+                for job in prearm_jobs:
+                    tasks = build_tasks(job.start, job.end, prearm_day.strftime("%d.%m.%Y"), rooms, job.rooms)
+                    armed.extend(armer.arm(tasks, accounts, job.rooms, summary))
+                all_successes.extend(armer.fire_at(armed, window_opens_at(prearm_day), False, summary))
+            finally:
+                armer.close()
+
     for job in jobs:
         resolved_date = resolve_job_date(job.day)
         if not resolved_date:
@@ -104,7 +131,7 @@ def main() -> None:
             logger.log(f"INFO: Überspringe {resolved_date} (Limit: {limit_date.strftime('%d.%m.%Y')})")
             continue
 
-        tasks = build_tasks(job.start, job.end, resolved_date, rooms)
+        tasks = build_tasks(job.start, job.end, resolved_date, rooms, job.rooms)
         if not tasks:
             logger.log(f"Job übersprungen (ungültige Zeit): {job.start}-{job.end}")
             continue
@@ -112,6 +139,9 @@ def main() -> None:
         successes = engine.execute_booking(tasks, accounts, job.rooms, simulation_mode=False, summary=summary)
         all_successes.extend(successes)
 
+    # Browser-Pool erst nach allen Jobs schliessen
+    engine.close()
+
     notifier = MqttNotifier(logger)
     if all_successes:
         notifier.send_status("Gebucht", f"{len(all_successes)} Slots")
@@ -4,6 +4,9 @@ import time
 import datetime
 import sys
 from playwright.sync_api import sync_playwright
+import auto_booker
+from roombooker.availability import AvailabilityCache, to_minutes
+from roombooker.planner import task_blocks
 
 # --- SYSTEM LOGGING ---
 def system_log(msg):
@@ -160,16 +163,12 @@ class RoomBot:
         return {}
 
     def run_booking(self, date_str, start, end, targets, accounts, is_sim, ui_log):
-        # Time Splitting
-        tasks = []
+        # Time Splitting: Blockgrenzen an die freien Abschnitte aus dem letzten Scan legen
         fmt = "%H:%M"
-        t_curr = datetime.datetime.strptime(start, fmt)
-        t_end = datetime.datetime.strptime(end, fmt)
-        while t_curr < t_end:
-            t_next = t_curr + datetime.timedelta(hours=4)
-            if t_next > t_end: t_next = t_end
-            tasks.append({"start": t_curr.strftime(fmt), "end": t_next.strftime(fmt)})
-            t_curr = t_next
+        snapshot = AvailabilityCache().get(date_str)
+        blocks = task_blocks(to_minutes(start), to_minutes(end), snapshot.for_rooms(targets) if snapshot else None)
+        tasks = [{"start": auto_booker.m2t(s), "end": auto_booker.m2t(e)} for s, e in blocks]
+        if not tasks: self.log("No room free in this range according to the last scan.", ui_log)
 
         with sync_playwright() as p:
             browser, context = self.get_context(p)
@@ -184,7 +183,8 @@ class RoomBot:
 
                     room_map = self.extract_rooms_multi_method(page, None)
                     success = False
-                    for r_name in targets:
+                    ordered = snapshot.free_first(targets, task['start'], task['end']) if snapshot else targets
+                    for r_name in ordered:
                         if r_name in room_map:
                             rid = room_map[r_name]
                             self.log(f"Trying {r_name}...", ui_log)
@@ -205,7 +205,8 @@ class RoomBot:
                                 try:
                                     page.wait_for_url("**/event**", timeout=5000)
                                     if "/add" not in page.url:
-                                        self.log(f"Success: {r_name}", ui_log); success = True; break
+                                        self.log(f"Success: {r_name}", ui_log); success = True
+                                        AvailabilityCache().invalidate(date_str); break
                                 except: pass
                     
                     if not success: self.log("No rooms available in this block.", ui_log)
@@ -233,6 +234,25 @@ with st.expander("Rooms Database", expanded=not st.session_state.room_cache):
                 status.update(label="Scan Complete", state="complete")
             else: status.update(label="Scan Failed", state="error")
 
+with st.expander("Availability"):
+    avail_day = st.date_input("Day", datetime.datetime.now() + datetime.timedelta(days=1), key="avail_day")
+    avail_str = avail_day.strftime("%d.%m.%Y")
+    cache = AvailabilityCache()
+    if st.button("Refresh Availability", use_container_width=True):
+        cache.invalidate(avail_str)
+        with st.spinner("Scanning calendar..."):
+            try: cache.get_or_scan(avail_str, auto_booker.fetch_calendar)
+            except Exception as e: st.error(f"Scan failed: {e}")
+    snapshot = cache.get(avail_str)
+    if snapshot:
+        st.caption(f"Snapshot {int(snapshot.age())}s old (shared with scheduler)")
+        st.table([
+            {"Room": room, "Booked": ", ".join(f"{auto_booker.m2t(b['start_m'])}-{auto_booker.m2t(b['end_m'])}" for b in sorted(bookings, key=lambda b: b['start_m']))}
+            for room, bookings in sorted(snapshot.rooms.items())
+        ])
+    else:
+        st.info("No current snapshot for this day.")
+
 room_options = st.session_state.room_cache if st.session_state.room_cache else ["Scan required"]
 
 with st.form("main_form"):
@@ -5,49 +5,47 @@ import re
 import os
 from datetime import datetime
 from playwright.sync_api import sync_playwright
+from roombooker.async_engine import AsyncBookingEngine
+from roombooker.availability import AvailabilityCache
+from roombooker.calendar_http import HttpCalendarScanner
+from roombooker.optimizer import PlannedJob, optimize_jobs
+from roombooker.planner import fallback_options, frontier_for, m2t, parse_policy, plan_chain, search_chain
+from roombooker.prearm import PreArmer
+from roombooker.reservation_store import ReservationStore
+from roombooker.room_catalog import RoomCatalog
+from roombooker.resource_blocker import ResourceBlocker
+from roombooker.server_logger import ServerLogger
 from roombooker.storage import load_accounts, resolve_data_dir
 
 # Default Fallback
 KNOWN_ROOMS_ALL = ["A-204", "A-206", "A-231", "A-233", "A-235", "A-237", "A-241", "D-202", "D-204", "D-206", "D-231", "D-233", "D-235", "D-237", "D-239", "D-243"]
 
+PREARM_PLAN_BUDGET_MS = 2000
+
+# Gemeinsamer Belegungs-Cache: mehrere Jobs am selben Tag kosten nur einen Scan
+AVAILABILITY = AvailabilityCache(ServerLogger())
+
 def load_json(path):
     if os.path.exists(path):
         with open(path, "r") as f: return json.load(f)
     return {}
 
-def m2t(mins): return f"{mins // 60:02d}:{mins % 60:02d}"
 def t2m(t_str):
     try: h, m = map(int, t_str.split(":")); return h * 60 + m
     except: return 0
 
-def perform_login(page, email, password):
-    print(f"[LOGIN] {email}...")
-    try:
-        if "login" not in page.url and "wayf" not in page.url:
-            page.goto("https://raumreservation.ub.unibe.ch/event/add")
-        if "wayf" in page.url or "login" in page.url:
-            page.fill("#username", email)
-            page.keyboard.press("Enter")
-            time.sleep(1)
-            page.fill("#password", password)
-            page.keyboard.press("Enter")
-            page.wait_for_load_state("networkidle")
-            time.sleep(3)
-        return True
-    except Exception as e:
-        print(f"[ERROR] Login failed: {e}"); return False
-
-def scan_rooms(date_str, allowed_rooms=None):
+def scrape_calendar(date_str):
+    # Ganzer Tag, alle Räume -> ein Scan reicht für alle Kategorien/Jobs dieses Tages
     d_parts = date_str.split(".")
     iso_date = f"{d_parts[2]}-{d_parts[1]}-{d_parts[0]}"
-    
-    # Filter rooms if category provided
-    target_rooms = allowed_rooms if allowed_rooms else KNOWN_ROOMS_ALL
-    rooms_data = {r: [] for r in target_rooms}
-    
+    rooms_data = {}
+
+    blocker = ResourceBlocker.from_env(ServerLogger())
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+        context = browser.new_context()
+        blocker.attach(context, "calendar")
+        page = context.new_page()
         print(f"[SCAN] Loading calendar for {date_str}...")
         try:
             url = f"https://raumreservation.ub.unibe.ch/event?day={iso_date}"
@@ -61,96 +59,86 @@ def scan_rooms(date_str, allowed_rooms=None):
             except: pass
             
             raw = page.evaluate("""() => Array.from(document.querySelectorAll('rect[data-event-event-value]')).map(el => JSON.parse(el.getAttribute('data-event-event-value')))""")
-            count = 0
             for e in raw:
-                r = e['roomName']
-                if r in rooms_data:
-                    rooms_data[r].append({"start_m": t2m(e['start'].split('T')[1][:5]), "end_m": t2m(e['end'].split('T')[1][:5])})
-                    count += 1
-            print(f"[SCAN] Found {count} bookings in target categories.")
-        except Exception as e: print(f"[ERROR] Scan failed: {e}")
+                rooms_data.setdefault(e['roomName'], []).append({"start_m": t2m(e['start'].split('T')[1][:5]), "end_m": t2m(e['end'].split('T')[1][:5])})
+            print(f"[SCAN] Found {len(raw)} bookings.")
         finally: browser.close()
+    blocker.log_summary()
+    return rooms_data
+
+def fetch_calendar(date_str):
+    # Belegung steckt schon im serverseitigen HTML -> erst ohne Browser, Chromium nur als Fallback
+    try:
+        return HttpCalendarScanner(ServerLogger()).scan_day(date_str)
+    except Exception as e:
+        print(f"[SCAN] HTTP scan failed ({e}), using browser...")
+        return scrape_calendar(date_str)
+
+def scan_rooms(date_str, allowed_rooms=None):
+    # Filter rooms if category provided
+    target_rooms = allowed_rooms if allowed_rooms else KNOWN_ROOMS_ALL
+    try:
+        snapshot = AVAILABILITY.get_or_scan(date_str, fetch_calendar)
+    except Exception as e:
+        # Fehlgeschlagene Scans nicht cachen
+        print(f"[ERROR] Scan failed: {e}")
+        return {r: [] for r in target_rooms}
+    rooms_data = snapshot.for_rooms(target_rooms)
+    print(f"[SCAN] {sum(len(b) for b in rooms_data.values())} bookings in target categories.")
     return rooms_data
 
-def find_best_chain(rooms_data, start, end, accounts, weights):
-    candidates = []
-    for room, bookings in rooms_data.items():
-        sorted_b = sorted(bookings, key=lambda x: x['start_m'])
-        limit = end
-        for b in sorted_b:
-            if b['end_m'] <= start: continue
-            if b['start_m'] <= start: limit = start; break 
-            if b['start_m'] > start: limit = min(limit, b['start_m']); break
-        actual_end = min(limit, start + 240)
-        duration = actual_end - start
-        if duration >= 30: 
-            score = duration * weights.get("totalCoveredMin", 0.01)
-            # No dynamic favorite bonus here, logic is pre-filtered by category
-            candidates.append({"room": room, "start": start, "end": actual_end, "duration": duration, "score": score})
-    candidates.sort(key=lambda x: x['score'], reverse=True)
-    if not candidates: return []
-    best = candidates[0]
-    result_chain = [best]
-    if accounts > 1 and best['end'] < end:
-        remainder = find_best_chain(rooms_data, best['end'], end, accounts - 1, weights)
-        if remainder: result_chain.extend(remainder)
-    return result_chain
-
-def book_chain(chain, accounts_list, date_str):
+def find_best_chain(rooms_data, start, end, accounts, weights, index=None, budget_ms=None):
+    # Exakte DP statt Greedy: bester Plan unter den Gewichten aus weights.json
+    # Mit Zeitbudget: Branch-and-Bound, liefert beim Ablauf die beste bisherige Kette
+    # "policy" in weights.json (z.B. {"policy": "stable", "max_switches": 1}) wählt aus der Pareto-Front
+    warnings = []
+    policy, limits = parse_policy(weights, warnings)
+    for warning in warnings:
+        print(f"[WARN] {warning}")
+    if policy is not None and budget_ms is None:
+        frontier = frontier_for(rooms_data, start, end, accounts, index)
+        print(f"[PLAN] Pareto front: {len(frontier.plans)} plans in {frontier.elapsed_ms:.1f} ms")
+        picked = frontier.pick(policy, **limits)
+        if picked is None:
+            return []
+        print(f"[PLAN] Picked {picked.covered_min} min, {picked.switches} switches, {picked.accounts} accounts")
+        return list(picked.chain)
+    if budget_ms is None:
+        plan = plan_chain(rooms_data, start, end, accounts, weights, index)
+    else:
+        plan = search_chain(rooms_data, start, end, accounts, budget_ms, weights, index)
+    print(f"[PLAN] Score {plan.score:.2f}, {plan.covered_min} min covered, "
+          f"{plan.states} states in {plan.elapsed_ms:.1f} ms{'' if plan.complete else ' (budget hit)'}")
+    return plan.chain
+
+def book_chain(chain, accounts_list, date_str, simulation=None, rooms_data=None, target_rooms=None):
+    # Alle Blöcke gleichzeitig über die Async-Engine, Logins nur wenn der Session-Cache nicht reicht
+    if simulation is None:
+        simulation = os.environ.get("ROOMBOOKER_SIMULATION", "1") != "0"
+    if len(chain) > len(accounts_list):
+        print(f"[WARN] Not enough accounts for {len(chain) - len(accounts_list)} step(s)")
+        chain = chain[:len(accounts_list)]
+    room_ids = RoomCatalog(ServerLogger()).resolve({step['room'] for step in chain} | set(target_rooms or []))
+    tasks = [
+        {"date": date_str, "start": m2t(step['start']), "end": m2t(step['end']),
+         "all_rooms": room_ids, "rooms": [step['room']]}
+        for step in chain
+    ]
+    if rooms_data is not None:
+        # Ausweichketten aus demselben Scan: geplanter Raum zuerst, dann Alternativen und Aufteilungen
+        rooms = [r for r in (target_rooms or rooms_data) if r in room_ids]
+        for task, options in zip(tasks, fallback_options(rooms_data, chain, rooms)):
+            task["fallbacks"] = [
+                [{"room": part["room"], "start": m2t(part["start"]), "end": m2t(part["end"])} for part in option]
+                for option in options
+            ]
     print("\n--- STARTING BOOKING ---")
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        for i, step in enumerate(chain):
-            if i >= len(accounts_list):
-                print(f"[WARN] Not enough accounts for step {i+1}"); break
-            acc = accounts_list[i]
-            room = step['room']
-            start_t = m2t(step['start'])
-            end_t = m2t(step['end'])
-            print(f"[BOOK] {start_t}-{end_t} in {room} using {acc.email}...")
-            
-            context = browser.new_context()
-            page = context.new_page()
-            try:
-                if perform_login(page, acc.email, acc.password):
-                    page.goto("https://raumreservation.ub.unibe.ch/event/add")
-                    try: page.wait_for_selector("#event_room", timeout=10000)
-                    except: print("[ERROR] Dropdown not found"); continue
-
-                    found = page.evaluate(f"""(rName) => {{
-                        const sel = document.querySelector('#event_room');
-                        if(!sel) return false;
-                        for(let i=0; i<sel.options.length; i++) {{
-                            if(sel.options[i].innerText.includes(rName)) {{
-                                sel.selectedIndex = i; sel.dispatchEvent(new Event('change')); return true;
-                            }}
-                        }}
-                        return false;
-                    }}""", room)
-                    
-                    if not found:
-                        print(f"[ERROR] Room {room} not in list!"); continue
-                    
-                    time.sleep(1)
-                    page.fill("#event_startDate", f"{date_str} {start_t}")
-                    page.keyboard.press("Enter")
-                    time.sleep(1)
-                    dur_min = step['end'] - step['start']
-                    page.fill("#event_duration", str(dur_min))
-                    page.keyboard.press("Enter")
-                    page.fill("#event_title", "Lernen")
-                    try: page.check('input[name="event[purpose]"][value="Other"]') 
-                    except: pass
-                    
-                    # SIMULATION
-                    # page.click("#event_submit")
-                    print(f"[SUCCESS] Booked {room} ({dur_min} min) ✅ (Simulated)")
-            except Exception as e:
-                print(f"[ERROR] Booking failed: {e}")
-            finally: context.close()
-        browser.close()
+    engine = AsyncBookingEngine(ServerLogger(), max_concurrency=int(os.environ.get("ROOMBOOKER_MAX_PARALLEL", "4")))
+    successes = engine.execute_booking(tasks, accounts_list[:len(chain)], [], simulation)
+    print(f"[BOOK] {len(successes)} slot(s) booked for {len(chain)} blocks{' (simulated)' if simulation else ''}.")
+    return successes
 
-def execute_job(date_str, start_time, end_time, category_key, num_accounts):
+def resolve_job_inputs(category_key, num_accounts):
     data_dir = resolve_data_dir()
     categories = load_json("categories.json")
     weights = load_json("weights.json") 
@@ -166,6 +154,10 @@ def execute_job(date_str, start_time, end_time, category_key, num_accounts):
     else:
         try: count = int(num_accounts); use_accs = accs[:count]
         except: use_accs = accs
+    return target_rooms, use_accs, weights
+
+def execute_job(date_str, start_time, end_time, category_key, num_accounts):
+    target_rooms, use_accs, weights = resolve_job_inputs(category_key, num_accounts)
 
     print(f"--- EXEC: {date_str} [{category_key.upper()}] ---")
     
@@ -174,12 +166,107 @@ def execute_job(date_str, start_time, end_time, category_key, num_accounts):
     
     if chain:
         print(f"[PLAN] Strategy found ({len(chain)} blocks)")
-        book_chain(chain, use_accs, date_arg=date_str)
-        return True
+        return bool(book_chain(chain, use_accs, date_str, rooms_data=rooms_data, target_rooms=target_rooms))
     else:
         print("[RESULT] No valid chain found.")
         return False
 
+def execute_jobs(jobs):
+    # Alle fälligen Jobs gemeinsam planen: Accounts und Räume werden über Jobs hinweg nicht doppelt vergeben
+    all_accs = load_accounts(resolve_data_dir() / "settings.json")
+    by_email = {acc.email: acc for acc in all_accs}
+    planned, targets = [], {}
+    for job in jobs:
+        target_rooms, use_accs, weights = resolve_job_inputs(job["category"], job["accounts"])
+        targets[job["id"]] = target_rooms
+        planned.append(PlannedJob(
+            job["id"], job["date"], t2m(job["time_start"]), t2m(job["time_end"]),
+            scan_rooms(job["date"], target_rooms), len(use_accs), weights, [acc.email for acc in use_accs],
+        ))
+    with ReservationStore() as store:
+        plan = optimize_jobs(planned, all_accs, reservations=store.iter_reservations(status="active"))
+    for warning in plan.warnings:
+        print(f"[WARN] {warning}")
+    print(f"[PLAN] Global: {plan.covered_min} min over {len(jobs)} jobs")
+
+    results = {}
+    for job in planned:
+        chain = plan.steps.get(job.job_id, [])
+        for step in plan.dropped.get(job.job_id, []):
+            print(f"[WARN] {job.job_id}: {m2t(step['start'])}-{m2t(step['end'])} {step['room']} has no account left today")
+        if not chain:
+            print(f"[RESULT] {job.job_id}: No valid chain found.")
+            results[job.job_id] = False
+            continue
+        print(f"--- EXEC: {job.date} [{job.job_id}] ({len(chain)} blocks) ---")
+        results[job.job_id] = bool(book_chain(
+            chain, [by_email[step['account']] for step in chain], job.date,
+            rooms_data=job.rooms_data, target_rooms=targets[job.job_id],
+        ))
+    return results
+
+def prearm_jobs(jobs, simulation=True):
+    # Jobs mit gleichem Öffnungszeitpunkt: erst alle armen, dann gemeinsam auf eine Deadline feuern
+    all_accs = load_accounts(resolve_data_dir() / "settings.json")
+    by_email = {acc.email: acc for acc in all_accs}
+    catalog = RoomCatalog(ServerLogger())
+    results = {job["id"]: False for job in jobs}
+    groups = {}
+    for job in jobs:
+        groups.setdefault(job["opens_at"], []).append(job)
+
+    for opens_at, group in sorted(groups.items()):
+        print(f"--- PREARM: {len(group)} job(s), opens {opens_at.strftime('%d.%m.%Y %H:%M:%S')} ---")
+        # Kalender ist schon sichtbar, nur noch nicht buchbar -> Plan vorab berechnen
+        planned, targets = [], {}
+        for job in group:
+            target_rooms, use_accs, weights = resolve_job_inputs(job["category"], job["accounts"])
+            targets[job["id"]] = target_rooms
+            planned.append(PlannedJob(
+                job["id"], job["date"], t2m(job["time_start"]), t2m(job["time_end"]),
+                scan_rooms(job["date"], target_rooms), len(use_accs), weights, [acc.email for acc in use_accs],
+            ))
+        # Höchstens ein Zehntel der Restzeit planen, damit Login und Formulare noch vor der Öffnung fertig sind
+        budget_ms = min(PREARM_PLAN_BUDGET_MS, max(0.0, (opens_at - datetime.now()).total_seconds() * 100))
+        with ReservationStore() as store:
+            plan = optimize_jobs(planned, all_accs, reservations=store.iter_reservations(status="active"),
+                                 budget_ms=budget_ms)
+
+        armer = PreArmer(ServerLogger(), use_http=True)
+        try:
+            # Serveruhr parallel zu Logins/Formularen abgleichen, nicht erst danach
+            armer.calibrate_clock(opens_at)
+            armed = []
+            for job in planned:
+                chain = plan.steps.get(job.job_id, [])
+                target_rooms = targets[job.job_id]
+                room_ids = catalog.resolve(target_rooms)
+                if not chain or not room_ids:
+                    print(f"[RESULT] {job.job_id}: No valid chain or room IDs."); continue
+                # Ausweichketten aus demselben Scan: bei "belegt" direkt zur nächsten gültigen Alternative
+                tree = fallback_options(job.rooms_data, chain, [r for r in target_rooms if r in room_ids])
+                for step, options in zip(chain, tree):
+                    task = {"start": m2t(step['start']), "end": m2t(step['end']), "date": job.date, "all_rooms": room_ids}
+                    task["fallbacks"] = [
+                        [{"room": part["room"], "start": m2t(part["start"]), "end": m2t(part["end"])} for part in option]
+                        for option in options
+                    ]
+                    # Geplanter Raum zuerst, Rest der Kategorie als Ausweichliste
+                    preferred = [step['room']] + [r for r in target_rooms if r != step['room']]
+                    armed.extend(armer.arm([task], [by_email[step['account']]], preferred))
+            successes = armer.fire_at(armed, opens_at, simulation)
+        finally:
+            armer.close()
+
+        for slot in successes:
+            start_m = slot["start"].hour * 60 + slot["start"].minute
+            owner = next((job for job in planned if job.date == slot["start"].strftime("%d.%m.%Y")
+                          and job.start_m <= start_m < job.end_m), None)
+            if owner is not None:
+                results[owner.job_id] = True
+        print(f"[PREARM] {len(successes)}/{len(armed)} blocks booked.")
+    return results
+
 # Minimal wrapper for direct calls if needed
 if __name__ == "__main__":
     if len(sys.argv) > 4:
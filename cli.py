@@ -3,6 +3,15 @@ import os
 import json
 import job_manager
 import auto_booker
+from roombooker.availability import AvailabilityCache
+from roombooker.calendar_http import HttpCalendarScanner
+from roombooker.calendar_scanner import CalendarScanner, bookable_days
+from roombooker.config import session_file_for
+from roombooker.live_feed import LiveAvailabilityFeed
+from roombooker.prearm import should_prearm, window_opens_at
+from roombooker.room_catalog import RoomCatalog
+from roombooker.server_logger import ServerLogger
+from roombooker.watcher import CancellationWatcher, WatchTarget
 from datetime import datetime, timedelta
 
 def load_categories():
@@ -83,13 +92,37 @@ def parse_oneliner(cmd_str):
     print(f"[SUCCESS] Job created! ID: {job_id}")
     print(f"Target: {date_str} | Repetition: {rep_type} (Int: {interval})")
 
+def prescan_days(dates):
+    # Alle Job-Tage vorab scannen (HTTP, Rest in einem Browser-Lauf), die Jobs lesen danach aus dem Cache
+    cache = AvailabilityCache()
+    window = set(bookable_days())
+    days = sorted({d for d in dates if d in window and cache.get(d.strftime("%d.%m.%Y")) is None})
+    http = HttpCalendarScanner(ServerLogger())
+    for d in list(days):
+        try:
+            cache.get_or_scan(d.strftime("%d.%m.%Y"), http.scan_day)
+            days.remove(d)
+        except Exception as e:
+            print(f"[WARN] HTTP scan {d} failed: {e}")
+            break
+    if not days:
+        return
+    try:
+        CalendarScanner(ServerLogger(), pages=int(os.environ.get("ROOMBOOKER_SCAN_PAGES", "4"))).scan(days)
+    except Exception as e:
+        print(f"[WARN] Bulk scan failed ({e}), falling back to per-job scans.")
+
 def run_scheduler():
     print("[SCHEDULER] Running check...")
     job_manager.cleanup_old_history()
     
     jobs = job_manager.list_jobs(active_only=True)
     today = datetime.now()
+    prescan_days([
+        d.date() for d in (calculate_next_date(j["target_date_str"]) for j in jobs if j["status"] != "disabled") if d
+    ])
     
+    due, prearm_due = [], []
     for job in jobs:
         if job["status"] == "disabled": continue
         
@@ -102,6 +135,16 @@ def run_scheduler():
         
         target_run_date = base_date
         
+        # Pre-Arm: Fenster öffnet in wenigen Minuten -> einloggen, Formulare vorbereiten, pünktlich absenden
+        if should_prearm(target_run_date.date(), job["time_start"]):
+            print(f"[PREARM] Job {job['id']} window opens soon. Arming.")
+            prearm_due.append(dict(
+                job,
+                date=target_run_date.strftime("%d.%m.%Y"),
+                opens_at=window_opens_at(target_run_date.date(), job["time_start"]),
+            ))
+            continue
+        
         # 14 Day Logic
         delta = (target_run_date - today).days
         
@@ -119,19 +162,76 @@ def run_scheduler():
             print(f"[SKIP] Job {job['id']} is {delta} days away. Waiting.")
             
         if should_run:
-            success = auto_booker.execute_job(
-                target_run_date.strftime("%d.%m.%Y"),
-                job["time_start"],
-                job["time_end"],
-                job["category"],
-                job["accounts"]
-            )
-            
-            if success:
-                if job["repetition"] == "once":
-                    job_manager.archive_job(job["id"], "success")
-                else:
-                    job_manager.update_recurring_run(job["id"])
+            due.append(dict(job, date=target_run_date.strftime("%d.%m.%Y")))
+
+    results = {}
+    if prearm_due:
+        # Zeitkritisch zuerst: alle Pre-Arm-Jobs gemeinsam armen und feuern
+        results.update(auto_booker.prearm_jobs(
+            prearm_due, simulation=os.environ.get("ROOMBOOKER_SIMULATION", "1") != "0"
+        ))
+    if due:
+        results.update(auto_booker.execute_jobs(due))
+    for job in due + prearm_due:
+        if results.get(job["id"]):
+            if job["repetition"] == "once":
+                job_manager.archive_job(job["id"], "success")
+            else:
+                job_manager.update_recurring_run(job["id"])
+
+def watch_targets():
+    # Aktive Jobs, deren Zieltag schon im Buchungsfenster liegt
+    window = set(bookable_days())
+    catalog = RoomCatalog()
+    targets = []
+    for job in job_manager.list_jobs(active_only=True):
+        if job["status"] == "disabled": continue
+        target_dt = calculate_next_date(job["target_date_str"])
+        if not target_dt or target_dt.date() not in window: continue
+        rooms, accs, _ = auto_booker.resolve_job_inputs(job["category"], job["accounts"])
+        if not accs: continue
+        targets.append(WatchTarget(
+            job_id=job["id"],
+            date=target_dt.strftime("%d.%m.%Y"),
+            start_m=auto_booker.t2m(job["time_start"]),
+            end_m=auto_booker.t2m(job["time_end"]),
+            rooms=rooms,
+            room_ids=catalog.resolve(rooms),
+            accounts=accs,
+        ))
+    return targets
+
+def on_watch_booked(job_id, successes):
+    print(f"[WATCH] Job {job_id}: {len(successes)} block(s) booked.")
+    job = next((j for j in job_manager.list_jobs() if j["id"] == job_id), None)
+    if job and job["repetition"] == "once":
+        job_manager.archive_job(job_id, "success")
+    elif job:
+        job_manager.update_recurring_run(job_id)
+
+def run_watcher():
+    watcher = CancellationWatcher(
+        ServerLogger(), simulation_mode=os.environ.get("ROOMBOOKER_SIMULATION", "1") != "0"
+    )
+    try:
+        watcher.run(watch_targets, on_booked=on_watch_booked)
+    except KeyboardInterrupt:
+        print("[WATCH] Stopped.")
+
+def run_live_feed():
+    targets = watch_targets()
+    if not targets:
+        print("[LIVE] No jobs inside the booking window."); return
+    logger = ServerLogger()
+    watcher = CancellationWatcher(logger, simulation_mode=os.environ.get("ROOMBOOKER_SIMULATION", "1") != "0")
+    feed = LiveAvailabilityFeed(
+        logger,
+        watcher,
+        refresh_ms=int(os.environ.get("ROOMBOOKER_LIVE_REFRESH_MS", "2000")),
+        session_path=session_file_for(targets[0].accounts[0].email),
+        on_booked=on_watch_booked,
+    )
+    feed.run(targets)
 
 def show_wizard():
     cats = load_categories()
@@ -146,6 +246,8 @@ def show_wizard():
     print("  disable ID    -> Pause a job")
     print("  enable ID     -> Resume a job")
     print("  run           -> Force scheduler run (Check 14 days)")
+    print("  watch         -> Watch for cancellations and book freed slots")
+    print("  live          -> Like watch, but push-based via open calendar tabs")
     
     cmd = input("\nCommand: ")
     parts = cmd.split(" ")
@@ -164,11 +266,18 @@ def show_wizard():
         print("Job enabled.")
     elif action == "run":
         run_scheduler()
+    elif action == "watch":
+        run_watcher()
+    elif action == "live":
+        run_live_feed()
 
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         # Direct arguments handling
         if sys.argv[1] == "schedule": run_scheduler()
+        elif sys.argv[1] == "scan": prescan_days(bookable_days())
+        elif sys.argv[1] == "watch": run_watcher()
+        elif sys.argv[1] == "live": run_live_feed()
         elif sys.argv[1] == "book": parse_oneliner(sys.argv[2])
         else: show_wizard()
     else:
@@ -0,0 +1,348 @@
+import asyncio
+import random
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from playwright.async_api import async_playwright
+
+from roombooker.availability import AvailabilityCache
+from roombooker.browser_pool import CONTEXT_ARGS, LAUNCH_ARGS
+from roombooker.config import URLS, session_file_for
+from roombooker.models import Account
+from roombooker.pacing import (
+    LOGIN_DONE_SELECTOR,
+    LOGIN_FORM_SELECTOR,
+    PENDING_REQUESTS_SCRIPT,
+    SETTLED_JS,
+    Pacer,
+)
+from roombooker.resource_blocker import ResourceBlocker
+from roombooker.session_manager import SessionManager
+from roombooker.storage import load_accounts
+from roombooker.utils import slot_from_task
+
+# Zeit (Whitespace zusammengefasst), Titel, Ort, Raum pro Zeile; null wenn keine Tabelle da ist
+RESERVATION_ROWS_JS = """() => {
+    const table = document.querySelector('table.table');
+    if (!table) return null;
+    return Array.from(table.querySelectorAll('tbody tr'))
+        .map(tr => Array.from(tr.cells).slice(0, 4).map(td => td.innerText))
+        .filter(cells => cells.length >= 4)
+        .map(([time, title, location, room]) => [
+            time.split(/\\s+/).filter(Boolean).join(' '), title.trim(), location.trim(), room.trim(),
+        ]);
+}"""
+
+
+class AsyncBookingEngine:
+    """Bucht alle Blöcke gleichzeitig: ein Browser, ein Context pro Account, max. N parallel."""
+
+    def __init__(self, logger, max_concurrency: int = 4, pacer: Optional[Pacer] = None) -> None:
+        self.logger = logger
+        self.max_concurrency = max(1, max_concurrency)
+        self.pacer = pacer or Pacer.from_env()
+        self.blocker = ResourceBlocker.from_env(logger)
+        self.availability = AvailabilityCache(logger)
+        self.sessions = SessionManager(logger)
+        self._contexts: Dict[str, object] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def _jitter(self) -> None:
+        profile = self.pacer.profile
+        if profile.jitter_max > 0:
+            await asyncio.sleep(random.uniform(profile.jitter_min, profile.jitter_max))
+
+    async def _settle(self, page) -> None:
+        try:
+            await page.wait_for_function(SETTLED_JS, timeout=self.pacer.timeout_ms)
+        except Exception:
+            pass
+        await self._jitter()
+
+    async def _get_context(self, browser, email: str):
+        context = self._contexts.get(email)
+        if context is not None:
+            return context
+        args = dict(CONTEXT_ARGS)
+        session_file = session_file_for(email)
+        if session_file.exists():
+            args["storage_state"] = str(session_file)
+        context = await browser.new_context(**args)
+        await context.add_init_script(PENDING_REQUESTS_SCRIPT)
+        await self.blocker.attach_async(context, "login")
+        self._contexts[email] = context
+        return context
+
+    async def perform_login(self, page, email: str, password: str) -> bool:
+        try:
+            if "/event/add" not in page.url:
+                await page.goto(URLS["event_add"], wait_until="domcontentloaded")
+
+            if "/select" in page.url:
+                try:
+                    await page.click(f"a[href*='{URLS['vonroll_location_path']}']")
+                    await page.wait_for_url(lambda u: "/select" not in u, wait_until="domcontentloaded")
+                except Exception as exc:
+                    self.logger.log(f"Warnung Standortwahl (versuche Fortfahren): {exc}")
+
+            if "login" not in page.url and "wayf" not in page.url and "eduid" not in page.url:
+                if await page.locator(LOGIN_DONE_SELECTOR).is_visible():
+                    return True
+                trigger = page.locator(".timeline-cell-clickable").first
+                if await trigger.count() > 0:
+                    await trigger.click()
+                else:
+                    await page.mouse.click(800, 450)
+                try:
+                    await page.wait_for_selector(
+                        f"{LOGIN_FORM_SELECTOR}, {LOGIN_DONE_SELECTOR}", state="visible", timeout=self.pacer.timeout_ms
+                    )
+                except Exception:
+                    pass
+
+            if await page.locator(LOGIN_FORM_SELECTOR).is_visible() or "eduid" in page.url:
+                self.logger.log(f"Führe Login durch für {email}...")
+                await page.fill(LOGIN_FORM_SELECTOR, email)
+                if await page.locator("button[name='_eventId_submit']").is_visible():
+                    await page.click("button[name='_eventId_submit']")
+                else:
+                    await page.keyboard.press("Enter")
+                await page.wait_for_selector("#password", timeout=5000)
+                await page.fill("#password", password)
+                if await page.locator("button[name='_eventId_proceed']").is_visible():
+                    await page.click("button[name='_eventId_proceed']")
+                else:
+                    await page.keyboard.press("Enter")
+                await page.wait_for_url(
+                    lambda u: u.startswith(URLS["room_base"]),
+                    wait_until="domcontentloaded",
+                    timeout=self.pacer.timeout_ms * 2,
+                )
+
+            if await page.locator(LOGIN_DONE_SELECTOR).count() > 0 or "/event/add" in page.url:
+                return True
+            return False
+        except Exception as exc:
+            self.logger.log(f"Fehler in perform_login ({email}): {exc}")
+            return False
+
+    async def _ensure_login(self, page, acc: Account) -> bool:
+        # Gültige Session laut Cache/Probe -> kein SSO-Login (Probe ist blockierendes HTTP)
+        if not await asyncio.to_thread(self.sessions.needs_login, acc.email):
+            await page.goto(URLS["event_add"], wait_until="domcontentloaded")
+            if await page.locator(LOGIN_DONE_SELECTOR).count() > 0:
+                return True
+            self.sessions.invalidate(acc.email)
+        if not await self.perform_login(page, acc.email, acc.password):
+            return False
+        await page.context.storage_state(path=str(session_file_for(acc.email)))
+        self.sessions.mark_verified(acc.email)
+        return True
+
+    async def _try_room(self, page, task, room_name: str, room_id: str, simulation_mode: bool, summary: str) -> bool:
+        await page.goto(URLS["event_add"], wait_until="domcontentloaded")
+        await page.evaluate(
+            "v => { var s=document.getElementById('event_room'); "
+            "s.value=v; s.dispatchEvent(new Event('change')); }",
+            room_id,
+        )
+        await self._settle(page)
+
+        await page.fill("#event_startDate", f"{task['date']} {task['start']}")
+        await page.keyboard.press("Enter")
+        await self._settle(page)
+
+        t1 = datetime.strptime(task["start"], "%H:%M")
+        t2 = datetime.strptime(task["end"], "%H:%M")
+        dur = int((t2 - t1).total_seconds() / 60)
+        await page.evaluate(
+            "d => { var s=document.getElementById('event_duration'); "
+            "s.value=d; s.dispatchEvent(new Event('change', {bubbles: true})); }",
+            str(dur),
+        )
+        await self._settle(page)
+
+        await page.fill("#event_title", summary)
+        if await page.is_visible('input[name="event[purpose]"][value="Other"]'):
+            await page.check('input[name="event[purpose]"][value="Other"]')
+
+        if simulation_mode:
+            self.logger.log(f"SIMULATION OK: {task['start']}-{task['end']} ({room_name})")
+            return True
+
+        await page.click("#event_submit")
+        try:
+            await page.wait_for_url(lambda u: "/event/add" not in u, timeout=5000)
+            return True
+        except Exception:
+            content = (await page.content()).lower()
+            if "konflikt" in content or "belegt" in content:
+                self.logger.log(f"Raum {room_name} ist belegt.")
+                return False
+            return "/event/add" not in page.url
+
+    @staticmethod
+    def _block_options(task: Dict[str, object], preferred_rooms: List[str]) -> List[List[Dict[str, object]]]:
+        """Vorberechneter Fallback-Baum des Blocks, sonst eigener Raum bzw. Wunschliste als Einzelalternativen."""
+        options = task.get("fallbacks") or [
+            [{"room": room, "start": task["start"], "end": task["end"]}]
+            for room in task.get("rooms") or preferred_rooms
+        ]
+        return [option for option in options if all(task["all_rooms"].get(part["room"]) for part in option)]
+
+    async def _book_block(
+        self,
+        browser,
+        semaphore: asyncio.Semaphore,
+        task: Dict[str, object],
+        acc: Account,
+        preferred_rooms: List[str],
+        simulation_mode: bool,
+        summary: str,
+    ) -> List[Dict[str, object]]:
+        # Gleicher Account -> nacheinander (eine Session-Datei, ein Context)
+        lock = self._locks.setdefault(acc.email, asyncio.Lock())
+        successes: List[Dict[str, object]] = []
+        # Bis hierhin ist der Block gebucht; fehlgeschlagene (Raum, Start, Ende) schließen Alternativen aus
+        cursor = task["start"]
+        dead: List[Tuple[str, str, str]] = []
+        async with lock, semaphore:
+            self.logger.log(f"Block {task['start']}-{task['end']} mit {acc.email}")
+            page = None
+            try:
+                context = await self._get_context(browser, acc.email)
+                page = await context.new_page()
+                self.blocker.set_flow(context, "login")
+                if not await self._ensure_login(page, acc):
+                    self.logger.log(f"Login fehlgeschlagen: {acc.email}")
+                    return successes
+                self.blocker.set_flow(context, "form")
+
+                for option in self._block_options(task, preferred_rooms):
+                    parts = [dict(part, start=max(part["start"], cursor)) for part in option if part["end"] > cursor]
+                    if any(
+                        room == part["room"] and start < part["end"] and part["start"] < end
+                        for part in parts
+                        for room, start, end in dead
+                    ):
+                        continue
+                    for part in parts:
+                        part_task = dict(task, start=part["start"], end=part["end"])
+                        room_id = task["all_rooms"][part["room"]]
+                        if not await self._try_room(page, part_task, part["room"], room_id, simulation_mode, summary):
+                            dead.append((part["room"], part["start"], part["end"]))
+                            break
+                        self.logger.log(f"ERFOLG: {part['room']} gebucht ({part['start']}-{part['end']})!")
+                        successes.append(slot_from_task(part_task, part["room"]))
+                        cursor = part["end"]
+                    if cursor >= task["end"]:
+                        return successes
+            except Exception as exc:
+                self.logger.log(f"Fehler bei Buchungsvorgang ({acc.email}): {exc}")
+            finally:
+                if page is not None:
+                    await page.close()
+
+        self.logger.log(f"FEHLER: Block {cursor}-{task['end']} konnte nicht gebucht werden.")
+        return successes
+
+    async def execute_booking_async(
+        self,
+        tasks: List[Dict[str, object]],
+        accounts: List[Account],
+        preferred_rooms: List[str],
+        simulation_mode: bool,
+        summary: str = "Lernen",
+    ) -> List[Dict[str, object]]:
+        if not tasks or not accounts:
+            return []
+        self.logger.log(f"--- START: ASYNC BUCHUNG ({len(tasks)} Blöcke, max. {self.max_concurrency} parallel) ---")
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True, slow_mo=self.pacer.profile.slow_mo, args=LAUNCH_ARGS)
+            try:
+                results = await asyncio.gather(
+                    *(
+                        self._book_block(
+                            browser,
+                            semaphore,
+                            task,
+                            accounts[idx % len(accounts)],
+                            preferred_rooms,
+                            simulation_mode,
+                            summary,
+                        )
+                        for idx, task in enumerate(tasks)
+                    )
+                )
+            finally:
+                self._contexts.clear()
+                self._locks.clear()
+                await browser.close()
+        successes = [slot for slots in results for slot in slots]
+        if not simulation_mode:
+            self.availability.invalidate_slots(successes)
+        self.blocker.log_summary()
+        self.blocker.reset()
+        self.logger.log("--- PROZESS ENDE ---")
+        return successes
+
+    async def _fetch_rows(self, browser, semaphore: asyncio.Semaphore, acc: Account) -> Optional[List[List[str]]]:
+        async with semaphore:
+            self.logger.log(f"Hole Reservationen für: {acc.email}")
+            page = None
+            try:
+                context = await self._get_context(browser, acc.email)
+                page = await context.new_page()
+                self.blocker.set_flow(context, "login")
+                if not await self._ensure_login(page, acc):
+                    self.logger.log(f"-> Login fehlgeschlagen für {acc.email}")
+                    return None
+                self.blocker.set_flow(context, "form")
+                await page.goto(URLS["reservations"], wait_until="domcontentloaded")
+                return await page.evaluate(RESERVATION_ROWS_JS)
+            except Exception as exc:
+                self.logger.log(f"Fehler beim Abruf ({acc.email}): {exc}")
+                return None
+            finally:
+                if page is not None:
+                    await page.close()
+
+    async def fetch_reservations_async(
+        self, accounts: List[Account], headless: bool = True
+    ) -> Dict[str, Optional[List[List[str]]]]:
+        """Zeilen der Reservationsliste pro Account; None = Login/Tabelle fehlgeschlagen."""
+        if not accounts:
+            return {}
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=headless, slow_mo=self.pacer.profile.slow_mo, args=LAUNCH_ARGS)
+            try:
+                results = await asyncio.gather(*(self._fetch_rows(browser, semaphore, acc) for acc in accounts))
+            finally:
+                self._contexts.clear()
+                await browser.close()
+        self.blocker.log_summary()
+        self.blocker.reset()
+        return {acc.email: rows for acc, rows in zip(accounts, results)}
+
+    def fetch_reservations(self, accounts: List[Account], headless: bool = True) -> Dict[str, Optional[List[List[str]]]]:
+        return asyncio.run(self.fetch_reservations_async(accounts, headless))
+
+    def close(self) -> None:
+        # Browser lebt nur innerhalb von execute_booking_async
+        pass
+
+    def execute_booking(
+        self,
+        tasks: List[Dict[str, object]],
+        accounts: Optional[List[Account]] = None,
+        preferred_rooms: Optional[List[str]] = None,
+        simulation_mode: bool = True,
+        summary: str = "Lernen",
+    ) -> List[Dict[str, object]]:
+        if accounts is None:
+            accounts = [acc for acc in load_accounts() if acc.active and acc.email]
+        return asyncio.run(
+            self.execute_booking_async(tasks, accounts, preferred_rooms or [], simulation_mode, summary)
+        )
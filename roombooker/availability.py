@@ -0,0 +1,159 @@
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from roombooker.config import AVAILABILITY_CACHE_FILE, URLS
+
+AVAILABILITY_TTL_S = int(os.environ.get("ROOMBOOKER_AVAILABILITY_TTL_S", "300"))
+DEFAULT_LOCATION = URLS["vonroll_location_path"].rstrip("/").rsplit("/", 1)[-1]
+
+# {Raumname: [{"start_m": 480, "end_m": 600}, ...]} - dieselbe Struktur wie find_best_chain sie erwartet
+Occupancy = Dict[str, List[Dict[str, int]]]
+
+
+def to_minutes(hhmm: str) -> int:
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def room_matches(short: str, name: str) -> bool:
+    """Kürzel ("D-204") als ganzes Wort im vollen Namen - "D-20" trifft also nicht "D-204"."""
+    if short == name:
+        return True
+    return re.search(rf"(?<![\w-]){re.escape(short)}(?![\w-])", name) is not None
+
+
+def cache_key(date_str: str, location: str = DEFAULT_LOCATION) -> str:
+    return f"{date_str}@{location}"
+
+
+@dataclass
+class AvailabilitySnapshot:
+    date: str
+    location: str = DEFAULT_LOCATION
+    fetched_at: float = 0.0
+    rooms: Occupancy = field(default_factory=dict)
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (now or time.time()) - self.fetched_at
+
+    def bookings_for(self, room: str) -> List[Dict[str, int]]:
+        # Kalender nutzt Kürzel ("D-204"), rooms.json den vollen Namen
+        if room in self.rooms:
+            return self.rooms[room]
+        for short, bookings in self.rooms.items():
+            if room_matches(short, room):
+                return bookings
+        return []
+
+    def for_rooms(self, names: Iterable[str]) -> Occupancy:
+        # Räume ohne Eintrag haben an dem Tag keine Buchung
+        return {name: list(self.bookings_for(name)) for name in names}
+
+    def is_free(self, room: str, start_m: int, end_m: int) -> bool:
+        return all(b["end_m"] <= start_m or b["start_m"] >= end_m for b in self.bookings_for(room))
+
+    def free_first(self, rooms: List[str], start: str, end: str) -> List[str]:
+        start_m, end_m = to_minutes(start), to_minutes(end)
+        return sorted(rooms, key=lambda name: not self.is_free(name, start_m, end_m))
+
+
+class AvailabilityCache:
+    """Belegungs-Snapshots pro (Datum, Standort), gemeinsam für Planer, Engines und UI.
+
+    Die Datei dient als Austausch zwischen Prozessen (Scheduler, Streamlit), der Lock pro
+    Schlüssel verhindert, dass parallele Jobs im selben Prozess denselben Tag doppelt scannen.
+    """
+
+    _key_locks: Dict[str, threading.Lock] = {}
+    _guard = threading.Lock()
+
+    def __init__(self, logger=None, ttl_s: float = AVAILABILITY_TTL_S, path: Path = AVAILABILITY_CACHE_FILE) -> None:
+        self.logger = logger
+        self.ttl_s = ttl_s
+        self.path = path
+        self.hits = 0
+        self.scans = 0
+
+    def _log(self, message: str) -> None:
+        if self.logger is not None:
+            self.logger.log(message)
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._guard:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _load(self) -> Dict[str, Dict[str, object]]:
+        if not self.path.exists():
+            return {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            return data if isinstance(data, dict) else {}
+        except (json.JSONDecodeError, OSError):
+            return {}
+
+    def _save(self, data: Dict[str, Dict[str, object]]) -> None:
+        # Abgelaufene Einträge nicht endlos mitschleppen
+        now = time.time()
+        data = {key: entry for key, entry in data.items() if now - entry.get("fetched_at", 0) < self.ttl_s * 4}
+        tmp = self.path.with_suffix(".tmp")
+        try:
+            tmp.write_text(json.dumps(data), encoding="utf-8")
+            tmp.replace(self.path)
+        except OSError as exc:
+            self._log(f"Verfügbarkeits-Cache nicht gespeichert: {exc}")
+
+    def get(self, date_str: str, location: str = DEFAULT_LOCATION) -> Optional[AvailabilitySnapshot]:
+        entry = self._load().get(cache_key(date_str, location))
+        if not entry:
+            return None
+        snapshot = AvailabilitySnapshot(**entry)
+        if snapshot.age() >= self.ttl_s:
+            return None
+        return snapshot
+
+    def put(self, snapshot: AvailabilitySnapshot) -> None:
+        with self._guard:
+            data = self._load()
+            data[cache_key(snapshot.date, snapshot.location)] = asdict(snapshot)
+            self._save(data)
+
+    def invalidate(self, date_str: str, location: Optional[str] = None) -> None:
+        with self._guard:
+            data = self._load()
+            keys = [key for key in data if key.split("@", 1)[0] == date_str]
+            if location is not None:
+                keys = [key for key in keys if key == cache_key(date_str, location)]
+            if not keys:
+                return
+            for key in keys:
+                data.pop(key)
+            self._save(data)
+        self._log(f"Verfügbarkeit für {date_str} verworfen.")
+
+    def invalidate_slots(self, slots: Iterable[Dict[str, object]]) -> None:
+        # Nach eigenen Buchungen: betroffene Tage neu scannen lassen
+        for date_str in sorted({slot["start"].strftime("%d.%m.%Y") for slot in slots}):
+            self.invalidate(date_str)
+
+    def get_or_scan(
+        self,
+        date_str: str,
+        scan: Callable[[str], Occupancy],
+        location: str = DEFAULT_LOCATION,
+    ) -> AvailabilitySnapshot:
+        with self._lock_for(cache_key(date_str, location)):
+            snapshot = self.get(date_str, location)
+            if snapshot is not None:
+                self.hits += 1
+                self._log(f"Verfügbarkeit {date_str} aus Cache ({snapshot.age():.0f}s alt).")
+                return snapshot
+            self.scans += 1
+            snapshot = AvailabilitySnapshot(date_str, location, time.time(), scan(date_str))
+            self.put(snapshot)
+            return snapshot
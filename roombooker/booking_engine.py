@@ -1,45 +1,57 @@
-import time
 from datetime import datetime
-from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
-from playwright.sync_api import sync_playwright
-
-from roombooker.config import APP_DIR, URLS
+from roombooker.availability import AvailabilityCache, AvailabilitySnapshot, to_minutes
+from roombooker.browser_pool import BrowserPool
+from roombooker.config import URLS, session_file_for
 from roombooker.models import Account
-from roombooker.utils import human_sleep
+from roombooker.pacing import PENDING_REQUESTS_SCRIPT, Pacer
+from roombooker.resource_blocker import ResourceBlocker
+from roombooker.session_manager import SessionManager
+from roombooker.utils import slot_from_task
 
 
 class BookingEngine:
-    def __init__(self, logger) -> None:
+    def __init__(self, logger, pool: Optional[BrowserPool] = None, pacer: Optional[Pacer] = None) -> None:
         self.logger = logger
+        self.pool = pool
+        self.pacer = pacer or Pacer.from_env()
+        self.sessions = SessionManager(logger)
+        self.availability = AvailabilityCache(logger)
+        if pool is not None and pool.blocker is not None:
+            self.blocker = pool.blocker
+        else:
+            self.blocker = ResourceBlocker.from_env(logger)
+
+    def _get_pool(self) -> BrowserPool:
+        if self.pool is None:
+            self.pool = BrowserPool(
+                self.logger,
+                headless=True,
+                slow_mo=self.pacer.profile.slow_mo,
+                init_scripts=[PENDING_REQUESTS_SCRIPT],
+                blocker=self.blocker,
+            )
+        return self.pool
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.close()
 
-    def get_context(self, p, session_path: Optional[Path] = None):
-        self.logger.log("Starte Browser (Headless)...")
-        browser = p.chromium.launch(
-            headless=True,
-            slow_mo=50,
-            args=["--start-maximized", "--window-size=1600,900"],
-        )
-
-        args = {
-            "user_agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-            ),
-            "viewport": {"width": 1600, "height": 900},
-            "locale": "de-CH",
-        }
-
-        if session_path and session_path.exists():
-            self.logger.log(f"Lade Session: {session_path.name}")
-            args["storage_state"] = str(session_path)
+    def perform_login(self, page, email: str, password: str) -> bool:
+        if not self.sessions.needs_login(email):
+            if "/event/add" not in page.url:
+                page.goto(URLS["event_add"], wait_until="domcontentloaded")
+            if page.locator("#navbarUser").count() > 0:
+                return True
+            self.sessions.invalidate(email)
 
-        context = browser.new_context(**args)
-        page = context.new_page()
-        return browser, context, page
+        if not self._login_flow(page, email, password):
+            return False
+        self.sessions.mark_verified(email)
+        return True
 
-    def perform_login(self, page, email: str, password: str) -> bool:
+    def _login_flow(self, page, email: str, password: str) -> bool:
         try:
             if "/event/add" not in page.url:
                 self.logger.log(f"Navigiere zu {URLS['event_add']}...")
@@ -51,23 +63,21 @@ class BookingEngine:
                 try:
                     if page.locator("#navbarDropDownRight").is_visible():
                         page.click("#navbarDropDownRight")
-                        human_sleep(0.5)
+                        self.pacer.jitter()
                     elif page.locator(".navbar-toggler").is_visible():
                         self.logger.log("Mobiles Menü erkannt, öffne Navigation...")
                         page.click(".navbar-toggler")
-                        human_sleep(0.5)
+                        self.pacer.jitter()
                         if page.locator("#navbarDropDownRight").is_visible():
                             page.click("#navbarDropDownRight")
-                            human_sleep(0.5)
+                            self.pacer.jitter()
 
                     self.logger.log("Wähle Bibliothek vonRoll...")
                     page.click(f"a[href*='{URLS['vonroll_location_path']}']")
-                    page.wait_for_load_state("networkidle")
+                    self.pacer.wait_for_url(page, lambda u: "/select" not in u)
                 except Exception as exc:
                     self.logger.log(f"Warnung Standortwahl (versuche Fortfahren): {exc}")
 
-            human_sleep(1)
-
             if "login" not in page.url and "wayf" not in page.url and "eduid" not in page.url:
                 if page.locator("#navbarUser").is_visible():
                     return True
@@ -81,7 +91,7 @@ class BookingEngine:
                         self.logger.log("Keine Zellen gefunden, klicke blind...")
                         page.mouse.click(800, 450)
 
-                    time.sleep(3)
+                    self.pacer.wait_for_login_prompt(page)
                 except Exception as exc:
                     self.logger.log(f"Fehler bei Login-Trigger: {exc}")
 
@@ -91,18 +101,14 @@ class BookingEngine:
                 try:
                     page.wait_for_selector("#username", timeout=5000)
                     page.fill("#username", email)
-                    human_sleep(0.5)
 
                     if page.locator("button[name='_eventId_submit']").is_visible():
                         page.click("button[name='_eventId_submit']")
                     else:
                         page.keyboard.press("Enter")
 
-                    human_sleep(1.5)
-
                     page.wait_for_selector("#password", timeout=5000)
                     page.fill("#password", password)
-                    human_sleep(0.5)
 
                     if page.locator("button[name='_eventId_proceed']").is_visible():
                         page.click("button[name='_eventId_proceed']")
@@ -110,8 +116,8 @@ class BookingEngine:
                         page.keyboard.press("Enter")
 
                     self.logger.log("Login abgeschickt. Warte auf Session...")
-                    page.wait_for_load_state("networkidle")
-                    time.sleep(8)
+                    if not self.pacer.wait_logged_in(page):
+                        self.logger.log("Keine Session nach Login erkannt.")
                 except Exception as exc:
                     self.logger.log(f"Fehler beim Ausfüllen des Logins: {exc}")
                     return False
@@ -125,6 +131,119 @@ class BookingEngine:
             self.logger.log(f"Fehler in perform_login: {exc}")
             return False
 
+    def open_form(self, key: str, acc: Account):
+        """Context aus dem Pool holen, einloggen und ein leeres /event/add liefern (None bei Login-Fehler)."""
+        pool = self._get_pool()
+        _, page = pool.acquire(key, session_path=session_file_for(acc.email))
+        if "/event/add" in page.url:
+            # Wiederverwendete Seite: Formular vom letzten Versuch verwerfen
+            page.goto(URLS["event_add"])
+
+        pool.set_flow(key, "login")
+        if not self.perform_login(page, acc.email, acc.password):
+            self.logger.log("Login fehlgeschlagen.")
+            pool.discard(key)
+            return None
+
+        pool.save_session(key)
+        pool.set_flow(key, "form")
+
+        if "/event/add" not in page.url:
+            page.goto(URLS["event_add"])
+            page.wait_for_load_state("domcontentloaded")
+        return page
+
+    def fill_form(self, page, task: Dict[str, object], room_id: str, summary: str) -> None:
+        page.evaluate(
+            "v => { var s=document.getElementById('event_room'); "
+            "s.value=v; s.dispatchEvent(new Event('change')); }",
+            room_id,
+        )
+        self.pacer.settle(page)
+
+        page.fill("#event_startDate", f"{task['date']} {task['start']}")
+        page.keyboard.press("Enter")
+        self.pacer.settle(page)
+
+        t1 = datetime.strptime(task["start"], "%H:%M")
+        t2 = datetime.strptime(task["end"], "%H:%M")
+        dur = int((t2 - t1).total_seconds() / 60)
+
+        page.evaluate(f"document.getElementById('event_duration').value = '{dur}'")
+        page.evaluate(
+            "document.getElementById('event_duration').dispatchEvent("
+            "new Event('change', {bubbles: true}))"
+        )
+        self.pacer.settle(page)
+
+        self.pacer.type(page, "#event_title", summary)
+        if page.is_visible('input[name="event[purpose]"][value="Other"]'):
+            page.check('input[name="event[purpose]"][value="Other"]')
+
+    def confirm_submit(self, page, room_name: str) -> bool:
+        """Nach dem Klick auf #event_submit: Erfolg = Weiterleitung weg von /event/add."""
+        try:
+            page.wait_for_url(lambda u: "/event/add" not in u, timeout=5000)
+            self.logger.log(f"ERFOLG: {room_name} gebucht!")
+            return True
+        except Exception:
+            content = page.content().lower()
+            if "konflikt" in content or "belegt" in content:
+                self.logger.log(f"Raum {room_name} ist belegt.")
+            elif "/event/add" in page.url:
+                self.logger.log(f"Fehler bei {room_name} (Keine Bestätigung).")
+            else:
+                self.logger.log(f"ERFOLG: {room_name} gebucht!")
+                return True
+        return False
+
+    def _try_room(self, task: Dict[str, object], room_name: str, acc: Account, simulation_mode: bool, summary: str) -> bool:
+        self.logger.log(f"Versuche: {task['start']}-{task['end']} ({room_name}) mit {acc.email}")
+        try:
+            page = self.open_form(acc.email, acc)
+            if page is None:
+                return False
+
+            self.fill_form(page, task, task["all_rooms"][room_name], summary)
+
+            if simulation_mode:
+                self.logger.log("SIMULATION OK.")
+                return True
+            self.logger.log("Speichere...")
+            page.click("#event_submit")
+            return self.confirm_submit(page, room_name)
+        except Exception as exc:
+            self.logger.log(f"Fehler bei Buchungsvorgang: {exc}")
+            self._get_pool().discard(acc.email)
+            return False
+
+    def _task_options(
+        self, task: Dict[str, object], preferred_rooms: List[str], snapshot: Optional[AvailabilitySnapshot]
+    ) -> Tuple[List[List[Dict[str, object]]], int]:
+        """Alternativen für einen Block: vorberechneter Fallback-Baum oder die Wunschräume.
+
+        Alles, was laut Snapshot schon belegt ist, fällt vor jeder Browser-Arbeit weg; zurück
+        kommen die verbleibenden Alternativen und die Anzahl der übersprungenen.
+        """
+        if task.get("fallbacks"):
+            options = [
+                option for option in task["fallbacks"]
+                if all(part["room"] in preferred_rooms and task["all_rooms"].get(part["room"]) for part in option)
+            ]
+        else:
+            options = [
+                [{"room": room, "start": task["start"], "end": task["end"]}]
+                for room in preferred_rooms
+                if task["all_rooms"].get(room)
+            ]
+        if snapshot is None or snapshot.date != task["date"]:
+            return options, 0
+        free = [
+            option for option in options
+            if all(snapshot.is_free(part["room"], to_minutes(part["start"]), to_minutes(part["end"])) for part in option)
+        ]
+        return free, len(options) - len(free)
+
     def execute_booking(
         self,
         tasks: List[Dict[str, object]],
@@ -132,101 +251,50 @@ class BookingEngine:
         preferred_rooms: List[str],
         simulation_mode: bool,
         summary: str = "Lernen",
+        snapshot: Optional[AvailabilitySnapshot] = None,
     ) -> List[Dict[str, object]]:
         self.logger.log("--- START: INTERNE BUCHUNG ---")
         if simulation_mode:
             self.logger.log("SIMULATIONS-MODUS (keine Buchung)")
 
         successes: List[Dict[str, object]] = []
+        # Fehlgeschlagene (Raum, Start, Ende): Alternativen, die sich damit überschneiden, fallen weg
+        dead: List[Tuple[str, str, str]] = []
+        skipped = 0
         acc_idx = 0
         for task in tasks:
-            block_success = False
-            for room_name in preferred_rooms:
-                if block_success:
-                    break
-                room_id = task["all_rooms"].get(room_name)
-                if not room_id:
+            # Bis hierhin ist der Block gebucht; Teilblöcke davor werden übersprungen
+            cursor = task["start"]
+            options, known_busy = self._task_options(task, preferred_rooms, snapshot or self.availability.get(task["date"]))
+            skipped += known_busy
+            for option in options:
+                parts = [dict(part, start=max(part["start"], cursor)) for part in option if part["end"] > cursor]
+                if any(
+                    room == part["room"] and start < part["end"] and part["start"] < end
+                    for part in parts
+                    for room, start, end in dead
+                ):
                     continue
+                for part in parts:
+                    part_task = dict(task, start=part["start"], end=part["end"])
+                    acc = accounts[acc_idx % len(accounts)]
+                    acc_idx += 1
+                    if not self._try_room(part_task, part["room"], acc, simulation_mode, summary):
+                        dead.append((part["room"], part["start"], part["end"]))
+                        break
+                    successes.append(slot_from_task(part_task, part["room"]))
+                    cursor = part["end"]
+                if cursor >= task["end"]:
+                    break
 
-                acc = accounts[acc_idx % len(accounts)]
-                session_file = APP_DIR / f"session_{acc.email.replace('@', '_')}.json"
-                acc_idx += 1
-
-                self.logger.log(f"Versuche: {task['start']}-{task['end']} ({room_name}) mit {acc.email}")
-
-                try:
-                    with sync_playwright() as p:
-                        browser, context, page = self.get_context(p, session_path=session_file)
-                        try:
-                            if not self.perform_login(page, acc.email, acc.password):
-                                self.logger.log("Login fehlgeschlagen.")
-                                continue
-
-                            context.storage_state(path=str(session_file))
-
-                            if "/event/add" not in page.url:
-                                page.goto(URLS["event_add"])
-                                page.wait_for_load_state("domcontentloaded")
-
-                            page.evaluate(
-                                "v => { var s=document.getElementById('event_room'); "
-                                "s.value=v; s.dispatchEvent(new Event('change')); }",
-                                room_id,
-                            )
-                            human_sleep(0.5)
-
-                            page.fill("#event_startDate", f"{task['date']} {task['start']}")
-                            page.keyboard.press("Enter")
-                            human_sleep(0.5)
-
-                            t1 = datetime.strptime(task["start"], "%H:%M")
-                            t2 = datetime.strptime(task["end"], "%H:%M")
-                            dur = int((t2 - t1).total_seconds() / 60)
-
-                            page.evaluate(f"document.getElementById('event_duration').value = '{dur}'")
-                            page.evaluate(
-                                "document.getElementById('event_duration').dispatchEvent("
-                                "new Event('change', {bubbles: true}))"
-                            )
-                            human_sleep(0.5)
-
-                            page.fill("#event_title", summary)
-                            if page.is_visible('input[name="event[purpose]"][value="Other"]'):
-                                page.check('input[name="event[purpose]"][value="Other"]')
-
-                            if simulation_mode:
-                                self.logger.log("SIMULATION OK.")
-                                block_success = True
-                            else:
-                                self.logger.log("Speichere...")
-                                page.click("#event_submit")
-                                try:
-                                    page.wait_for_url(lambda u: "/event/add" not in u, timeout=5000)
-                                    self.logger.log(f"ERFOLG: {room_name} gebucht!")
-                                    block_success = True
-                                except Exception:
-                                    content = page.content().lower()
-                                    if "konflikt" in content or "belegt" in content:
-                                        self.logger.log(f"Raum {room_name} ist belegt.")
-                                    else:
-                                        if "/event/add" in page.url:
-                                            self.logger.log(f"Fehler bei {room_name} (Keine Bestätigung).")
-                                        else:
-                                            self.logger.log(f"ERFOLG: {room_name} gebucht!")
-                                            block_success = True
-
-                            if block_success:
-                                date_value = datetime.strptime(task["date"], "%d.%m.%Y").date()
-                                start_dt = datetime.combine(date_value, datetime.strptime(task["start"], "%H:%M").time())
-                                end_dt = datetime.combine(date_value, datetime.strptime(task["end"], "%H:%M").time())
-                                successes.append({"start": start_dt, "end": end_dt, "room": room_name})
-                        finally:
-                            browser.close()
-                except Exception as exc:
-                    self.logger.log(f"Fehler bei Buchungsvorgang: {exc}")
-
-            if not block_success:
-                self.logger.log(f"FEHLER: Block {task['start']} konnte nicht gebucht werden.")
-            human_sleep(1)
+            if cursor < task["end"]:
+                self.logger.log(f"FEHLER: Block {cursor}-{task['end']} konnte nicht gebucht werden.")
+            self.pacer.jitter()
+        if skipped:
+            self.logger.log(f"{skipped} Versuch(e) übersprungen: laut Kalender schon belegt.")
+        if not simulation_mode:
+            self.availability.invalidate_slots(successes)
+        self.blocker.log_summary()
+        self.blocker.reset()
         self.logger.log("--- PROZESS ENDE ---")
         return successes
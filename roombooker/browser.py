@@ -1,5 +1,5 @@
-import csv
 import importlib.util
+import os
 import time
 from datetime import datetime
 from pathlib import Path
@@ -7,9 +7,17 @@ from typing import Dict, List, Optional
 
 from playwright.sync_api import sync_playwright
 
-from roombooker.config import APP_DIR, CSV_EXPORT_FILE, LOGIC_OVERRIDE_FILE, URLS
+from roombooker.async_engine import AsyncBookingEngine
+from roombooker.browser_pool import BrowserPool
+from roombooker.config import CSV_EXPORT_FILE, LOGIC_OVERRIDE_FILE, RESERVATION_CHANGES_FILE, URLS, session_file_for
 from roombooker.models import Account
-from roombooker.utils import human_sleep, human_type
+from roombooker.pacing import PENDING_REQUESTS_SCRIPT, Pacer
+from roombooker.reservation_store import ReservationStore
+from roombooker.resource_blocker import ResourceBlocker
+from roombooker.room_catalog import RoomCatalog
+from roombooker.session_manager import SessionManager
+
+FETCH_MAX_PARALLEL = int(os.environ.get("ROOMBOOKER_MAX_PARALLEL", "4"))
 
 
 class BookingWorker:
@@ -18,6 +26,31 @@ class BookingWorker:
         # Diese Variable wird von der GUI (gui.py) über die Checkbox gesteuert
         self.show_browser = False 
         self._no_override = object()
+        self.pacer = Pacer.from_env()
+        self.blocker = ResourceBlocker.from_env(logger)
+        self.sessions = SessionManager(logger)
+        self.pool: Optional[BrowserPool] = None
+
+    def _get_pool(self) -> BrowserPool:
+        # Sichtbarkeit kann sich über die GUI ändern -> Pool dann neu aufsetzen
+        headless = not self.show_browser
+        if self.pool is not None and self.pool.headless != headless:
+            self.pool.close()
+            self.pool = None
+        if self.pool is None:
+            self.pool = BrowserPool(
+                self.logger,
+                headless=headless,
+                slow_mo=self.pacer.profile.slow_mo,
+                init_scripts=[PENDING_REQUESTS_SCRIPT],
+                blocker=self.blocker,
+            )
+        return self.pool
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
 
     def get_context(self, p, session_path: Optional[Path] = None, *, force_visible: bool = False):
         # Logik: Wenn force_visible True ist, dann sichtbar.
@@ -30,7 +63,7 @@ class BookingWorker:
             # Wir erzwingen hier ein grosses Fenster
             browser = p.chromium.launch(
                 headless=is_headless, 
-                slow_mo=50,
+                slow_mo=self.pacer.profile.slow_mo,
                 args=["--start-maximized", "--window-size=1600,900"]
             )
         except Exception as e:
@@ -51,6 +84,7 @@ class BookingWorker:
             args["storage_state"] = str(session_path)
 
         context = browser.new_context(**args)
+        self.blocker.attach(context, "login")
         page = context.new_page()
         return browser, context, page
 
@@ -86,6 +120,19 @@ class BookingWorker:
         override = self._run_override("perform_login", page, email, password)
         if override is not self._no_override:
             return override
+        if not self.sessions.needs_login(email):
+            if "/event/add" not in page.url:
+                page.goto(URLS["event_add"], wait_until="domcontentloaded")
+            if page.locator("#navbarUser").count() > 0:
+                return True
+            self.sessions.invalidate(email)
+
+        if not self._login_flow(page, email, password):
+            return False
+        self.sessions.mark_verified(email)
+        return True
+
+    def _login_flow(self, page, email, password) -> bool:
         try:
             if "/event/add" not in page.url:
                 self.logger.log(f"Navigiere zu {URLS['event_add']}...")
@@ -97,23 +144,21 @@ class BookingWorker:
                 try:
                     if page.locator("#navbarDropDownRight").is_visible():
                         page.click("#navbarDropDownRight")
-                        human_sleep(0.5)
+                        self.pacer.jitter()
                     elif page.locator(".navbar-toggler").is_visible():
                         self.logger.log("Mobiles Menü erkannt, öffne Navigation...")
                         page.click(".navbar-toggler")
-                        human_sleep(0.5)
+                        self.pacer.jitter()
                         if page.locator("#navbarDropDownRight").is_visible():
                             page.click("#navbarDropDownRight")
-                            human_sleep(0.5)
+                            self.pacer.jitter()
 
                     self.logger.log("Wähle Bibliothek vonRoll...")
                     page.click(f"a[href*='{URLS['vonroll_location_path']}']")
-                    page.wait_for_load_state("networkidle")
+                    self.pacer.wait_for_url(page, lambda u: "/select" not in u)
                 except Exception as e:
                     self.logger.log(f"Warnung Standortwahl (versuche Fortfahren): {e}")
 
-            human_sleep(1)
-
             if "login" not in page.url and "wayf" not in page.url and "eduid" not in page.url:
                 if page.locator("#navbarUser").is_visible():
                     return True
@@ -125,7 +170,7 @@ class BookingWorker:
                     else:
                         self.logger.log("Keine Zellen gefunden, klicke blind...")
                         page.mouse.click(800, 450)
-                    time.sleep(3)
+                    self.pacer.wait_for_login_prompt(page)
                 except Exception as e:
                     self.logger.log(f"Fehler bei Login-Trigger: {e}")
 
@@ -134,22 +179,19 @@ class BookingWorker:
                 try:
                     page.wait_for_selector("#username", timeout=5000)
                     page.fill("#username", email)
-                    human_sleep(0.5)
                     if page.locator("button[name='_eventId_submit']").is_visible():
                         page.click("button[name='_eventId_submit']")
                     else:
                         page.keyboard.press("Enter")
-                    human_sleep(1.5)
                     page.wait_for_selector("#password", timeout=5000)
                     page.fill("#password", password)
-                    human_sleep(0.5)
                     if page.locator("button[name='_eventId_proceed']").is_visible():
                         page.click("button[name='_eventId_proceed']")
                     else:
                         page.keyboard.press("Enter")
                     self.logger.log("Login abgeschickt. Warte auf Session...")
-                    page.wait_for_load_state("networkidle")
-                    time.sleep(8)
+                    if not self.pacer.wait_logged_in(page):
+                        self.logger.log("Keine Session nach Login erkannt.")
                 except Exception as e:
                     self.logger.log(f"Fehler beim Ausfüllen des Logins: {e}")
                     return False
@@ -168,16 +210,19 @@ class BookingWorker:
         try:
             with sync_playwright() as p:
                 # FIX HIER: force_visible nicht hardcoden!
-                browser, _, page = self.get_context(p, force_visible=self.show_browser)
+                browser, context, page = self.get_context(
+                    p, session_path=session_file_for(email), force_visible=self.show_browser
+                )
                 try:
                     self.logger.log("Starte Raum-Scan...")
                     if self.perform_login(page, email, password):
                         self.logger.log("Login OK. Scanne Räume...")
+                        self.blocker.set_flow(context, "form")
                         if "/event/add" not in page.url:
                             page.goto(URLS["event_add"])
                             page.wait_for_load_state("domcontentloaded")
 
-                        human_sleep(2)
+                        self.pacer.settle(page)
 
                         js_data = page.evaluate(
                             """() => {
@@ -196,6 +241,7 @@ class BookingWorker:
 
                         if js_data and len(js_data) > 0:
                             self.logger.log(f"Scan erfolgreich: {len(js_data)} Räume.")
+                            RoomCatalog(self.logger).update(js_data)
                             return js_data
 
                         self.logger.log("Scan fehlgeschlagen (Liste leer?).")
@@ -204,6 +250,9 @@ class BookingWorker:
                         self.logger.log("Login für Scan fehlgeschlagen.")
                         return None
                 finally:
+                    self.blocker.detach(context)
+                    self.blocker.log_summary()
+                    self.blocker.reset()
                     browser.close()
         except Exception as e:
             self.logger.log(f"CRITICAL: Playwright Crash: {e}")
@@ -213,68 +262,42 @@ class BookingWorker:
         override = self._run_override("fetch_reservations", accounts)
         if override is not self._no_override:
             return override
-        all_reservations = []
+        started = time.monotonic()
+        active = [acc for acc in accounts if acc.active and acc.email]
 
-        with sync_playwright() as p:
-            for acc in accounts:
-                if not acc.active or not acc.email:
+        # Alle Accounts gleichzeitig: ein Browser, ein Context pro Account (Login, Laden, Auslesen)
+        engine = AsyncBookingEngine(self.logger, max_concurrency=FETCH_MAX_PARALLEL, pacer=self.pacer)
+        try:
+            results = engine.fetch_reservations(active, headless=not self.show_browser)
+        except Exception as e:
+            self.logger.log(f"Fehler beim Abruf: {e}")
+            return
+
+        with ReservationStore() as store:
+            fetched = 0
+            for acc in active:
+                rows = results.get(acc.email)
+                if rows is None:
+                    self.logger.log(f"-> {acc.email}: Keine Tabelle gefunden (Login evtl. unvollständig?).")
                     continue
-                self.logger.log(f"Hole Reservationen für: {acc.email}")
-                # FIX HIER EBENFALLS
-                browser, context, page = self.get_context(p, force_visible=self.show_browser)
+                fetched += 1
+                # Nur erfolgreich gelesene Accounts abgleichen, sonst würde alles als storniert gelten
+                counts = store.sync_account(
+                    acc.email,
+                    [{"Zeit": t, "Titel": title, "Ort": loc, "Raum": room} for t, title, loc, room in rows],
+                )
+                changes = ", ".join(f"{k}={v}" for k, v in counts.items() if v) or "keine Änderungen"
+                self.logger.log(f"-> {acc.email}: {len(rows)} Reservationen ({changes}).")
+            self.logger.log(f"Reservationen von {fetched} Accounts in {time.monotonic() - started:.1f}s geholt.")
 
-                try:
-                    if self.perform_login(page, acc.email, acc.password):
-                        self.logger.log(f"Gehe zu {URLS['reservations']}...")
-                        page.goto(URLS["reservations"])
-                        page.wait_for_load_state("networkidle")
-                        human_sleep(2)
-                        if page.locator("table.table").is_visible():
-                            rows = page.locator("table.table tbody tr").all()
-                            count = 0
-                            if len(rows) > 0:
-                                for row in rows:
-                                    cells = row.locator("td").all()
-                                    if len(cells) >= 4:
-                                        raw_time = " ".join(cells[0].inner_text().split())
-                                        title = cells[1].inner_text().strip()
-                                        location = cells[2].inner_text().strip()
-                                        room = cells[3].inner_text().strip()
-                                        all_reservations.append(
-                                            {
-                                                "Account": acc.email,
-                                                "Zeit": raw_time,
-                                                "Titel": title,
-                                                "Ort": location,
-                                                "Raum": room,
-                                                "Abgerufen_am": datetime.now().strftime("%d.%m.%Y %H:%M"),
-                                            }
-                                        )
-                                        count += 1
-                                self.logger.log(f"-> {count} Reservationen gefunden.")
-                            else:
-                                self.logger.log("-> Keine Reservationen in der Liste.")
-                        else:
-                            self.logger.log("-> Keine Tabelle gefunden (Login evtl. unvollständig?).")
-                    else:
-                        self.logger.log(f"-> Login fehlgeschlagen für {acc.email}")
-                except Exception as e:
-                    self.logger.log(f"Fehler beim Abruf: {e}")
-                finally:
-                    browser.close()
-
-        if all_reservations:
             try:
-                keys = all_reservations[0].keys()
-                with open(CSV_EXPORT_FILE, "w", newline="", encoding="utf-8") as handle:
-                    dict_writer = csv.DictWriter(handle, fieldnames=keys)
-                    dict_writer.writeheader()
-                    dict_writer.writerows(all_reservations)
-                self.logger.log(f"ERFOLG: Alle Reservationen gespeichert in: {CSV_EXPORT_FILE}")
+                if store.export_csv(CSV_EXPORT_FILE):
+                    self.logger.log(f"ERFOLG: Reservationen aktualisiert in: {CSV_EXPORT_FILE}")
+                else:
+                    self.logger.log("Reservationen unverändert, CSV nicht neu geschrieben.")
+                store.export_changes_jsonl(RESERVATION_CHANGES_FILE)
             except Exception as e:
                 self.logger.log(f"Fehler beim Speichern der CSV: {e}")
-        else:
-            self.logger.log("Keine Reservationen zum Speichern gefunden.")
 
     def execute_booking(self, tasks, accounts, preferred_rooms, simulation_mode) -> None:
         override = self._run_override("execute_booking", tasks, accounts, preferred_rooms, simulation_mode)
@@ -295,76 +318,82 @@ class BookingWorker:
                     continue
 
                 acc = accounts[acc_idx % len(accounts)]
-                session_file = APP_DIR / f"session_{acc.email.replace('@','_')}.json"
+                session_file = session_file_for(acc.email)
                 acc_idx += 1
 
                 self.logger.log(f"Versuche: {task['start']}-{task['end']} ({room_name}) mit {acc.email}")
 
+                pool = self._get_pool()
                 try:
-                    with sync_playwright() as p:
-                        browser, context, page = self.get_context(p, session_path=session_file)
+                    _, page = pool.acquire(acc.email, session_path=session_file)
+                    if "/event/add" in page.url:
+                        # Wiederverwendete Seite: Formular vom letzten Versuch verwerfen
+                        page.goto(URLS["event_add"])
+                    pool.set_flow(acc.email, "login")
+                    if not self.perform_login(page, acc.email, acc.password):
+                        self.logger.log("Login fehlgeschlagen.")
+                        pool.discard(acc.email)
+                        continue
+                    pool.save_session(acc.email)
+                    pool.set_flow(acc.email, "form")
+                    if "/event/add" not in page.url:
+                        page.goto(URLS["event_add"])
+                        page.wait_for_load_state("domcontentloaded")
+
+                    # Raum setzen
+                    page.evaluate(
+                        "v => { var s=document.getElementById('event_room'); "
+                        "s.value=v; s.dispatchEvent(new Event('change')); }",
+                        room_id,
+                    )
+                    self.pacer.settle(page)
+                    
+                    page.fill("#event_startDate", f"{task['date']} {task['start']}")
+                    page.keyboard.press("Enter")
+                    self.pacer.settle(page)
+
+                    t1 = datetime.strptime(task["start"], "%H:%M")
+                    t2 = datetime.strptime(task["end"], "%H:%M")
+                    dur = int((t2 - t1).total_seconds() / 60)
+
+                    page.evaluate(f"document.getElementById('event_duration').value = '{dur}'")
+                    page.evaluate(
+                        "document.getElementById('event_duration').dispatchEvent("
+                        "new Event('change', {bubbles: true}))"
+                    )
+                    self.pacer.settle(page)
+                    
+                    self.pacer.type(page, "#event_title", "Lernen")
+                    if page.is_visible('input[name="event[purpose]"][value="Other"]'):
+                        page.check('input[name="event[purpose]"][value="Other"]')
+
+                    if simulation_mode:
+                        self.logger.log("SIMULATION OK.")
+                        block_success = True
+                    else:
+                        self.logger.log("Speichere...")
+                        page.click("#event_submit")
                         try:
-                            if not self.perform_login(page, acc.email, acc.password):
-                                self.logger.log("Login fehlgeschlagen.")
-                                continue
-                            context.storage_state(path=str(session_file))
-                            if "/event/add" not in page.url:
-                                page.goto(URLS["event_add"])
-                                page.wait_for_load_state("domcontentloaded")
-
-                            # Raum setzen
-                            page.evaluate(
-                                "v => { var s=document.getElementById('event_room'); "
-                                "s.value=v; s.dispatchEvent(new Event('change')); }",
-                                room_id,
-                            )
-                            human_sleep(0.5)
-                            
-                            page.fill("#event_startDate", f"{task['date']} {task['start']}")
-                            page.keyboard.press("Enter")
-                            human_sleep(0.5)
-
-                            t1 = datetime.strptime(task["start"], "%H:%M")
-                            t2 = datetime.strptime(task["end"], "%H:%M")
-                            dur = int((t2 - t1).total_seconds() / 60)
-
-                            page.evaluate(f"document.getElementById('event_duration').value = '{dur}'")
-                            page.evaluate(
-                                "document.getElementById('event_duration').dispatchEvent("
-                                "new Event('change', {bubbles: true}))"
-                            )
-                            human_sleep(0.5)
-                            
-                            human_type(page, "#event_title", "Lernen")
-                            if page.is_visible('input[name="event[purpose]"][value="Other"]'):
-                                page.check('input[name="event[purpose]"][value="Other"]')
-
-                            if simulation_mode:
-                                self.logger.log("SIMULATION OK.")
-                                block_success = True
+                            page.wait_for_url(lambda u: "/event/add" not in u, timeout=5000)
+                            self.logger.log(f"ERFOLG: {room_name} gebucht!")
+                            block_success = True
+                        except Exception:
+                            content = page.content().lower()
+                            if "konflikt" in content or "belegt" in content:
+                                self.logger.log(f"Raum {room_name} ist belegt.")
                             else:
-                                self.logger.log("Speichere...")
-                                page.click("#event_submit")
-                                try:
-                                    page.wait_for_url(lambda u: "/event/add" not in u, timeout=5000)
+                                if "/event/add" in page.url:
+                                    self.logger.log(f"Fehler bei {room_name} (Keine Bestätigung).")
+                                else:
                                     self.logger.log(f"ERFOLG: {room_name} gebucht!")
                                     block_success = True
-                                except Exception:
-                                    content = page.content().lower()
-                                    if "konflikt" in content or "belegt" in content:
-                                        self.logger.log(f"Raum {room_name} ist belegt.")
-                                    else:
-                                        if "/event/add" in page.url:
-                                            self.logger.log(f"Fehler bei {room_name} (Keine Bestätigung).")
-                                        else:
-                                            self.logger.log(f"ERFOLG: {room_name} gebucht!")
-                                            block_success = True
-                        finally:
-                            browser.close()
                 except Exception as e:
                     self.logger.log(f"Fehler bei Buchungsvorgang: {e}")
+                    pool.discard(acc.email)
 
             if not block_success:
                 self.logger.log(f"FEHLER: Block {task['start']} konnte nicht gebucht werden.")
-            human_sleep(1)
+            self.pacer.jitter()
+        self.blocker.log_summary()
+        self.blocker.reset()
         self.logger.log("--- PROZESS ENDE ---")
@@ -0,0 +1,172 @@
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from playwright.sync_api import sync_playwright
+
+from roombooker.config import USER_AGENT
+from roombooker.resource_blocker import ResourceBlocker
+
+CONTEXT_ARGS = {
+    "user_agent": USER_AGENT,
+    "viewport": {"width": 1600, "height": 900},
+    "locale": "de-CH",
+}
+
+LAUNCH_ARGS = ["--start-maximized", "--window-size=1600,900"]
+
+
+@dataclass
+class PooledContext:
+    context: object
+    page: object
+    session_path: Optional[Path] = None
+    uses: int = 0
+
+
+class BrowserPool:
+    """Hält Chromium und eingeloggte Contexts über Versuche, Tasks und Jobs hinweg offen.
+
+    Playwright (sync) ist an den Thread gebunden, der den Treiber gestartet hat.
+    Wird der Pool aus einem anderen Thread benutzt, startet er einen neuen Treiber.
+    """
+
+    def __init__(
+        self,
+        logger,
+        *,
+        headless: bool = True,
+        slow_mo: int = 0,
+        max_context_uses: int = 20,
+        launch_args: Optional[List[str]] = None,
+        init_scripts: Optional[List[str]] = None,
+        blocker: Optional[ResourceBlocker] = None,
+    ) -> None:
+        self.logger = logger
+        self.headless = headless
+        self.slow_mo = slow_mo
+        self.max_context_uses = max_context_uses
+        self.launch_args = list(launch_args) if launch_args is not None else list(LAUNCH_ARGS)
+        self.init_scripts = list(init_scripts or [])
+        self.blocker = blocker
+        self._playwright = None
+        self._browser = None
+        self._thread_id: Optional[int] = None
+        self._contexts: Dict[str, PooledContext] = {}
+        self.launches = 0
+
+    def __enter__(self) -> "BrowserPool":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _start_driver(self) -> None:
+        if self._playwright is not None and self._thread_id == threading.get_ident():
+            return
+        if self._playwright is not None:
+            self.logger.log("Browser-Pool: Neuer Thread erkannt, starte eigenen Treiber...")
+            self._drop_driver()
+        self._playwright = sync_playwright().start()
+        self._thread_id = threading.get_ident()
+
+    def _drop_driver(self) -> None:
+        self._contexts.clear()
+        for closer in (
+            lambda: self._browser.close() if self._browser else None,
+            lambda: self._playwright.stop() if self._playwright else None,
+        ):
+            try:
+                closer()
+            except Exception:
+                pass
+        self._browser = None
+        self._playwright = None
+        self._thread_id = None
+
+    def _ensure_browser(self):
+        self._start_driver()
+        if self._browser is not None and self._browser.is_connected():
+            return self._browser
+
+        if self._browser is not None:
+            self.logger.log("Browser-Pool: Browser abgestürzt, starte neu...")
+            self._contexts.clear()
+
+        self.logger.log(f"Starte Browser (Pool, Headless: {self.headless})...")
+        self._browser = self._playwright.chromium.launch(
+            headless=self.headless,
+            slow_mo=self.slow_mo,
+            args=self.launch_args,
+        )
+        self.launches += 1
+        return self._browser
+
+    def _new_context(self, key: str, session_path: Optional[Path]) -> PooledContext:
+        browser = self._ensure_browser()
+        args = dict(CONTEXT_ARGS)
+        if session_path and session_path.exists():
+            self.logger.log(f"Lade Session: {session_path.name}")
+            args["storage_state"] = str(session_path)
+        context = browser.new_context(**args)
+        for script in self.init_scripts:
+            context.add_init_script(script)
+        if self.blocker is not None:
+            self.blocker.attach(context, "login")
+        entry = PooledContext(context=context, page=context.new_page(), session_path=session_path)
+        self._contexts[key] = entry
+        return entry
+
+    def acquire(self, key: str, session_path: Optional[Path] = None) -> Tuple[object, object]:
+        """Liefert (context, page) für einen Schlüssel (i.d.R. die Account-E-Mail)."""
+        self._ensure_browser()
+        entry = self._contexts.get(key)
+
+        if entry is not None and entry.page.is_closed():
+            self.discard(key)
+            entry = None
+
+        if entry is not None and entry.uses >= self.max_context_uses:
+            self.logger.log(f"Browser-Pool: Recycle Context für {key} nach {entry.uses} Nutzungen.")
+            self.save_session(key)
+            self.discard(key)
+            entry = None
+
+        if entry is None:
+            entry = self._new_context(key, session_path)
+
+        entry.uses += 1
+        return entry.context, entry.page
+
+    def set_flow(self, key: str, flow: str) -> None:
+        entry = self._contexts.get(key)
+        if entry is not None and self.blocker is not None:
+            self.blocker.set_flow(entry.context, flow)
+
+    def save_session(self, key: str) -> None:
+        entry = self._contexts.get(key)
+        if entry is None or entry.session_path is None:
+            return
+        try:
+            entry.context.storage_state(path=str(entry.session_path))
+        except Exception as exc:
+            self.logger.log(f"Browser-Pool: Session konnte nicht gespeichert werden: {exc}")
+
+    def discard(self, key: str) -> None:
+        entry = self._contexts.pop(key, None)
+        if entry is None:
+            return
+        if self.blocker is not None:
+            self.blocker.detach(entry.context)
+        try:
+            entry.context.close()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        if self._playwright is None:
+            return
+        for key in list(self._contexts):
+            self.discard(key)
+        self._drop_driver()
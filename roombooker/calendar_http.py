@@ -0,0 +1,148 @@
+import codecs
+import json
+import time
+import urllib.error
+import urllib.request
+from datetime import date, datetime
+from html.parser import HTMLParser
+from http.cookiejar import CookieJar
+from typing import Iterable, List
+
+from roombooker.availability import Occupancy, to_minutes
+from roombooker.config import URLS, USER_AGENT
+
+EVENT_ATTR = "data-event-event-value"
+MINUTES_PER_DAY = 24 * 60
+CHUNK_SIZE = 16 * 1024
+LOGIN_FIELDS = ("username", "password", "j_username")
+LOGIN_URL_MARKERS = ("login", "wayf", "eduid")
+# Dieselben Merkmale als CSS-Selektoren für den Browser-Scan
+GRID_SELECTOR = "svg, [class*='timeline']"
+LOGIN_FIELD_SELECTOR = ", ".join(f"input#{name}, input[name='{name}']" for name in LOGIN_FIELDS)
+
+
+class CalendarLayoutChanged(ValueError):
+    """Antwort ist kein Kalender (Login-Seite, neues Layout) -> Browser-Scan statt "alles frei"."""
+
+
+def check_calendar(url: str, has_grid: bool, has_login_form: bool) -> None:
+    """Wirft CalendarLayoutChanged, wenn die Seite kein Kalender ist (gemeinsam für HTTP- und Browser-Scan)."""
+    if any(marker in url for marker in LOGIN_URL_MARKERS):
+        raise CalendarLayoutChanged(f"Weiterleitung auf Login statt Kalender: {url}")
+    if has_login_form:
+        raise CalendarLayoutChanged("Login-Seite statt Kalender erhalten")
+    if not has_grid:
+        raise CalendarLayoutChanged("Kein Kalender-Raster in der Antwort (Layout geändert?)")
+
+
+def calendar_url(day: date) -> str:
+    return f"{URLS['room_base']}/event?day={day.isoformat()}"
+
+
+def parse_event_payloads(payloads: Iterable[str]) -> Occupancy:
+    rooms: Occupancy = {}
+    for raw in payloads:
+        try:
+            event = json.loads(raw)
+            room = event["roomName"]
+            start_m = to_minutes(event["start"].split("T")[1][:5])
+            end_m = to_minutes(event["end"].split("T")[1][:5])
+        except (ValueError, KeyError, IndexError, TypeError):
+            continue
+        if end_m <= start_m:
+            # Läuft über Mitternacht
+            end_m = MINUTES_PER_DAY
+        rooms.setdefault(room, []).append({"start_m": start_m, "end_m": end_m})
+    for bookings in rooms.values():
+        bookings.sort(key=lambda b: b["start_m"])
+    return rooms
+
+
+class EventPayloadParser(HTMLParser):
+    """Sammelt nur die data-event-event-value Attribute, der Rest der Seite wird verworfen.
+
+    Nebenbei: ob das Kalender-Raster (SVG/Timeline) überhaupt da war und ob es eine Login-Seite ist.
+    Ohne Raster heisst "keine Buchungen" nicht "alles frei".
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.payloads: List[str] = []
+        self.has_grid = False
+        self.has_login_form = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "svg":
+            self.has_grid = True
+        elif tag == "input":
+            if any(key in ("id", "name") and value in LOGIN_FIELDS for key, value in attrs):
+                self.has_login_form = True
+        if tag != "rect":
+            if not self.has_grid and any(key == "class" and value and "timeline" in value for key, value in attrs):
+                self.has_grid = True
+            return
+        for key, value in attrs:
+            if key == EVENT_ATTR and value:
+                self.payloads.append(value)
+
+    def check_calendar(self, url: str = "") -> None:
+        check_calendar(url, self.has_grid, self.has_login_form)
+
+    handle_startendtag = handle_starttag
+
+
+def parse_calendar_html(html: str) -> Occupancy:
+    parser = EventPayloadParser()
+    parser.feed(html)
+    parser.close()
+    return parse_event_payloads(parser.payloads)
+
+
+class HttpCalendarScanner:
+    """Liest die Belegung ohne Browser: /set/<n> für das Standort-Cookie, dann /event?day= streamen."""
+
+    def __init__(self, logger=None, timeout: float = 10.0, location_path: str = URLS["vonroll_location_path"]) -> None:
+        self.logger = logger
+        self.timeout = timeout
+        self.location_path = location_path
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+        self._location_set = False
+
+    def _open(self, url: str):
+        req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT, "Accept-Language": "de-CH"})
+        return self.opener.open(req, timeout=self.timeout)
+
+    def _ensure_location(self) -> None:
+        if not self._location_set:
+            with self._open(URLS["room_base"] + self.location_path) as resp:
+                resp.read()
+            self._location_set = True
+
+    def scan_day(self, date_str: str) -> Occupancy:
+        day = datetime.strptime(date_str, "%d.%m.%Y").date()
+        started = time.monotonic()
+        self._ensure_location()
+        parser = EventPayloadParser()
+        with self._open(calendar_url(day)) as resp:
+            final_url = resp.geturl()
+            if "/select" in final_url:
+                self._location_set = False
+                raise urllib.error.URLError("Standortwahl statt Kalender erhalten")
+            if any(marker in final_url for marker in LOGIN_URL_MARKERS):
+                raise CalendarLayoutChanged(f"Weiterleitung auf Login statt Kalender: {final_url}")
+            # Inkrementell dekodieren, damit Umlaute an Chunk-Grenzen nicht zerbrechen
+            decoder = codecs.getincrementaldecoder(resp.headers.get_content_charset() or "utf-8")(errors="replace")
+            while True:
+                chunk = resp.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                parser.feed(decoder.decode(chunk))
+            parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+        parser.check_calendar(final_url)
+        rooms = parse_event_payloads(parser.payloads)
+        if self.logger is not None:
+            self.logger.log(
+                f"HTTP-Scan {date_str}: {len(parser.payloads)} Buchungen in {(time.monotonic() - started) * 1000:.0f} ms"
+            )
+        return rooms
@@ -0,0 +1,141 @@
+import asyncio
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from playwright.async_api import async_playwright
+
+from roombooker.availability import AvailabilityCache, AvailabilitySnapshot, Occupancy
+from roombooker.browser_pool import CONTEXT_ARGS, LAUNCH_ARGS
+from roombooker.calendar_http import (
+    GRID_SELECTOR,
+    LOGIN_FIELD_SELECTOR,
+    MINUTES_PER_DAY,
+    CalendarLayoutChanged,
+    calendar_url,
+    check_calendar,
+    parse_event_payloads,
+)
+from roombooker.config import BOOKING_WINDOW_DAYS, URLS
+from roombooker.resource_blocker import ResourceBlocker
+
+EVENT_SELECTOR = "rect[data-event-event-value]"
+EVENTS_JS = (
+    "() => Array.from(document.querySelectorAll('rect[data-event-event-value]'))"
+    ".map(el => el.getAttribute('data-event-event-value'))"
+)
+
+
+def bookable_days(today: Optional[date] = None, days: int = BOOKING_WINDOW_DAYS) -> List[date]:
+    start = today or date.today()
+    return [start + timedelta(days=offset) for offset in range(days + 1)]
+
+
+class AvailabilityMatrix:
+    """Räume x Tage x Minuten, 1 = belegt (ein bytearray pro Raum und Tag)."""
+
+    def __init__(self, days: List[date], per_day: Dict[date, Occupancy]) -> None:
+        self.days = list(days)
+        self.rooms = sorted({room for occupancy in per_day.values() for room in occupancy})
+        self._day_index = {day: idx for idx, day in enumerate(self.days)}
+        self.grid: Dict[str, List[bytearray]] = {
+            room: [bytearray(MINUTES_PER_DAY) for _ in self.days] for room in self.rooms
+        }
+        for day, occupancy in per_day.items():
+            idx = self._day_index[day]
+            for room, bookings in occupancy.items():
+                row = self.grid[room][idx]
+                for booking in bookings:
+                    row[booking["start_m"]:booking["end_m"]] = b"\x01" * (booking["end_m"] - booking["start_m"])
+
+    def row(self, room: str, day: date) -> bytearray:
+        rows = self.grid.get(room)
+        if rows is None:
+            return bytearray(MINUTES_PER_DAY)
+        return rows[self._day_index[day]]
+
+    def is_free(self, room: str, day: date, start_m: int, end_m: int) -> bool:
+        return not any(self.row(room, day)[start_m:end_m])
+
+    def free_minutes(self, room: str, day: date, start_m: int = 0, end_m: int = MINUTES_PER_DAY) -> int:
+        window = self.row(room, day)[start_m:end_m]
+        return len(window) - sum(window)
+
+
+class CalendarScanner:
+    """Lädt /event?day= für mehrere Tage parallel: ein Browser, ein Context, mehrere Tabs."""
+
+    def __init__(self, logger, pages: int = 4, timeout_ms: int = 15000, cache: Optional[AvailabilityCache] = None) -> None:
+        self.logger = logger
+        self.pages = max(1, pages)
+        self.timeout_ms = timeout_ms
+        self.cache = cache or AvailabilityCache(logger)
+        self.blocker = ResourceBlocker.from_env(logger)
+
+    async def _load_day(self, page, day: date) -> Occupancy:
+        await page.goto(calendar_url(day), wait_until="domcontentloaded")
+        if "/select" in page.url:
+            raise CalendarLayoutChanged("Standortwahl statt Kalender erhalten")
+        # Ohne Raster (Login, neues Layout) hiesse "keine Buchungen" fälschlich "alles frei"
+        check_calendar(
+            page.url,
+            await page.locator(GRID_SELECTOR).count() > 0,
+            await page.locator(LOGIN_FIELD_SELECTOR).count() > 0,
+        )
+        if await page.locator(EVENT_SELECTOR).count() == 0:
+            # Leerer Tag oder clientseitig gerendert -> kurz nachwarten
+            try:
+                await page.wait_for_selector(EVENT_SELECTOR, timeout=2000)
+            except Exception:
+                pass
+        return parse_event_payloads(await page.evaluate(EVENTS_JS))
+
+    async def _worker(self, page, queue: "asyncio.Queue[date]", results: Dict[date, Occupancy]) -> None:
+        while True:
+            try:
+                day = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                results[day] = await self._load_day(page, day)
+            except Exception as exc:
+                # Tag fehlt in results -> wird weder gecacht noch als frei gezählt
+                self.logger.log(f"Scan {day.strftime('%d.%m.%Y')} fehlgeschlagen: {exc}")
+
+    async def scan_async(self, days: List[date]) -> Dict[date, Occupancy]:
+        results: Dict[date, Occupancy] = {}
+        if not days:
+            return results
+        queue: "asyncio.Queue[date]" = asyncio.Queue()
+        for day in days:
+            queue.put_nowait(day)
+
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True, args=LAUNCH_ARGS)
+            try:
+                context = await browser.new_context(**CONTEXT_ARGS)
+                context.set_default_timeout(self.timeout_ms)
+                await self.blocker.attach_async(context, "calendar")
+                first = await context.new_page()
+                # Standort-Cookie einmal setzen, gilt für alle Tabs des Contexts
+                await first.goto(URLS["room_base"] + URLS["vonroll_location_path"], wait_until="domcontentloaded")
+                pages = [first] + [await context.new_page() for _ in range(min(self.pages, len(days)) - 1)]
+                await asyncio.gather(*(self._worker(page, queue, results) for page in pages))
+            finally:
+                await browser.close()
+        return results
+
+    def scan(self, days: Optional[List[date]] = None) -> AvailabilityMatrix:
+        days = days or bookable_days()
+        started = time.monotonic()
+        per_day = asyncio.run(self.scan_async(days))
+        now = time.time()
+        for day, occupancy in per_day.items():
+            self.cache.put(AvailabilitySnapshot(day.strftime("%d.%m.%Y"), fetched_at=now, rooms=occupancy))
+        self.logger.log(
+            f"Kalender-Scan: {len(per_day)}/{len(days)} Tage, "
+            f"{sum(len(b) for occ in per_day.values() for b in occ.values())} Buchungen "
+            f"in {time.monotonic() - started:.1f}s ({self.pages} Tabs)."
+        )
+        self.blocker.log_summary()
+        return AvailabilityMatrix(sorted(per_day), per_day)
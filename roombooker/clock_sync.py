@@ -0,0 +1,155 @@
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Callable, List, Optional, Tuple
+
+from roombooker.config import URLS, USER_AGENT
+
+
+@dataclass
+class ClockSample:
+    server_second: float
+    sent: float
+    received: float
+
+    @property
+    def rtt(self) -> float:
+        return self.received - self.sent
+
+
+@dataclass
+class ClockEstimate:
+    offset_s: float
+    uncertainty_s: float
+    rtt_s: float
+    samples: int
+
+
+def offset_bounds(samples: List[ClockSample]) -> Optional[Tuple[float, float]]:
+    """Schnittmenge der möglichen Offsets (Serverzeit - lokale Zeit).
+
+    Der Date-Header hat nur Sekundenauflösung: Der Server war beim Beantworten in
+    [S, S+1) und das passierte lokal irgendwann in [sent, received]. Mit Proben über
+    verschiedene Sekundenbruchteile wird das Intervall deutlich enger als 1 s.
+    """
+    lo, hi = float("-inf"), float("inf")
+    for sample in samples:
+        lo = max(lo, sample.server_second - sample.received)
+        hi = min(hi, sample.server_second + 1 - sample.sent)
+    if lo > hi:
+        return None
+    return lo, hi
+
+
+class ServerClock:
+    def __init__(self, logger, url: str = URLS["room_base"], samples: int = 8, timeout: float = 5.0) -> None:
+        self.logger = logger
+        self.url = url
+        self.samples = samples
+        self.timeout = timeout
+        self.estimate: Optional[ClockEstimate] = None
+
+    def _sample(self) -> Optional[ClockSample]:
+        req = urllib.request.Request(self.url, method="HEAD", headers={"User-Agent": USER_AGENT})
+        sent = time.time()
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                received = time.time()
+                header = resp.headers.get("Date")
+        except (urllib.error.URLError, OSError) as exc:
+            self.logger.log(f"Zeitprobe fehlgeschlagen: {exc}")
+            return None
+        if not header:
+            return None
+        return ClockSample(parsedate_to_datetime(header).timestamp(), sent, received)
+
+    def calibrate(self, deadline: Optional[float] = None) -> ClockEstimate:
+        """Proben im Sekundenabstand; mit `deadline` (lokale Epoch-Sekunden) nur so viele, wie noch Zeit ist."""
+        collected: List[ClockSample] = []
+        gap = 1.0 + 1.0 / self.samples
+        for idx in range(self.samples):
+            if deadline is not None and time.time() + self.timeout > deadline:
+                break
+            sample = self._sample()
+            if sample is not None:
+                collected.append(sample)
+            if idx < self.samples - 1:
+                if deadline is not None and time.time() + gap + self.timeout > deadline:
+                    break
+                # Sendezeitpunkte über die Sekundenbruchteile verteilen
+                time.sleep(gap)
+
+        if not collected:
+            self.logger.log("Keine Serverzeit verfügbar, nutze lokale Uhr.")
+            self.estimate = ClockEstimate(0.0, 0.5, 0.0, 0)
+            return self.estimate
+
+        rtt = statistics.median(sample.rtt for sample in collected)
+        bounds = offset_bounds(collected)
+        if bounds is None:
+            # Widersprüchliche Proben (z.B. Uhrsprung) -> grobe Schätzung über Mittelpunkte
+            offset = statistics.median(s.server_second + 0.5 - (s.sent + s.received) / 2 for s in collected)
+            self.estimate = ClockEstimate(offset, 0.5 + rtt / 2, rtt, len(collected))
+        else:
+            lo, hi = bounds
+            self.estimate = ClockEstimate((lo + hi) / 2, (hi - lo) / 2, rtt, len(collected))
+
+        self.logger.log(
+            f"Server-Uhr: Offset {self.estimate.offset_s * 1000:+.0f} ms "
+            f"(±{self.estimate.uncertainty_s * 1000:.0f} ms, RTT {self.estimate.rtt_s * 1000:.0f} ms, "
+            f"{self.estimate.samples} Proben)"
+        )
+        return self.estimate
+
+    def calibrate_in_background(self, deadline: Optional[float] = None) -> threading.Thread:
+        thread = threading.Thread(target=self.calibrate, args=(deadline,), daemon=True)
+        thread.start()
+        return thread
+
+    def server_to_local(self, server_ts: float) -> float:
+        if self.estimate is None:
+            self.calibrate()
+        return server_ts - self.estimate.offset_s
+
+
+class SubmitScheduler:
+    """Feuert eine Aktion so, dass der Request kurz nach Serverzeit `target` ankommt.
+
+    Grob schlafen, die letzten Millisekunden auf der monotonen Uhr aktiv warten.
+    """
+
+    def __init__(self, logger, clock: ServerClock, margin_s: float = 0.03, spin_s: float = 0.05) -> None:
+        self.logger = logger
+        self.clock = clock
+        self.margin_s = margin_s
+        self.spin_s = spin_s
+
+    def send_time(self, target: datetime) -> float:
+        estimate = self.clock.estimate or self.clock.calibrate()
+        # Ankunft nicht vor der Freigabe: halbe RTT abziehen, Unsicherheit + Marge draufschlagen
+        send_server = target.timestamp() - estimate.rtt_s / 2 + estimate.uncertainty_s + self.margin_s
+        return self.clock.server_to_local(send_server)
+
+    def run_at(self, target: datetime, action: Callable[[], object]):
+        send_local = self.send_time(target)
+        deadline = time.monotonic() + (send_local - time.time())
+
+        remaining = deadline - time.monotonic()
+        self.logger.log(f"Submit geplant in {remaining:.3f}s (Serverzeit {target.strftime('%H:%M:%S')}).")
+        if remaining > self.spin_s:
+            time.sleep(remaining - self.spin_s)
+        while time.monotonic() < deadline:
+            pass
+
+        # Tatsächlicher Sendezeitpunkt in Serverzeit gegen die Freigabe (nicht gegen den eigenen Plan)
+        sent_server = time.time() + self.clock.estimate.offset_s
+        self.logger.log(
+            f"Submit ausgelöst: {(sent_server - target.timestamp()) * 1000:+.0f} ms gegenüber Freigabe "
+            f"(Serverzeit, ±{self.clock.estimate.uncertainty_s * 1000:.0f} ms)."
+        )
+        return action()
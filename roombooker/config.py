@@ -10,6 +10,14 @@ URLS = {
     "vonroll_location_path": "/set/1",
 }
 
+# Ein Tag wird BOOKING_WINDOW_DAYS Tage im Voraus buchbar
+BOOKING_WINDOW_DAYS = 14
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
 HARDCODED_ROOMS = {
     "vonRoll: Gruppenraum 001": "1",
     "vonRoll: Gruppenraum 002": "2",
@@ -42,7 +50,14 @@ DEBUG_DIR = APP_DIR / "debug_screenshots"
 LOG_DIR = APP_DIR / "logs"
 LOG_FILE = LOG_DIR / "room_booker.log"
 CSV_EXPORT_FILE = APP_DIR / "alle_reservationen.csv"
+RESERVATION_DB_FILE = APP_DIR / "reservations.db"
+RESERVATION_CHANGES_FILE = APP_DIR / "reservation_changes.jsonl"
 LOGIC_OVERRIDE_FILE = APP_DIR / "logic_override.py"
+RESOURCE_RULES_FILE = APP_DIR / "resource_rules.json"
+SESSION_CACHE_FILE = APP_DIR / "session_cache.json"
+AVAILABILITY_CACHE_FILE = APP_DIR / "availability_cache.json"
+ROOM_CATALOG_FILE = APP_DIR / "room_catalog.json"
+CANCELLATION_STATS_FILE = APP_DIR / "cancellation_stats.json"
 
 DEBUG_DIR.mkdir(parents=True, exist_ok=True)
 LOG_DIR.mkdir(parents=True, exist_ok=True)
@@ -56,6 +71,10 @@ if "PLAYWRIGHT_BROWSERS_PATH" not in os.environ:
 # --- BUGFIX LEANDRO END ---
 
 
+def session_file_for(email: str) -> Path:
+    return APP_DIR / f"session_{email.replace('@', '_')}.json"
+
+
 def get_version() -> str:
     if VERSION_FILE.exists():
         return VERSION_FILE.read_text(encoding="utf-8").strip()
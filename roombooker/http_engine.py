@@ -0,0 +1,385 @@
+import http.client
+import json
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from dataclasses import dataclass, field
+from datetime import datetime
+from html.parser import HTMLParser
+from http.cookiejar import Cookie, CookieJar
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from roombooker.availability import AvailabilityCache, AvailabilitySnapshot, to_minutes
+from roombooker.config import URLS, USER_AGENT, session_file_for
+from roombooker.models import Account
+from roombooker.utils import slot_from_task
+
+REQUIRED_FIELD_IDS = ("event_room", "event_startDate", "event_duration", "event_title")
+LOGIN_URL_MARKERS = ("login", "wayf", "eduid")
+LOGGED_IN_MARKER = 'id="navbarUser"'
+
+
+class FormLayoutChanged(Exception):
+    pass
+
+
+class SessionExpired(Exception):
+    pass
+
+
+class SubmitOutcomeUnknown(Exception):
+    """POST ist raus, aber keine Antwort: die Buchung kann angekommen sein."""
+
+    def __init__(self, room_name: str, cause: Exception) -> None:
+        super().__init__(f"Antwort auf POST für {room_name} fehlt: {cause}")
+        self.room_name = room_name
+
+
+@dataclass
+class ParsedForm:
+    action: str = ""
+    method: str = "get"
+    fields: List[Tuple[str, str]] = field(default_factory=list)
+    ids: Dict[str, str] = field(default_factory=dict)
+    radios: Dict[str, List[str]] = field(default_factory=dict)
+    options: Dict[str, List[Tuple[str, str]]] = field(default_factory=dict)
+    submitter: Optional[Tuple[str, str]] = None
+
+    @property
+    def token_name(self) -> Optional[str]:
+        for name, _ in self.fields:
+            if name.endswith("[_token]") or name == "_token":
+                return name
+        return None
+
+    def validate(self) -> None:
+        missing = [field_id for field_id in REQUIRED_FIELD_IDS if field_id not in self.ids]
+        if missing or not self.token_name:
+            raise FormLayoutChanged(f"Formular unbekannt (fehlend: {missing or ['_token']})")
+
+
+class EventFormParser(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.forms: List[ParsedForm] = []
+        self._form: Optional[ParsedForm] = None
+        self._select: Optional[Dict[str, object]] = None
+        self._option_value: Optional[str] = None
+        self._option_text = ""
+        self._textarea: Optional[Dict[str, str]] = None
+
+    def handle_starttag(self, tag, attrs):
+        attr = {key: (value or "") for key, value in attrs}
+        if tag == "form":
+            self._form = ParsedForm(action=attr.get("action", ""), method=attr.get("method", "get").lower())
+            self.forms.append(self._form)
+            return
+        if self._form is None:
+            return
+        name = attr.get("name")
+        if name and attr.get("id"):
+            self._form.ids[attr["id"]] = name
+
+        if tag == "input" and name:
+            kind = attr.get("type", "text").lower()
+            if kind in ("submit", "button", "image", "reset", "file"):
+                return
+            if kind == "radio":
+                self._form.radios.setdefault(name, []).append(attr.get("value", "on"))
+            if kind in ("radio", "checkbox") and "checked" not in attr:
+                return
+            self._form.fields.append((name, attr.get("value", "on" if kind in ("radio", "checkbox") else "")))
+        elif tag == "button" and name and attr.get("type", "submit").lower() == "submit":
+            if self._form.submitter is None:
+                self._form.submitter = (name, attr.get("value", ""))
+        elif tag == "select" and name:
+            self._select = {"name": name, "selected": None, "first": None}
+        elif tag == "option" and self._select is not None:
+            # </option> ist optional
+            self._flush_option()
+            self._option_value = attr.get("value")
+            self._option_text = ""
+            if self._option_value is not None and self._select["first"] is None:
+                self._select["first"] = self._option_value
+            if "selected" in attr:
+                self._select["selected"] = self._option_value
+        elif tag == "textarea" and name:
+            self._textarea = {"name": name, "text": ""}
+
+    def handle_data(self, data):
+        if self._textarea is not None:
+            self._textarea["text"] += data
+        elif self._option_value is not None:
+            self._option_text += data
+
+    def _flush_option(self) -> None:
+        if self._select is not None and self._form is not None and self._option_value:
+            self._form.options.setdefault(self._select["name"], []).append(
+                (self._option_text.strip(), self._option_value)
+            )
+        self._option_value = None
+
+    def handle_endtag(self, tag):
+        if tag == "form":
+            self._form = None
+        elif tag == "option":
+            self._flush_option()
+        elif tag == "select" and self._select is not None and self._form is not None:
+            self._flush_option()
+            value = self._select["selected"] if self._select["selected"] is not None else self._select["first"]
+            self._form.fields.append((self._select["name"], value or ""))
+            self._select = None
+        elif tag == "textarea" and self._textarea is not None and self._form is not None:
+            self._form.fields.append((self._textarea["name"], self._textarea["text"]))
+            self._textarea = None
+
+
+def parse_event_form(html: str) -> ParsedForm:
+    parser = EventFormParser()
+    parser.feed(html)
+    parser.close()
+    for form in parser.forms:
+        if "event_room" in form.ids:
+            form.validate()
+            return form
+    raise FormLayoutChanged("Kein Formular mit #event_room gefunden")
+
+
+def load_cookie_jar(session_path: Path) -> CookieJar:
+    jar = CookieJar()
+    if not session_path.exists():
+        raise SessionExpired(f"Keine Session-Datei: {session_path.name}")
+    try:
+        state = json.loads(session_path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError as exc:
+        raise SessionExpired(f"Session-Datei defekt: {exc}")
+
+    for item in state.get("cookies", []):
+        domain = item.get("domain", "")
+        expires = item.get("expires", -1)
+        jar.set_cookie(
+            Cookie(
+                version=0,
+                name=item["name"],
+                value=item["value"],
+                port=None,
+                port_specified=False,
+                domain=domain,
+                domain_specified=domain.startswith("."),
+                domain_initial_dot=domain.startswith("."),
+                path=item.get("path", "/"),
+                path_specified=True,
+                secure=bool(item.get("secure")),
+                expires=int(expires) if expires and expires > 0 else None,
+                discard=not (expires and expires > 0),
+                comment=None,
+                comment_url=None,
+                rest={"HttpOnly": ""} if item.get("httpOnly") else {},
+            )
+        )
+    return jar
+
+
+class HttpSession:
+    def __init__(self, session_path: Path, timeout: float = 15.0) -> None:
+        self.session_path = session_path
+        self.timeout = timeout
+        self.jar = load_cookie_jar(session_path)
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.jar))
+        self.form: Optional[ParsedForm] = None
+
+    def request(self, url: str, pairs: Optional[List[Tuple[str, str]]] = None) -> Tuple[str, str]:
+        body = None
+        if pairs is not None:
+            body = urllib.parse.urlencode(pairs).encode("utf-8")
+        req = urllib.request.Request(url, data=body, headers={"User-Agent": USER_AGENT, "Accept-Language": "de-CH"})
+        with self.opener.open(req, timeout=self.timeout) as resp:
+            charset = resp.headers.get_content_charset() or "utf-8"
+            return resp.geturl(), resp.read().decode(charset, errors="replace")
+
+    def load_form(self) -> ParsedForm:
+        url, html = self.request(URLS["event_add"])
+        if "/select" in url:
+            self.request(URLS["room_base"] + URLS["vonroll_location_path"])
+            url, html = self.request(URLS["event_add"])
+        if any(marker in url for marker in LOGIN_URL_MARKERS) or LOGGED_IN_MARKER not in html:
+            raise SessionExpired("Session abgelaufen (nicht eingeloggt)")
+        self.form = parse_event_form(html)
+        return self.form
+
+
+def build_payload(form: ParsedForm, task: Dict[str, object], room_id: str, summary: str) -> List[Tuple[str, str]]:
+    t1 = datetime.strptime(task["start"], "%H:%M")
+    t2 = datetime.strptime(task["end"], "%H:%M")
+    overrides = {
+        form.ids["event_room"]: str(room_id),
+        form.ids["event_startDate"]: f"{task['date']} {task['start']}",
+        form.ids["event_duration"]: str(int((t2 - t1).total_seconds() / 60)),
+        form.ids["event_title"]: summary,
+    }
+    purpose = next((name for name in form.radios if name.endswith("[purpose]")), None)
+    if purpose and "Other" in form.radios[purpose]:
+        overrides[purpose] = "Other"
+
+    pairs = [(name, overrides.pop(name, value)) for name, value in form.fields]
+    pairs.extend(overrides.items())
+    if form.submitter:
+        pairs.append(form.submitter)
+    return pairs
+
+
+class HttpBookingEngine:
+    """Bucht ohne Browser: Cookies aus session_<email>.json, Formular einmal laden, dann direkt POSTen.
+
+    Bei abgelaufener Session oder geändertem Formular übernimmt die Playwright-Engine.
+    """
+
+    def __init__(self, logger, fallback=None) -> None:
+        self.logger = logger
+        self.fallback = fallback
+        self.availability = AvailabilityCache(logger)
+        self._sessions: Dict[str, HttpSession] = {}
+
+    def _get_fallback(self):
+        if self.fallback is None:
+            from roombooker.booking_engine import BookingEngine
+
+            self.fallback = BookingEngine(self.logger)
+        return self.fallback
+
+    def close(self) -> None:
+        if self.fallback is not None:
+            self.fallback.close()
+
+    def session_for(self, acc: Account) -> HttpSession:
+        session = self._sessions.get(acc.email)
+        if session is None:
+            session = HttpSession(session_file_for(acc.email))
+            session.load_form()
+            self._sessions[acc.email] = session
+        return session
+
+    def submit(self, session: HttpSession, room_name: str, pairs: List[Tuple[str, str]]) -> bool:
+        started = time.monotonic()
+        action = urllib.parse.urljoin(URLS["event_add"], session.form.action)
+        try:
+            url, html = session.request(action, pairs=pairs)
+        except urllib.error.HTTPError as exc:
+            # Server hat geantwortet (4xx/5xx) -> eindeutig nicht gebucht, kein Kalender-Check nötig
+            exc.close()
+            self.logger.log(f"POST {room_name} abgelehnt: HTTP {exc.code}")
+            return False
+        except (OSError, http.client.HTTPException) as exc:
+            # Nur Transportfehler: Request kann angekommen sein
+            raise SubmitOutcomeUnknown(room_name, exc)
+        self.logger.log(f"POST {room_name}: {int((time.monotonic() - started) * 1000)} ms")
+        if any(marker in url for marker in LOGIN_URL_MARKERS):
+            raise SessionExpired("Session beim Absenden abgelaufen")
+        if "/event/add" not in url:
+            return True
+
+        lowered = html.lower()
+        if "konflikt" in lowered or "belegt" in lowered:
+            self.logger.log(f"Raum {room_name} ist belegt.")
+        else:
+            self.logger.log(f"Fehler bei {room_name} (Keine Bestätigung).")
+        # Antwort enthält ein frisches Formular (neuer Token) für den nächsten Raum
+        session.form = parse_event_form(html)
+        return False
+
+    def verify_booked(self, task: Dict[str, object], room_name: str) -> Optional[bool]:
+        """Nach unklarem Submit im Kalender nachsehen; None = Kalender auch nicht lesbar."""
+        from roombooker.calendar_http import HttpCalendarScanner
+
+        try:
+            occupancy = HttpCalendarScanner(self.logger).scan_day(task["date"])
+        except (OSError, http.client.HTTPException, ValueError) as exc:
+            self.logger.log(f"Kalender zur Kontrolle nicht lesbar: {exc}")
+            return None
+        snapshot = AvailabilitySnapshot(task["date"], fetched_at=time.time(), rooms=occupancy)
+        self.availability.put(snapshot)
+        return not snapshot.is_free(room_name, to_minutes(task["start"]), to_minutes(task["end"]))
+
+    def execute_booking(
+        self,
+        tasks: List[Dict[str, object]],
+        accounts: List[Account],
+        preferred_rooms: List[str],
+        simulation_mode: bool,
+        summary: str = "Lernen",
+    ) -> List[Dict[str, object]]:
+        self.logger.log("--- START: HTTP BUCHUNG ---")
+        if simulation_mode:
+            self.logger.log("SIMULATIONS-MODUS (keine Buchung)")
+
+        successes: List[Dict[str, object]] = []
+        for idx, task in enumerate(tasks):
+            acc = accounts[idx % len(accounts)]
+            booked_room = None
+            tried: List[str] = []
+            try:
+                session = self.session_for(acc)
+                for room_name in preferred_rooms:
+                    room_id = task["all_rooms"].get(room_name)
+                    if not room_id:
+                        continue
+                    self.logger.log(f"Versuche (HTTP): {task['start']}-{task['end']} ({room_name}) mit {acc.email}")
+                    if simulation_mode:
+                        build_payload(session.form, task, room_id, summary)
+                        self.logger.log("SIMULATION OK.")
+                        booked_room = room_name
+                        break
+                    if self.submit(session, room_name, build_payload(session.form, task, room_id, summary)):
+                        self.logger.log(f"ERFOLG: {room_name} gebucht!")
+                        booked_room = room_name
+                        break
+                    # Erst mit echter Antwort gilt der Raum als versucht (SessionExpired -> Raum nochmal)
+                    tried.append(room_name)
+            except SubmitOutcomeUnknown as exc:
+                # Kein zweiter Versuch ins Blaue: sonst droht eine Doppelbuchung
+                self._sessions.pop(acc.email, None)
+                booked = self.verify_booked(task, exc.room_name)
+                if booked:
+                    self.logger.log(f"{exc} - laut Kalender belegt, gilt als gebucht.")
+                    booked_room = exc.room_name
+                elif booked is None:
+                    self.logger.log(f"{exc} - Ausgang unbekannt, Block wird nicht erneut gebucht.")
+                    continue
+                else:
+                    self.logger.log(f"{exc} - laut Kalender nicht gebucht, restliche Räume über Browser...")
+                    # Raum mit unklarem POST trotzdem nicht nochmal: die Buchung kann verspätet ankommen
+                    tried.append(exc.room_name)
+                    successes.extend(self._fallback_rooms(task, acc, preferred_rooms, tried, simulation_mode, summary))
+                    continue
+            except (SessionExpired, FormLayoutChanged, OSError, http.client.HTTPException) as exc:
+                self.logger.log(f"HTTP-Pfad nicht möglich ({exc}). Fallback auf Browser...")
+                self._sessions.pop(acc.email, None)
+                successes.extend(self._fallback_rooms(task, acc, preferred_rooms, tried, simulation_mode, summary))
+                continue
+
+            if booked_room is None:
+                self.logger.log(f"FEHLER: Block {task['start']} konnte nicht gebucht werden.")
+                continue
+            successes.append(slot_from_task(task, booked_room))
+        if not simulation_mode:
+            self.availability.invalidate_slots(successes)
+        self.logger.log("--- PROZESS ENDE ---")
+        return successes
+
+    def _fallback_rooms(
+        self,
+        task: Dict[str, object],
+        acc: Account,
+        preferred_rooms: List[str],
+        tried: List[str],
+        simulation_mode: bool,
+        summary: str,
+    ) -> List[Dict[str, object]]:
+        # Nur Räume, die per HTTP noch nicht abgeschickt wurden
+        remaining = [room for room in preferred_rooms if room not in tried]
+        if not remaining:
+            self.logger.log(f"FEHLER: Block {task['start']} konnte nicht gebucht werden.")
+            return []
+        return self._get_fallback().execute_booking([task], [acc], remaining, simulation_mode, summary)
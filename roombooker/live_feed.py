@@ -0,0 +1,177 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+from playwright.async_api import async_playwright
+
+from roombooker.availability import AvailabilitySnapshot
+from roombooker.browser_pool import CONTEXT_ARGS, LAUNCH_ARGS
+from roombooker.calendar_http import calendar_url, parse_event_payloads
+from roombooker.config import URLS
+from roombooker.watcher import CancellationWatcher, WatchTarget, freed_runs
+
+BINDING_NAME = "roombookerPush"
+
+# Beobachtet die Buchungs-Rects und schickt nur Änderungen (added/removed Payloads) nach Python.
+# Der Hintergrund-Refresh holt die Seite per fetch und tauscht das Kalender-SVG aus, ohne Reload.
+LIVE_FEED_SCRIPT = """
+(() => {
+  if (window.top !== window) return;
+  const day = new URLSearchParams(location.search).get('day');
+  if (!day || !location.pathname.startsWith('/event')) return;
+  const SEL = 'rect[data-event-event-value]';
+  let known = null;
+  let detached = false;
+  const collect = (root) => new Set(
+    Array.from(root.querySelectorAll(SEL)).map(el => el.getAttribute('data-event-event-value'))
+  );
+  const emit = (current) => {
+    if (known === null) {
+      known = current;
+      window.%(binding)s({day, initial: true, added: [...current], removed: []});
+      return;
+    }
+    const added = [...current].filter(x => !known.has(x));
+    const removed = [...known].filter(x => !current.has(x));
+    if (!added.length && !removed.length) return;
+    known = current;
+    window.%(binding)s({day, initial: false, added, removed});
+  };
+  let pending = null;
+  const onMutation = () => {
+    if (detached || pending) return;
+    pending = setTimeout(() => { pending = null; emit(collect(document)); }, 30);
+  };
+  const calendar = (root) => {
+    const rect = root.querySelector(SEL);
+    return rect ? rect.closest('svg') : root.querySelector('main svg');
+  };
+  const refresh = async () => {
+    try {
+      const resp = await fetch(location.href, {credentials: 'same-origin', cache: 'no-store'});
+      if (!resp.ok || resp.redirected) return;
+      const doc = new DOMParser().parseFromString(await resp.text(), 'text/html');
+      const fresh = calendar(doc), live = calendar(document);
+      if (fresh && live) {
+        live.replaceWith(document.importNode(fresh, true));
+      } else {
+        // Kein austauschbarer Kalender im DOM -> ab jetzt nur noch aus dem Fetch melden
+        detached = true;
+        emit(collect(doc));
+      }
+    } catch (e) {}
+  };
+  document.addEventListener('DOMContentLoaded', () => {
+    emit(collect(document));
+    new MutationObserver(onMutation).observe(document.body, {
+      subtree: true, childList: true, attributes: true, attributeFilter: ['data-event-event-value'],
+    });
+    setInterval(refresh, %(refresh_ms)d);
+  });
+})();
+"""
+
+
+class LiveAvailabilityFeed:
+    """Ein offener Kalender-Tab pro beobachtetem Tag, Änderungen kommen per expose_binding.
+
+    Freigewordene Abschnitte gehen direkt an CancellationWatcher.book_run. Gebucht wird in
+    einem eigenen Thread, weil die Sync-Engine nicht im asyncio-Loop laufen darf.
+    """
+
+    def __init__(
+        self,
+        logger,
+        watcher: CancellationWatcher,
+        refresh_ms: int = 2000,
+        session_path: Optional[Path] = None,
+        on_booked: Optional[Callable[[str, List[Dict[str, object]]], None]] = None,
+    ) -> None:
+        self.logger = logger
+        self.watcher = watcher
+        self.refresh_ms = refresh_ms
+        self.session_path = session_path
+        self.on_booked = on_booked
+        self.booked: Dict[str, List[Dict[str, object]]] = {}
+        self._payloads: Dict[str, Set[str]] = {}
+        self._targets: List[WatchTarget] = []
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def _book(self, target: WatchTarget, room: str, run) -> None:
+        successes = self.watcher.book_run(target, room, run)
+        if successes:
+            self.booked[target.job_id] = successes
+            if self.on_booked is not None:
+                self.on_booked(target.job_id, successes)
+        else:
+            # Nicht geklappt -> Job bleibt beobachtet
+            self.booked.pop(target.job_id, None)
+
+    def handle_push(self, message: Dict[str, object]) -> None:
+        received = time.monotonic()
+        date_str = datetime.strptime(str(message["day"]), "%Y-%m-%d").strftime("%d.%m.%Y")
+        previous = self._payloads.get(date_str, set())
+        current = (previous - set(message["removed"])) | set(message["added"])
+        self._payloads[date_str] = current
+        after = parse_event_payloads(current)
+        self.watcher.cache.put(AvailabilitySnapshot(date_str, fetched_at=time.time(), rooms=after))
+        if message.get("initial") or not message["removed"]:
+            return
+
+        before = parse_event_payloads(previous)
+        self.logger.log(f"Live: {len(message['removed'])} Buchung(en) am {date_str} entfernt.")
+        for target in self._targets:
+            if target.date != date_str or target.job_id in self.booked:
+                continue
+            for room in target.rooms:
+                runs = freed_runs(before.get(room, []), after.get(room, []), target.start_m, target.end_m)
+                if not runs:
+                    continue
+                run = max(runs, key=lambda r: r[1] - r[0])
+                # Platzhalter, damit ein zweiter Push nicht doppelt bucht
+                self.booked[target.job_id] = []
+                self._executor.submit(self._book, target, room, run)
+                self.logger.log(f"Live: Buchung {room} nach {(time.monotonic() - received) * 1000:.0f} ms ausgelöst.")
+                break
+
+    async def _on_binding(self, source, message) -> None:
+        self.handle_push(message)
+
+    async def run_async(self, targets: List[WatchTarget], stop: Optional[asyncio.Event] = None) -> None:
+        self._targets = list(targets)
+        days = sorted({datetime.strptime(t.date, "%d.%m.%Y").date() for t in targets})
+        if not days:
+            return
+        stop = stop or asyncio.Event()
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True, args=LAUNCH_ARGS)
+            try:
+                context_args = dict(CONTEXT_ARGS)
+                if self.session_path is not None and self.session_path.exists():
+                    context_args["storage_state"] = str(self.session_path)
+                context = await browser.new_context(**context_args)
+                await context.expose_binding(BINDING_NAME, self._on_binding)
+                await context.add_init_script(
+                    LIVE_FEED_SCRIPT % {"binding": BINDING_NAME, "refresh_ms": self.refresh_ms}
+                )
+                first = await context.new_page()
+                await first.goto(URLS["room_base"] + URLS["vonroll_location_path"], wait_until="domcontentloaded")
+                pages = [first] + [await context.new_page() for _ in days[1:]]
+                for page, day in zip(pages, days):
+                    await page.goto(calendar_url(day), wait_until="domcontentloaded")
+                self.logger.log(f"Live-Feed aktiv für {len(days)} Tag(e), Refresh alle {self.refresh_ms} ms.")
+                await stop.wait()
+            finally:
+                await browser.close()
+
+    def run(self, targets: List[WatchTarget]) -> Dict[str, List[Dict[str, object]]]:
+        try:
+            asyncio.run(self.run_async(targets))
+        except KeyboardInterrupt:
+            self.logger.log("Live-Feed beendet.")
+        finally:
+            self._executor.shutdown(wait=True)
+        return {job_id: slots for job_id, slots in self.booked.items() if slots}
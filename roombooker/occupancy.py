@@ -0,0 +1,59 @@
+from array import array
+from typing import Dict, Iterable, List
+
+from roombooker.availability import Occupancy
+
+MINUTES_PER_DAY = 24 * 60
+
+
+class RoomDay:
+    """Ein Raum an einem Tag, vorberechnet in Minutenauflösung.
+
+    next_busy[t]: erste belegte Minute >= t (1440 = bis Tagesende frei)
+    busy_prefix[t]: Anzahl belegter Minuten in [0, t)
+    """
+
+    __slots__ = ("next_busy", "busy_prefix")
+
+    def __init__(self, bookings: Iterable[Dict[str, int]]) -> None:
+        busy = bytearray(MINUTES_PER_DAY)
+        for booking in bookings:
+            start = max(0, booking["start_m"])
+            end = min(MINUTES_PER_DAY, booking["end_m"])
+            if end > start:
+                busy[start:end] = b"\x01" * (end - start)
+
+        self.busy_prefix = array("H", [0]) * (MINUTES_PER_DAY + 1)
+        for minute in range(MINUTES_PER_DAY):
+            self.busy_prefix[minute + 1] = self.busy_prefix[minute] + busy[minute]
+
+        self.next_busy = array("H", [MINUTES_PER_DAY]) * (MINUTES_PER_DAY + 1)
+        for minute in range(MINUTES_PER_DAY - 1, -1, -1):
+            self.next_busy[minute] = minute if busy[minute] else self.next_busy[minute + 1]
+
+
+class OccupancyIndex:
+    """O(1)-Abfragen auf der Belegung eines Tages, einmal pro Scan aufgebaut statt pro Kandidat sortiert."""
+
+    def __init__(self, rooms_data: Occupancy) -> None:
+        self.rooms: List[str] = list(rooms_data)
+        self._days: Dict[str, RoomDay] = {room: RoomDay(bookings) for room, bookings in rooms_data.items()}
+        self._empty = RoomDay([])
+
+    def _day(self, room: str) -> RoomDay:
+        return self._days.get(room, self._empty)
+
+    def next_busy(self, room: str, minute: int) -> int:
+        return self._day(room).next_busy[min(max(minute, 0), MINUTES_PER_DAY)]
+
+    def free_run(self, room: str, minute: int, limit: int = MINUTES_PER_DAY) -> int:
+        """Länge des freien Abschnitts ab `minute`, höchstens bis `limit`."""
+        return max(0, min(self.next_busy(room, minute), limit) - minute)
+
+    def busy_minutes(self, room: str, start_m: int, end_m: int) -> int:
+        prefix = self._day(room).busy_prefix
+        start_m, end_m = max(start_m, 0), min(end_m, MINUTES_PER_DAY)
+        return prefix[end_m] - prefix[start_m] if end_m > start_m else 0
+
+    def is_free(self, room: str, start_m: int, end_m: int) -> bool:
+        return self.busy_minutes(room, start_m, end_m) == 0
@@ -0,0 +1,176 @@
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from roombooker.availability import Occupancy
+from roombooker.models import Account
+from roombooker.planner import MIN_BLOCK_MIN, frontier_for, parse_policy, plan_chain, search_chain
+
+# Minuten, die ein Account pro Tag reservieren darf
+ACCOUNT_DAILY_CAP_MIN = int(os.environ.get("ROOMBOOKER_ACCOUNT_DAILY_MIN", "240"))
+
+RESERVATION_TIME_RE = re.compile(r"(\d{1,2}\.\d{1,2}\.\d{4})\D+(\d{1,2}):(\d{2})\D+(\d{1,2}):(\d{2})")
+
+
+@dataclass
+class PlannedJob:
+    job_id: str
+    date: str
+    start_m: int
+    end_m: int
+    rooms_data: Occupancy
+    max_accounts: Optional[int] = None
+    weights: Dict[str, float] = field(default_factory=dict)
+    # E-Mails, die der Job nutzen darf (None = alle aktiven)
+    accounts: Optional[List[str]] = None
+
+
+@dataclass
+class GlobalPlan:
+    steps: Dict[str, List[Dict[str, object]]] = field(default_factory=dict)
+    dropped: Dict[str, List[Dict[str, object]]] = field(default_factory=dict)
+    usage: Dict[Tuple[str, str], int] = field(default_factory=dict)
+    warnings: List[str] = field(default_factory=list)
+
+    @property
+    def covered_min(self) -> int:
+        return sum(step["duration"] for steps in self.steps.values() for step in steps)
+
+
+class AccountLedger:
+    """Verbrauchte Minuten und belegte Zeiten pro (Tag, Account)."""
+
+    def __init__(self, accounts: Iterable[Account], daily_cap_min: int = ACCOUNT_DAILY_CAP_MIN) -> None:
+        self.emails = [acc.email for acc in accounts if acc.active]
+        self.daily_cap_min = daily_cap_min
+        self.used: Dict[Tuple[str, str], int] = {}
+        self.intervals: Dict[Tuple[str, str], List[Tuple[int, int]]] = {}
+
+    def add(self, date: str, email: str, start_m: int, end_m: int) -> None:
+        key = (date, email)
+        self.used[key] = self.used.get(key, 0) + end_m - start_m
+        self.intervals.setdefault(key, []).append((start_m, end_m))
+
+    def load_reservations(self, rows: Iterable[Dict[str, str]]) -> None:
+        """Bestehende Reservationen (account + raw_time) zählen gegen das Tageslimit."""
+        for row in rows:
+            match = RESERVATION_TIME_RE.search(row["raw_time"])
+            if not match:
+                continue
+            day, month, year = (int(part) for part in match.group(1).split("."))
+            start_m = int(match.group(2)) * 60 + int(match.group(3))
+            end_m = int(match.group(4)) * 60 + int(match.group(5))
+            if row["account"] in self.emails and end_m > start_m:
+                self.add(f"{day:02d}.{month:02d}.{year:04d}", row["account"], start_m, end_m)
+
+    def remaining(self, date: str, email: str) -> int:
+        return max(0, self.daily_cap_min - self.used.get((date, email), 0))
+
+    def is_free(self, date: str, email: str, start_m: int, end_m: int) -> bool:
+        return all(end_m <= s or start_m >= e for s, e in self.intervals.get((date, email), []))
+
+    def usable(self, date: str, pool: Optional[Iterable[str]] = None) -> List[str]:
+        allowed = set(self.emails if pool is None else pool)
+        return [email for email in self.emails if email in allowed and self.remaining(date, email) >= MIN_BLOCK_MIN]
+
+
+def _with_planned(rooms_data: Occupancy, planned: Iterable[Dict[str, object]]) -> Occupancy:
+    merged = {room: list(bookings) for room, bookings in rooms_data.items()}
+    for step in planned:
+        if step["room"] in merged:
+            merged[step["room"]].append({"start_m": step["start"], "end_m": step["end"]})
+    return merged
+
+
+def assign_accounts(
+    ledger: AccountLedger,
+    date: str,
+    chain: List[Dict[str, object]],
+    pool: Optional[Iterable[str]] = None,
+    max_accounts: Optional[int] = None,
+) -> Tuple[List[Dict[str, object]], List[Dict[str, object]]]:
+    """Best-Fit: längster Block zuerst an den Account mit dem knappsten noch passenden Restbudget.
+
+    Passt kein Account ganz, wird der Block auf das größte Restbudget gekürzt (mind. 30 min);
+    der Rest geht als eigener Block an den nächsten Account oder landet in `dropped`.
+    Nur Accounts aus `pool`; sind schon `max_accounts` verschiedene vergeben, nur noch diese.
+    """
+    assigned, dropped = [], []
+    pool = None if pool is None else list(pool)
+    taken: List[str] = []
+    pending = sorted(chain, key=lambda s: -s["duration"])
+    while pending:
+        step = pending.pop(0)
+        start, end = step["start"], step["end"]
+        candidates = ledger.usable(date, pool)
+        if max_accounts is not None and len(taken) >= max_accounts:
+            candidates = [email for email in candidates if email in taken]
+        free = [email for email in candidates if ledger.is_free(date, email, start, end)]
+        fitting = [email for email in free if ledger.remaining(date, email) >= end - start]
+        if fitting:
+            email = min(fitting, key=lambda e: ledger.remaining(date, e))
+        elif free:
+            email = max(free, key=lambda e: ledger.remaining(date, e))
+            end = start + ledger.remaining(date, email)
+            tail = dict(step, start=end, duration=step["end"] - end)
+            if tail["duration"] >= MIN_BLOCK_MIN:
+                pending.append(tail)
+                pending.sort(key=lambda s: -s["duration"])
+            else:
+                dropped.append(tail)
+            step = dict(step, end=end, duration=end - start)
+        else:
+            dropped.append(step)
+            continue
+        ledger.add(date, email, start, end)
+        if email not in taken:
+            taken.append(email)
+        assigned.append(dict(step, account=email))
+    assigned.sort(key=lambda s: s["start"])
+    return assigned, dropped
+
+
+def optimize_jobs(
+    jobs: List[PlannedJob],
+    accounts: List[Account],
+    daily_cap_min: int = ACCOUNT_DAILY_CAP_MIN,
+    reservations: Iterable[Dict[str, str]] = (),
+    budget_ms: Optional[float] = None,
+) -> GlobalPlan:
+    """Ein konfliktfreier Plan für alle Jobs: kein Raum doppelt, kein Account über dem Tageslimit.
+
+    Jobs eines Tages teilen sich Ledger und Belegung: was ein Job plant, ist für den nächsten
+    belegt. Die Kette pro Job bleibt die exakte DP, begrenzt auf die noch nutzbaren Accounts
+    aus dem eigenen Pool des Jobs und auf max_accounts.
+    Kürzere Fenster zuerst, weil sie am wenigsten Ausweichmöglichkeiten haben. Mit budget_ms
+    teilen sich die Jobs das Zeitbudget (Branch-and-Bound statt DP). Ist in den Gewichten eine
+    "policy" gesetzt, wählt pick() aus der Pareto-Front statt der gewichteten DP.
+    """
+    ledger = AccountLedger(accounts, daily_cap_min)
+    ledger.load_reservations(reservations)
+    plan = GlobalPlan()
+    planned_by_date: Dict[str, List[Dict[str, object]]] = {}
+    for job in sorted(jobs, key=lambda j: (j.date, j.end_m - j.start_m, j.start_m)):
+        usable = len(ledger.usable(job.date, job.accounts))
+        if job.max_accounts is not None:
+            usable = min(usable, job.max_accounts)
+        if usable <= 0:
+            plan.steps[job.job_id] = []
+            continue
+        rooms_data = _with_planned(job.rooms_data, planned_by_date.get(job.date, []))
+        policy, limits = parse_policy(job.weights, plan.warnings)
+        if policy is not None:
+            picked = frontier_for(rooms_data, job.start_m, job.end_m, usable).pick(policy, **limits)
+            chain = list(picked.chain) if picked else []
+        elif budget_ms is None:
+            chain = plan_chain(rooms_data, job.start_m, job.end_m, usable, job.weights).chain
+        else:
+            chain = search_chain(rooms_data, job.start_m, job.end_m, usable, budget_ms / len(jobs), job.weights).chain
+        assigned, dropped = assign_accounts(ledger, job.date, chain, job.accounts, job.max_accounts)
+        plan.steps[job.job_id] = assigned
+        if dropped:
+            plan.dropped[job.job_id] = dropped
+        planned_by_date.setdefault(job.date, []).extend(assigned)
+    plan.usage = dict(ledger.used)
+    return plan
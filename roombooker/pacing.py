@@ -0,0 +1,112 @@
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from roombooker.config import URLS
+from roombooker.utils import human_type
+
+# Zählt offene fetch/XHR-Requests, damit wir auf das Ende von Change-Handlern warten können
+PENDING_REQUESTS_SCRIPT = """
+(() => {
+    if (window.__rbPending !== undefined) return;
+    window.__rbPending = 0;
+    const origFetch = window.fetch;
+    if (origFetch) {
+        window.fetch = function() {
+            window.__rbPending++;
+            return origFetch.apply(this, arguments).finally(() => { window.__rbPending--; });
+        };
+    }
+    const origSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        window.__rbPending++;
+        this.addEventListener('loadend', () => { window.__rbPending--; }, { once: true });
+        return origSend.apply(this, arguments);
+    };
+})();
+"""
+
+SETTLED_JS = "() => !(window.__rbPending > 0) && document.readyState !== 'loading'"
+
+LOGIN_DONE_SELECTOR = "#navbarUser"
+LOGIN_FORM_SELECTOR = "#username"
+
+
+@dataclass(frozen=True)
+class PacingProfile:
+    name: str
+    jitter_min: float = 0.0
+    jitter_max: float = 0.0
+    slow_mo: int = 0
+    type_like_human: bool = False
+
+
+PROFILES: Dict[str, PacingProfile] = {
+    "fast": PacingProfile("fast"),
+    "human": PacingProfile("human", jitter_min=0.3, jitter_max=1.0, slow_mo=50, type_like_human=True),
+}
+
+
+class Pacer:
+    """Wartet auf echte Signale (Navigation, Selektoren, offene Requests) statt auf feste Sleeps.
+
+    Das Profil "human" legt optional Jitter und slow_mo obendrauf.
+    """
+
+    def __init__(self, profile: str = "fast", timeout_ms: int = 15000) -> None:
+        self.profile = PROFILES.get(profile, PROFILES["fast"])
+        self.timeout_ms = timeout_ms
+
+    @staticmethod
+    def from_env() -> "Pacer":
+        return Pacer(os.environ.get("ROOMBOOKER_PACING", "fast"))
+
+    def jitter(self) -> None:
+        if self.profile.jitter_max > 0:
+            time.sleep(random.uniform(self.profile.jitter_min, self.profile.jitter_max))
+
+    def type(self, page, selector: str, text: str) -> None:
+        if self.profile.type_like_human:
+            human_type(page, selector, text)
+        else:
+            page.fill(selector, text)
+
+    def settle(self, page, timeout_ms: Optional[int] = None) -> bool:
+        try:
+            page.wait_for_function(SETTLED_JS, timeout=timeout_ms or self.timeout_ms)
+        except Exception:
+            return False
+        self.jitter()
+        return True
+
+    def wait_for_url(self, page, predicate: Callable[[str], bool], timeout_ms: Optional[int] = None) -> bool:
+        try:
+            page.wait_for_url(predicate, wait_until="domcontentloaded", timeout=timeout_ms or self.timeout_ms)
+        except Exception:
+            return False
+        self.jitter()
+        return True
+
+    def wait_for_login_prompt(self, page, timeout_ms: Optional[int] = None) -> bool:
+        # Nach dem Trigger-Klick landen wir entweder im IdP-Formular oder sind schon eingeloggt
+        try:
+            page.wait_for_selector(
+                f"{LOGIN_FORM_SELECTOR}, {LOGIN_DONE_SELECTOR}",
+                state="visible",
+                timeout=timeout_ms or self.timeout_ms,
+            )
+        except Exception:
+            return False
+        return True
+
+    def wait_logged_in(self, page, timeout_ms: Optional[int] = None) -> bool:
+        timeout = timeout_ms or self.timeout_ms * 2
+        if not self.wait_for_url(page, lambda u: u.startswith(URLS["room_base"]), timeout_ms=timeout):
+            return False
+        try:
+            page.wait_for_selector(LOGIN_DONE_SELECTOR, state="attached", timeout=timeout)
+        except Exception:
+            return "/event/add" in page.url
+        return True
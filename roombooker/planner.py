@@ -0,0 +1,427 @@
+import time
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from roombooker.availability import Occupancy
+from roombooker.occupancy import OccupancyIndex
+# Konstanten und Gewichte leben bei der Score-Matrix, bleiben aber über planner importierbar
+from roombooker.scoring import DEFAULT_WEIGHTS, MAX_BLOCK_MIN, MIN_BLOCK_MIN, SWITCH_LOSS_MIN, ScoreMatrix
+
+
+def m2t(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+@dataclass
+class PlanResult:
+    chain: List[Dict[str, object]]
+    score: float
+    states: int
+    elapsed_ms: float
+    complete: bool = True
+
+    @property
+    def covered_min(self) -> int:
+        return sum(step["duration"] for step in self.chain)
+
+
+@dataclass
+class PlanContext:
+    """Gemeinsame Vorberechnung für alle Planer: Score-Matrix, Ereigniszeitpunkte, Gewichte."""
+
+    matrix: ScoreMatrix
+    start: int
+    end: int
+    weights: Dict[str, float]
+    rooms: List[str] = field(default_factory=list)
+    free_starts: List[int] = field(default_factory=list)
+    _ends: Dict[Tuple[str, int], List[int]] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def build(cls, rooms_data: Occupancy, start: int, end: int, weights: Optional[Dict[str, float]] = None,
+              index: Optional[OccupancyIndex] = None) -> "PlanContext":
+        # Zeitpunkte, an denen ein Raum frei wird: nur dort lohnt sich ein früheres Blockende
+        starts = sorted({b["end_m"] for bookings in rooms_data.values() for b in bookings if start < b["end_m"] < end})
+        # Exakte Minuten als Zusatzspalten, damit das Raster die Ketten nicht verschlechtert
+        matrix = ScoreMatrix(rooms_data, start, end, weights, index, extra_minutes=[start] + starts)
+        return cls(matrix, start, end, matrix.weights, list(matrix.rooms), starts)
+
+    @property
+    def index(self) -> OccupancyIndex:
+        return self.matrix.index
+
+    def block_end(self, room: str, t: int) -> int:
+        return t + self.matrix.block(room, t)
+
+    def rooms_at(self, t: int) -> List[str]:
+        return self.matrix.rooms_at(t)
+
+    def candidate_ends(self, room: str, t: int) -> List[int]:
+        key = (room, t)
+        cached = self._ends.get(key)
+        if cached is not None:
+            return cached
+        max_end = self.block_end(room, t)
+        if max_end - t < MIN_BLOCK_MIN:
+            ends: List[int] = []
+        else:
+            lo = bisect_left(self.free_starts, t + MIN_BLOCK_MIN)
+            hi = bisect_left(self.free_starts, max_end)
+            ends = self.free_starts[lo:hi] + [max_end]
+        self._ends[key] = ends
+        return ends
+
+    def next_free_start(self, t: int) -> Optional[int]:
+        idx = bisect_right(self.free_starts, t)
+        return self.free_starts[idx] if idx < len(self.free_starts) else None
+
+    def step_score(self, room: str, t: int, end: int, last_room: Optional[str]) -> float:
+        return self.matrix.step_score(room, t, end, last_room)
+
+
+def make_step(room: str, start: int, end: int, score: float) -> Dict[str, object]:
+    return {"room": room, "start": start, "end": end, "duration": end - start, "score": score}
+
+
+def plan_chain(
+    rooms_data: Occupancy,
+    start: int,
+    end: int,
+    accounts: int,
+    weights: Optional[Dict[str, float]] = None,
+    index: Optional[OccupancyIndex] = None,
+) -> PlanResult:
+    """Exakte Kette per DP über (Minute, Accounts übrig, letzter Raum).
+
+    Ein Block läuft bis zur nächsten Belegung bzw. 240 min oder endet dort, wo ein anderer
+    Raum frei wird. Im selben Raum weiterbuchen ist nur nach einem vollen 240-min Block
+    erlaubt (sonst wäre es ein sinnloses Aufteilen). Warten bis zum nächsten freien Raum
+    kostet waitPenalty und setzt den letzten Raum zurück.
+    """
+    started = time.perf_counter()
+    ctx = PlanContext.build(rooms_data, start, end, weights, index)
+    memo: Dict[Tuple[int, int, Optional[str], bool], Tuple[float, Optional[tuple]]] = {}
+
+    def best(t: int, left: int, last_room: Optional[str], may_repeat: bool) -> Tuple[float, Optional[tuple]]:
+        key = (t, left, last_room, may_repeat)
+        if key in memo:
+            return memo[key]
+        result: Tuple[float, Optional[tuple]] = (0.0, None)
+        if left > 0 and t < ctx.end:
+            for room in ctx.rooms_at(t):
+                if room == last_room and not may_repeat:
+                    continue
+                for block_end in ctx.candidate_ends(room, t):
+                    gain = ctx.step_score(room, t, block_end, last_room)
+                    sub_score, _ = best(block_end, left - 1, room, block_end - t == MAX_BLOCK_MIN)
+                    if gain + sub_score > result[0]:
+                        result = (gain + sub_score, ("book", room, block_end))
+            wait_until = ctx.next_free_start(t)
+            if wait_until is not None and wait_until < ctx.end:
+                # Nach einer Pause zählt weder Stabilität noch Wechsel
+                sub_score, _ = best(wait_until, left, None, False)
+                if ctx.weights["waitPenalty"] + sub_score > result[0]:
+                    result = (ctx.weights["waitPenalty"] + sub_score, ("wait", None, wait_until))
+        memo[key] = result
+        return result
+
+    total, _ = best(start, accounts, None, False)
+
+    chain: List[Dict[str, object]] = []
+    t, left, last_room, may_repeat = start, accounts, None, False
+    while True:
+        _, move = memo[(t, left, last_room, may_repeat)]
+        if move is None:
+            break
+        kind, room, until = move
+        if kind == "wait":
+            t, last_room, may_repeat = until, None, False
+            continue
+        chain.append(make_step(room, t, until, ctx.step_score(room, t, until, last_room)))
+        t, left, last_room, may_repeat = until, left - 1, room, until - t == MAX_BLOCK_MIN
+
+    return PlanResult(chain, total, len(memo), (time.perf_counter() - started) * 1000)
+
+
+def search_chain(
+    rooms_data: Occupancy,
+    start: int,
+    end: int,
+    accounts: int,
+    budget_ms: float,
+    weights: Optional[Dict[str, float]] = None,
+    index: Optional[OccupancyIndex] = None,
+) -> PlanResult:
+    """Branch-and-Bound mit Zeitbudget, gleiche Bewertung wie plan_chain.
+
+    Obere Schranke für den Rest: noch erreichbare Minuten * totalCoveredMin plus der größte
+    Übergangsbonus pro Account. Zustände, die schon mit besserem Präfix erreicht wurden, fallen
+    weg. Läuft das Budget ab, kommt die beste bisher gefundene Kette zurück (complete=False).
+    """
+    started = time.perf_counter()
+    deadline = started + budget_ms / 1000.0
+    ctx = PlanContext.build(rooms_data, start, end, weights, index)
+    w = ctx.weights
+    bonus = max(0.0, w["stabilityBonus"], w["switchBonus"] + SWITCH_LOSS_MIN * w["productiveLossMin"])
+    seen: Dict[Tuple[int, int, Optional[str], bool], float] = {}
+    path: List[Dict[str, object]] = []
+    # dived: erster Abstieg bis zum Blatt ist fertig, erst danach darf das Budget abbrechen
+    best = {"score": 0.0, "chain": [], "complete": True, "dived": False}
+
+    def bound(t: int, left: int) -> float:
+        return min(ctx.end - t, left * MAX_BLOCK_MIN) * w["totalCoveredMin"] + left * bonus
+
+    def visit(t: int, left: int, last_room: Optional[str], may_repeat: bool, score: float) -> None:
+        if best["dived"] and time.perf_counter() > deadline:
+            best["complete"] = False
+            return
+        if score > best["score"]:
+            best["score"], best["chain"] = score, list(path)
+        if left <= 0 or t >= ctx.end or score + bound(t, left) <= best["score"]:
+            best["dived"] = True
+            return
+        key = (t, left, last_room, may_repeat)
+        if seen.get(key, float("-inf")) >= score:
+            return
+        seen[key] = score
+
+        moves = []
+        for room in ctx.rooms_at(t):
+            if room == last_room and not may_repeat:
+                continue
+            for block_end in ctx.candidate_ends(room, t):
+                moves.append((ctx.step_score(room, t, block_end, last_room), room, block_end))
+        # Beste Schritte zuerst -> früh eine gute Kette, danach greift die Schranke
+        moves.sort(key=lambda move: -move[0])
+        for gain, room, block_end in moves:
+            path.append(make_step(room, t, block_end, gain))
+            visit(block_end, left - 1, room, block_end - t == MAX_BLOCK_MIN, score + gain)
+            path.pop()
+            if not best["complete"]:
+                return
+        wait_until = ctx.next_free_start(t)
+        if wait_until is not None and wait_until < ctx.end:
+            visit(wait_until, left, None, False, score + w["waitPenalty"])
+        best["dived"] = True
+
+    visit(start, accounts, None, False, 0.0)
+    return PlanResult(best["chain"], best["score"], len(seen), (time.perf_counter() - started) * 1000,
+                      best["complete"])
+
+
+@dataclass(frozen=True)
+class ParetoPlan:
+    covered_min: int
+    switches: int
+    accounts: int
+    chain: Tuple[Dict[str, object], ...]
+
+
+def _dominates(a: ParetoPlan, b: ParetoPlan) -> bool:
+    return (a.covered_min >= b.covered_min and a.switches <= b.switches and a.accounts <= b.accounts
+            and (a.covered_min, -a.switches, -a.accounts) != (b.covered_min, -b.switches, -b.accounts))
+
+
+def _frontier(plans: List[ParetoPlan]) -> List[ParetoPlan]:
+    unique = {(p.covered_min, p.switches, p.accounts): p for p in plans}
+    return [p for p in unique.values() if not any(_dominates(q, p) for q in unique.values())]
+
+
+# Reihenfolge, nach der eine Policy unter den zulässigen Plänen wählt
+POLICIES = {
+    "coverage": lambda p: (-p.covered_min, p.switches, p.accounts),
+    "stable": lambda p: (p.switches, -p.covered_min, p.accounts),
+    "lean": lambda p: (p.accounts, -p.covered_min, p.switches),
+}
+
+
+@dataclass
+class ParetoFrontier:
+    plans: List[ParetoPlan]
+    states: int
+    elapsed_ms: float
+
+    def pick(
+        self,
+        policy: str = "coverage",
+        max_switches: Optional[int] = None,
+        max_accounts: Optional[int] = None,
+        min_covered: int = 0,
+    ) -> Optional[ParetoPlan]:
+        """Wählt ohne neue Suche; z.B. max_switches=1 entspricht 'ein Raum, sonst höchstens zwei'."""
+        allowed = [
+            p for p in self.plans
+            if (max_switches is None or p.switches <= max_switches)
+            and (max_accounts is None or p.accounts <= max_accounts)
+            # Die leere Kette ist nie eine Wahl (sonst gewinnt "lean" immer mit 0 Accounts)
+            and p.covered_min >= max(min_covered, 1)
+        ]
+        return min(allowed, key=POLICIES[policy]) if allowed else None
+
+
+def pareto_chains(
+    rooms_data: Occupancy,
+    start: int,
+    end: int,
+    accounts: int,
+    index: Optional[OccupancyIndex] = None,
+) -> ParetoFrontier:
+    """Alle nicht dominierten Ketten nach (Minuten abgedeckt, Raumwechsel, Accounts) in einem Durchlauf.
+
+    Gleiche Übergänge wie plan_chain; Warten kostet hier nichts, der Raum davor zählt aber für
+    den nächsten Wechsel weiter.
+    """
+    started = time.perf_counter()
+    ctx = PlanContext.build(rooms_data, start, end, None, index)
+    memo: Dict[Tuple[int, Optional[str], bool], List[ParetoPlan]] = {}
+    empty = ParetoPlan(0, 0, 0, ())
+
+    def front(t: int, last_room: Optional[str], may_repeat: bool) -> List[ParetoPlan]:
+        key = (t, last_room, may_repeat)
+        if key in memo:
+            return memo[key]
+        plans = [empty]
+        if t < ctx.end:
+            for room in ctx.rooms_at(t):
+                if room == last_room and not may_repeat:
+                    continue
+                switch = int(last_room is not None and room != last_room)
+                for block_end in ctx.candidate_ends(room, t):
+                    step = make_step(room, t, block_end, ctx.step_score(room, t, block_end, last_room))
+                    for sub in front(block_end, room, block_end - t == MAX_BLOCK_MIN):
+                        if sub.accounts < accounts:
+                            plans.append(ParetoPlan(sub.covered_min + block_end - t, sub.switches + switch,
+                                                    sub.accounts + 1, (step,) + sub.chain))
+            wait_until = ctx.next_free_start(t)
+            if wait_until is not None and wait_until < ctx.end:
+                plans.extend(front(wait_until, last_room, True))
+        memo[key] = _frontier(plans)
+        return memo[key]
+
+    plans = sorted(front(start, None, False), key=POLICIES["coverage"])
+    return ParetoFrontier(plans, len(memo), (time.perf_counter() - started) * 1000)
+
+
+PICK_LIMITS = ("max_switches", "max_accounts", "min_covered")
+FRONTIER_CACHE_SIZE = 32
+_FRONTIERS: Dict[tuple, ParetoFrontier] = {}
+
+
+def parse_policy(
+    weights: Optional[Dict[str, object]], warnings: Optional[List[str]] = None
+) -> Tuple[Optional[str], Dict[str, int]]:
+    """"policy" aus weights.json: Name ("stable") oder Dict mit Grenzen für pick().
+
+    Ungültiges fällt auf coverage zurück bzw. wird ignoriert; die Gründe landen in `warnings`.
+    """
+    warnings = warnings if warnings is not None else []
+    raw = (weights or {}).get("policy")
+    if not raw:
+        return None, {}
+    if isinstance(raw, str):
+        raw = {"policy": raw}
+    if not isinstance(raw, dict):
+        warnings.append(f"Invalid policy {raw!r}, using coverage")
+        return "coverage", {}
+    name = raw.get("policy", "coverage")
+    if name not in POLICIES:
+        warnings.append(f"Unknown policy {name!r}, using coverage")
+        name = "coverage"
+    limits: Dict[str, int] = {}
+    for key, value in raw.items():
+        if key == "policy":
+            continue
+        if key not in PICK_LIMITS:
+            warnings.append(f"Ignoring unknown policy option {key!r}")
+        elif value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+            warnings.append(f"Ignoring policy option {key}={value!r} (integer expected)")
+        else:
+            limits[key] = value
+    return name, limits
+
+
+def frontier_for(
+    rooms_data: Occupancy, start: int, end: int, accounts: int, index: Optional[OccupancyIndex] = None
+) -> ParetoFrontier:
+    """Pareto-Front pro Snapshot nur einmal rechnen: Policy wechseln ist danach nur noch ein pick()."""
+    key = (
+        tuple(sorted((room, tuple((b["start_m"], b["end_m"]) for b in bookings)) for room, bookings in rooms_data.items())),
+        start, end, accounts,
+    )
+    frontier = _FRONTIERS.get(key)
+    if frontier is None:
+        if len(_FRONTIERS) >= FRONTIER_CACHE_SIZE:
+            _FRONTIERS.pop(next(iter(_FRONTIERS)))
+        frontier = _FRONTIERS[key] = pareto_chains(rooms_data, start, end, accounts, index)
+    return frontier
+
+
+def fallback_options(
+    rooms_data: Occupancy,
+    chain: List[Dict[str, object]],
+    rooms: Optional[List[str]] = None,
+    index: Optional[OccupancyIndex] = None,
+    limit: int = 8,
+) -> List[List[List[Dict[str, object]]]]:
+    """Pro Block der Kette eine Rangliste von Alternativen aus demselben Snapshot.
+
+    Eine Alternative ist eine Liste von Teilblöcken (room/start/end in Minuten). Zuerst der
+    geplante Raum, dann andere Räume, die den ganzen Block frei haben (Nachbarraum der Kette
+    vor längerem Puffer danach), dann Aufteilungen auf zwei Räume.
+    """
+    index = index or OccupancyIndex(rooms_data)
+    rooms = list(rooms or index.rooms)
+    tree = []
+    for pos, step in enumerate(chain):
+        room, start, end = step["room"], step["start"], step["end"]
+        neighbours = {chain[i]["room"] for i in (pos - 1, pos + 1) if 0 <= i < len(chain)}
+        singles = sorted(
+            (r for r in rooms if index.is_free(r, start, end)),
+            key=lambda r: (r != room, r not in neighbours, -index.free_run(r, end)),
+        )
+        options = [[{"room": r, "start": start, "end": end}] for r in singles]
+        splits = []
+        for first in rooms:
+            middle = start + index.free_run(first, start, end)
+            if middle - start < MIN_BLOCK_MIN or end - middle < MIN_BLOCK_MIN:
+                continue
+            for second in rooms:
+                if second != first and index.is_free(second, middle, end):
+                    splits.append((max(middle - start, end - middle), first, middle, second))
+        splits.sort(key=lambda split: -split[0])
+        for _, first, middle, second in splits:
+            options.append([{"room": first, "start": start, "end": middle}, {"room": second, "start": middle, "end": end}])
+        tree.append(options[:limit])
+    return tree
+
+
+def task_blocks(
+    start: int,
+    end: int,
+    rooms_data: Optional[Occupancy] = None,
+    rooms: Optional[List[str]] = None,
+) -> List[Tuple[int, int]]:
+    """Möglichst wenige Blöcke (max. 240 min), deren Grenzen auf freie Abschnitte fallen.
+
+    Ab jedem Startpunkt so weit wie irgendein Raum am Stück frei ist; das ergibt die minimale
+    Blockanzahl. Zeiten, in denen kein Raum mindestens 30 min frei ist, werden übersprungen.
+    Ohne Belegungsdaten bleibt es bei festen 240-min Blöcken.
+    """
+    if rooms_data is None:
+        return [(t, min(t + MAX_BLOCK_MIN, end)) for t in range(start, end, MAX_BLOCK_MIN)]
+    candidates = {room: rooms_data.get(room, []) for room in rooms} if rooms else rooms_data
+    ctx = PlanContext.build(candidates, start, end)
+    blocks: List[Tuple[int, int]] = []
+    t = start
+    while t < end:
+        reach = t + ctx.matrix.best_block(t)
+        if reach - t >= MIN_BLOCK_MIN:
+            blocks.append((t, reach))
+            t = reach
+            continue
+        wait_until = ctx.next_free_start(t)
+        if wait_until is None:
+            break
+        t = wait_until
+    return blocks
@@ -0,0 +1,230 @@
+import itertools
+import os
+import threading
+import time
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from roombooker.clock_sync import ServerClock, SubmitScheduler
+from roombooker.config import BOOKING_WINDOW_DAYS
+from roombooker.http_engine import (
+    FormLayoutChanged,
+    HttpBookingEngine,
+    HttpSession,
+    SessionExpired,
+    SubmitOutcomeUnknown,
+    build_payload,
+)
+from roombooker.models import Account
+from roombooker.utils import slot_from_task
+
+PREARM_LEAD_S = int(os.environ.get("ROOMBOOKER_PREARM_LEAD_S", "300"))
+# Uhrabgleich muss so lange vor der Öffnung fertig sein (Schlafen + Spin im Scheduler)
+CLOCK_RESERVE_S = 1.0
+
+
+def window_opens_at(target: date, start_time: str = "00:00") -> datetime:
+    # "midnight": ganzer Tag wird um 00:00 freigeschaltet, "rolling": jeder Slot genau 14 Tage vorher
+    opens_day = target - timedelta(days=BOOKING_WINDOW_DAYS)
+    if os.environ.get("ROOMBOOKER_WINDOW_MODE", "midnight") == "rolling":
+        return datetime.combine(opens_day, datetime.strptime(start_time, "%H:%M").time())
+    return datetime.combine(opens_day, datetime.min.time())
+
+
+def should_prearm(target: date, start_time: str = "00:00", now: Optional[datetime] = None) -> bool:
+    remaining = (window_opens_at(target, start_time) - (now or datetime.now())).total_seconds()
+    return 0 < remaining <= PREARM_LEAD_S
+
+
+@dataclass
+class ArmedSlot:
+    task: Dict[str, object]
+    account: Account
+    room_name: str
+    room_id: str
+    rooms: List[str] = field(default_factory=list)
+    page: object = None
+    session: Optional[HttpSession] = None
+    payload: Optional[List[Tuple[str, str]]] = None
+    # HTTP-Submit hat eine echte Antwort bekommen (sonst ist der vorbereitete Raum noch offen)
+    answered: bool = False
+
+
+class PreArmer:
+    """Loggt alle Accounts vor Fensteröffnung ein und füllt die Formulare vor.
+
+    Zum Freigabezeitpunkt bleibt nur noch der Submit (Klick bzw. POST).
+    """
+
+    def __init__(
+        self, logger, engine=None, use_http: bool = False, scheduler: Optional[SubmitScheduler] = None
+    ) -> None:
+        self.logger = logger
+        self.engine = engine
+        self.use_http = use_http
+        self.scheduler = scheduler
+        self.http = HttpBookingEngine(logger, fallback=engine)
+        self._calibration: Optional[threading.Thread] = None
+        # Laufende Nummer über alle arm()-Aufrufe: jeder Block bekommt seine eigene geparkte Seite
+        self._form_seq = itertools.count()
+
+    def _get_engine(self):
+        if self.engine is None:
+            from roombooker.booking_engine import BookingEngine
+
+            self.engine = BookingEngine(self.logger)
+            self.http.fallback = self.engine
+        return self.engine
+
+    def arm(
+        self,
+        tasks: List[Dict[str, object]],
+        accounts: List[Account],
+        preferred_rooms: List[str],
+        summary: str = "Lernen",
+    ) -> List[ArmedSlot]:
+        armed: List[ArmedSlot] = []
+        for idx, task in enumerate(tasks):
+            acc = accounts[idx % len(accounts)]
+            rooms = [name for name in preferred_rooms if task["all_rooms"].get(name)]
+            if not rooms:
+                continue
+            slot = ArmedSlot(task, acc, rooms[0], str(task["all_rooms"][rooms[0]]), rooms=rooms)
+            self.logger.log(f"Pre-Arm: {task['date']} {task['start']}-{task['end']} ({slot.room_name}) mit {acc.email}")
+            try:
+                if self.use_http and self._arm_http(slot, summary):
+                    armed.append(slot)
+                    continue
+                # Eigener Pool-Key pro Block, damit mehrere Blöcke eines Accounts parallel geparkt bleiben
+                engine = self._get_engine()
+                page = engine.open_form(f"prearm:{next(self._form_seq)}:{acc.email}", acc)
+                if page is None:
+                    continue
+                engine.fill_form(page, task, slot.room_id, summary)
+                slot.page = page
+                armed.append(slot)
+            except Exception as exc:
+                self.logger.log(f"Pre-Arm fehlgeschlagen ({acc.email}): {exc}")
+        self.logger.log(f"Pre-Arm: {len(armed)}/{len(tasks)} Blöcke bereit.")
+        return armed
+
+    def _arm_http(self, slot: ArmedSlot, summary: str) -> bool:
+        try:
+            slot.session = self.http.session_for(slot.account)
+            slot.payload = build_payload(slot.session.form, slot.task, slot.room_id, summary)
+            return True
+        except (SessionExpired, FormLayoutChanged, urllib.error.URLError) as exc:
+            self.logger.log(f"HTTP Pre-Arm nicht möglich ({exc}), parke Browser-Formular.")
+            return False
+
+    def _fire_http(self, slot: ArmedSlot) -> Optional[bool]:
+        try:
+            ok = self.http.submit(slot.session, slot.room_name, slot.payload)
+            slot.answered = True
+            return ok
+        except SubmitOutcomeUnknown as exc:
+            slot.answered = True  # POST ist raus -> derselbe Raum nie ein zweites Mal
+            # None = Ausgang unklar -> kein Ausweichraum, sonst droht eine Doppelbuchung
+            booked = self.http.verify_booked(slot.task, slot.room_name)
+            self.logger.log(f"{exc} - Kalender: {'belegt' if booked else 'frei' if booked is False else 'unbekannt'}.")
+            return booked
+        except (SessionExpired, FormLayoutChanged, urllib.error.URLError) as exc:
+            self.logger.log(f"Submit fehlgeschlagen ({slot.account.email}): {exc}")
+            return False
+
+    def fire(self, armed: List[ArmedSlot], simulation_mode: bool = False, summary: str = "Lernen") -> List[Dict[str, object]]:
+        if simulation_mode:
+            self.logger.log(f"SIMULATION: {len(armed)} Submits würden jetzt abgeschickt.")
+            return [slot_from_task(slot.task, slot.room_name) for slot in armed]
+
+        http_slots = [slot for slot in armed if slot.payload is not None]
+        page_slots = [slot for slot in armed if slot.page is not None]
+        results: Dict[int, Optional[bool]] = {}
+
+        # Alle Browser-Submits zuerst auslösen, erst danach auf Antworten warten
+        for slot in page_slots:
+            slot.page.click("#event_submit", no_wait_after=True)
+        if http_slots:
+            with ThreadPoolExecutor(max_workers=len(http_slots)) as pool:
+                for slot, ok in zip(http_slots, pool.map(self._fire_http, http_slots)):
+                    results[id(slot)] = ok
+        for slot in page_slots:
+            try:
+                results[id(slot)] = self._get_engine().confirm_submit(slot.page, slot.room_name)
+            except Exception as exc:
+                self.logger.log(f"Fehler bei Submit ({slot.account.email}): {exc}")
+                results[id(slot)] = False
+
+        successes: List[Dict[str, object]] = []
+        for slot in armed:
+            if results.get(id(slot)):
+                successes.append(slot_from_task(slot.task, slot.room_name))
+                continue
+            if id(slot) in results and results[id(slot)] is None:
+                continue
+            # Vorbereiteter Raum weg -> restliche Wunschräume über den normalen Pfad;
+            # kam der POST nie an (z.B. Session abgelaufen), zuerst nochmal derselbe Raum
+            retry_same = slot.payload is not None and not slot.answered
+            remaining = slot.rooms if retry_same else slot.rooms[1:]
+            if remaining:
+                successes.extend(
+                    self._get_engine().execute_booking([slot.task], [slot.account], remaining, False, summary)
+                )
+        self.http.availability.invalidate_slots(successes)
+        return successes
+
+    def run(
+        self,
+        tasks: List[Dict[str, object]],
+        accounts: List[Account],
+        preferred_rooms: List[str],
+        opens_at: datetime,
+        simulation_mode: bool = False,
+        summary: str = "Lernen",
+    ) -> List[Dict[str, object]]:
+        self.calibrate_clock(opens_at)
+        return self.fire_at(self.arm(tasks, accounts, preferred_rooms, summary), opens_at, simulation_mode, summary)
+
+    def _get_scheduler(self) -> SubmitScheduler:
+        if self.scheduler is None:
+            self.scheduler = SubmitScheduler(self.logger, ServerClock(self.logger))
+        return self.scheduler
+
+    def calibrate_clock(self, opens_at: datetime) -> None:
+        """Uhrabgleich im Hintergrund starten, während Logins und Formulare laufen.
+
+        Die Proben dauern je gut eine Sekunde; sie enden spätestens CLOCK_RESERVE_S vor der Öffnung.
+        """
+        if self._calibration is not None or opens_at <= datetime.now():
+            return
+        clock = self._get_scheduler().clock
+        self._calibration = clock.calibrate_in_background(opens_at.timestamp() - CLOCK_RESERVE_S)
+
+    def fire_at(
+        self,
+        armed: List[ArmedSlot],
+        opens_at: datetime,
+        simulation_mode: bool = False,
+        summary: str = "Lernen",
+    ) -> List[Dict[str, object]]:
+        if not armed:
+            return []
+        if opens_at <= datetime.now():
+            return self.fire(armed, simulation_mode, summary)
+        self.logger.log(f"Pre-Arm: warte bis {opens_at.strftime('%d.%m.%Y %H:%M:%S')} (Serverzeit)...")
+        scheduler = self._get_scheduler()
+        deadline = opens_at.timestamp() - CLOCK_RESERVE_S
+        if self._calibration is not None:
+            self._calibration.join(timeout=max(0.0, deadline - time.time()))
+            self._calibration = None
+        if scheduler.clock.estimate is None:
+            # Nicht vorab gestartet (oder noch nicht fertig): nur so viele Proben, wie bis zur Öffnung passen
+            scheduler.clock.calibrate(deadline)
+        return scheduler.run_at(opens_at, lambda: self.fire(armed, simulation_mode, summary))
+
+    def close(self) -> None:
+        if self.engine is not None:
+            self.engine.close()
@@ -0,0 +1,227 @@
+import csv
+import json
+import re
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from roombooker.config import RESERVATION_DB_FILE
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reservations (
+    account TEXT NOT NULL,
+    start TEXT NOT NULL,
+    room TEXT NOT NULL,
+    raw_time TEXT NOT NULL,
+    title TEXT NOT NULL,
+    location TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'active',
+    first_seen TEXT NOT NULL,
+    changed_at TEXT NOT NULL,
+    PRIMARY KEY (account, start, room)
+);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts TEXT NOT NULL,
+    account TEXT NOT NULL,
+    start TEXT NOT NULL,
+    room TEXT NOT NULL,
+    change TEXT NOT NULL,
+    detail TEXT
+);
+CREATE TABLE IF NOT EXISTS fetches (
+    account TEXT PRIMARY KEY,
+    fetched_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS exports (
+    target TEXT PRIMARY KEY,
+    history_id INTEGER NOT NULL
+);
+"""
+
+CSV_FIELDS = ["Account", "Zeit", "Titel", "Ort", "Raum", "Abgerufen_am", "Status", "Erstmals_gesehen", "Geaendert_am"]
+DATE_RE = re.compile(r"(\d{1,2})\.(\d{1,2})\.(\d{4})")
+TIME_RE = re.compile(r"(\d{1,2}):(\d{2})")
+
+
+def parse_start(raw_time: str) -> str:
+    """'Mo, 20.10.2026 08:00 - 12:00' -> '2026-10-20T08:00' (sortierbar). Unbekanntes Format bleibt roh."""
+    date_match = DATE_RE.search(raw_time)
+    time_match = TIME_RE.search(raw_time)
+    if not date_match:
+        return raw_time
+    day, month, year = (int(part) for part in date_match.groups())
+    hour, minute = (int(part) for part in time_match.groups()) if time_match else (0, 0)
+    return f"{year:04d}-{month:02d}-{day:02d}T{hour:02d}:{minute:02d}"
+
+
+class ReservationStore:
+    """Archiv aller gesehenen Reservationen (SQLite), Schlüssel (Account, Start, Raum).
+
+    Ein Abruf schreibt nur Änderungen: neue Zeilen, geänderte Felder und verschwundene
+    Reservationen (storniert bzw. vergangen). Jede Änderung landet zusätzlich in `history`.
+    """
+
+    def __init__(self, path: Path = RESERVATION_DB_FILE) -> None:
+        self.path = path
+        self.conn = sqlite3.connect(str(path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "ReservationStore":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _log_change(self, ts: str, account: str, start: str, room: str, change: str, detail: Optional[Dict] = None):
+        self.conn.execute(
+            "INSERT INTO history (ts, account, start, room, change, detail) VALUES (?, ?, ?, ?, ?, ?)",
+            (ts, account, start, room, change, json.dumps(detail, ensure_ascii=False) if detail else None),
+        )
+
+    def sync_account(self, account: str, rows: List[Dict[str, str]], now: Optional[datetime] = None) -> Dict[str, int]:
+        """Gleicht die aktuelle Liste eines Accounts ab. rows: Dicts mit Zeit/Titel/Ort/Raum."""
+        now = now or datetime.now()
+        ts = now.isoformat(timespec="seconds")
+        counts = {"added": 0, "updated": 0, "returned": 0, "cancelled": 0, "past": 0}
+        existing = {
+            (row["start"], row["room"]): row
+            for row in self.conn.execute("SELECT * FROM reservations WHERE account = ?", (account,))
+        }
+        seen = set()
+        with self.conn:
+            for item in rows:
+                start, room = parse_start(item["Zeit"]), item["Raum"]
+                key = (start, room)
+                if key in seen:
+                    continue
+                seen.add(key)
+                values = {"raw_time": item["Zeit"], "title": item["Titel"], "location": item["Ort"]}
+                old = existing.get(key)
+                if old is None:
+                    self.conn.execute(
+                        "INSERT INTO reservations (account, start, room, raw_time, title, location, status, "
+                        "first_seen, changed_at) VALUES (?, ?, ?, ?, ?, ?, 'active', ?, ?)",
+                        (account, start, room, values["raw_time"], values["title"], values["location"], ts, ts),
+                    )
+                    self._log_change(ts, account, start, room, "added", values)
+                    counts["added"] += 1
+                    continue
+                diff = {field: value for field, value in values.items() if old[field] != value}
+                if old["status"] != "active":
+                    change = "returned"
+                elif diff:
+                    change = "updated"
+                else:
+                    continue
+                self.conn.execute(
+                    "UPDATE reservations SET raw_time = ?, title = ?, location = ?, status = 'active', changed_at = ? "
+                    "WHERE account = ? AND start = ? AND room = ?",
+                    (values["raw_time"], values["title"], values["location"], ts, account, start, room),
+                )
+                self._log_change(ts, account, start, room, change, diff or None)
+                counts[change] += 1
+
+            for key, old in existing.items():
+                if key in seen or old["status"] != "active":
+                    continue
+                # Aus der Liste verschwunden: vorbei oder storniert
+                status = "past" if old["start"] < now.strftime("%Y-%m-%dT%H:%M") else "cancelled"
+                self.conn.execute(
+                    "UPDATE reservations SET status = ?, changed_at = ? WHERE account = ? AND start = ? AND room = ?",
+                    (status, ts, account, key[0], key[1]),
+                )
+                self._log_change(ts, account, key[0], key[1], status)
+                counts[status] += 1
+
+            self.conn.execute(
+                "INSERT INTO fetches (account, fetched_at) VALUES (?, ?) "
+                "ON CONFLICT(account) DO UPDATE SET fetched_at = excluded.fetched_at",
+                (account, ts),
+            )
+        return counts
+
+    def iter_reservations(self, status: Optional[str] = None, account: Optional[str] = None) -> Iterator[sqlite3.Row]:
+        query = "SELECT * FROM reservations"
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if account is not None:
+            clauses.append("account = ?")
+            params.append(account)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        yield from self.conn.execute(query + " ORDER BY start, account", params)
+
+    def iter_history(self, since_id: int = 0) -> Iterator[sqlite3.Row]:
+        yield from self.conn.execute("SELECT * FROM history WHERE id > ? ORDER BY id", (since_id,))
+
+    def last_history_id(self) -> int:
+        row = self.conn.execute("SELECT MAX(id) FROM history").fetchone()
+        return row[0] or 0
+
+    def _exported_id(self, target: str) -> int:
+        row = self.conn.execute("SELECT history_id FROM exports WHERE target = ?", (target,)).fetchone()
+        return row[0] if row else 0
+
+    def _mark_exported(self, target: str, history_id: int) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO exports (target, history_id) VALUES (?, ?) "
+                "ON CONFLICT(target) DO UPDATE SET history_id = excluded.history_id",
+                (target, history_id),
+            )
+
+    def fetched_at(self) -> Dict[str, str]:
+        return {row["account"]: row["fetched_at"] for row in self.conn.execute("SELECT * FROM fetches")}
+
+    def export_csv(self, path: Path, status: Optional[str] = "active") -> bool:
+        """Schreibt die CSV nur neu, wenn sich seit dem letzten Export etwas geändert hat (zeilenweise gestreamt).
+
+        Ein neuer Abruf ohne Änderungen zählt auch, sonst wäre Abgerufen_am veraltet.
+        """
+        target = f"csv:{path}"
+        last_id = self.last_history_id()
+        fetched = self.fetched_at()
+        if path.exists() and self._exported_id(target) >= last_id:
+            exported_at = datetime.fromtimestamp(path.stat().st_mtime).isoformat(timespec="seconds")
+            if max(fetched.values(), default="") <= exported_at:
+                return False
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(CSV_FIELDS)
+            for row in self.iter_reservations(status=status):
+                seen = fetched.get(row["account"])
+                writer.writerow(
+                    [row["account"], row["raw_time"], row["title"], row["location"], row["room"],
+                     datetime.fromisoformat(seen).strftime("%d.%m.%Y %H:%M") if seen else "",
+                     row["status"], row["first_seen"], row["changed_at"]]
+                )
+        tmp.replace(path)
+        self._mark_exported(target, last_id)
+        return True
+
+    def export_changes_jsonl(self, path: Path) -> int:
+        """Hängt nur die neuen History-Einträge an (inkrementeller Änderungs-Feed)."""
+        target = f"jsonl:{path}"
+        since = self._exported_id(target)
+        last_id = since
+        count = 0
+        with open(path, "a", encoding="utf-8") as handle:
+            for row in self.iter_history(since):
+                entry = dict(row)
+                if entry["detail"]:
+                    entry["detail"] = json.loads(entry["detail"])
+                handle.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                last_id = row["id"]
+                count += 1
+        if count:
+            self._mark_exported(target, last_id)
+        return count
@@ -0,0 +1,143 @@
+import json
+import os
+from collections import Counter
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from roombooker.config import RESOURCE_RULES_FILE
+
+FIRST_PARTY_HOSTS = ["unibe.ch"]
+IDP_HOSTS = ["unibe.ch", "eduid.ch", "switch.ch"]
+
+# Pro Flow: erlaubte Ressourcentypen, erlaubte Hosts und Typen, die auch von fremden Hosts kommen dürfen
+# (Skripte von CDNs hängen an den Change-Handlern des Formulars).
+DEFAULT_RULES: Dict[str, Dict[str, List[str]]] = {
+    "login": {
+        "types": ["document", "script", "xhr", "fetch", "stylesheet"],
+        "hosts": IDP_HOSTS,
+        "cross_origin_types": ["document", "script"],
+    },
+    "form": {
+        "types": ["document", "script", "xhr", "fetch"],
+        "hosts": FIRST_PARTY_HOSTS,
+        "cross_origin_types": ["script"],
+    },
+    "calendar": {
+        "types": ["document", "script", "xhr", "fetch"],
+        "hosts": FIRST_PARTY_HOSTS,
+        "cross_origin_types": ["script"],
+    },
+}
+
+
+def load_rules() -> Dict[str, Dict[str, List[str]]]:
+    rules = {flow: dict(rule) for flow, rule in DEFAULT_RULES.items()}
+    if RESOURCE_RULES_FILE.exists():
+        try:
+            custom = json.loads(RESOURCE_RULES_FILE.read_text(encoding="utf-8"))
+            for flow, rule in custom.items():
+                rules.setdefault(flow, {}).update(rule)
+        except (json.JSONDecodeError, AttributeError):
+            pass
+    return rules
+
+
+def _host_matches(host: str, allowed: List[str]) -> bool:
+    return any(host == entry or host.endswith("." + entry) for entry in allowed)
+
+
+class ResourceBlocker:
+    """Blockt per context.route alles, was der jeweilige Flow (login/form/calendar) nicht braucht."""
+
+    def __init__(self, logger, rules: Optional[Dict[str, Dict[str, List[str]]]] = None, enabled: bool = True) -> None:
+        self.logger = logger
+        self.rules = rules or load_rules()
+        self.enabled = enabled
+        self._flows: Dict[int, str] = {}
+        self.blocked: Counter = Counter()
+        self.allowed = 0
+        self.bytes_loaded = 0
+
+    @staticmethod
+    def from_env(logger) -> "ResourceBlocker":
+        return ResourceBlocker(logger, enabled=os.environ.get("ROOMBOOKER_BLOCK_RESOURCES", "1") != "0")
+
+    def is_allowed(self, flow: str, resource_type: str, url: str) -> bool:
+        rule = self.rules.get(flow)
+        if rule is None:
+            return True
+        if resource_type not in rule.get("types", []):
+            return False
+        host = urlparse(url).hostname or ""
+        if not host or _host_matches(host, rule.get("hosts", [])):
+            return True
+        return resource_type in rule.get("cross_origin_types", [])
+
+    def attach(self, context, flow: str) -> None:
+        key = id(context)
+        self._flows[key] = flow
+        context.on("response", self._on_response)
+        if self.enabled:
+            context.route("**/*", lambda route, request: self._handle(key, route, request))
+
+    def set_flow(self, context, flow: str) -> None:
+        if id(context) in self._flows:
+            self._flows[id(context)] = flow
+
+    def detach(self, context) -> None:
+        self._flows.pop(id(context), None)
+
+    async def attach_async(self, context, flow: str) -> None:
+        key = id(context)
+        self._flows[key] = flow
+        context.on("response", self._on_response)
+        if self.enabled:
+            await context.route("**/*", lambda route, request: self._handle_async(key, route, request))
+
+    def _decide(self, key: int, request) -> bool:
+        if self.is_allowed(self._flows.get(key, ""), request.resource_type, request.url):
+            self.allowed += 1
+            return True
+        self.blocked[request.resource_type] += 1
+        return False
+
+    def _handle(self, key: int, route, request) -> None:
+        if self._decide(key, request):
+            route.continue_()
+        else:
+            route.abort("blockedbyclient")
+
+    async def _handle_async(self, key: int, route, request) -> None:
+        if self._decide(key, request):
+            await route.continue_()
+        else:
+            await route.abort("blockedbyclient")
+
+    def _on_response(self, response) -> None:
+        try:
+            size = int(response.headers.get("content-length", "0"))
+        except ValueError:
+            return
+        self.bytes_loaded += size
+
+    def stats(self) -> Dict[str, object]:
+        # Blockierte Requests laden nie, ihre Grösse ist unbekannt -> nur Anzahl pro Typ melden
+        return {
+            "requests_blocked": sum(self.blocked.values()),
+            "requests_allowed": self.allowed,
+            "blocked_by_type": dict(self.blocked),
+            "bytes_loaded": self.bytes_loaded,
+        }
+
+    def log_summary(self) -> None:
+        data = self.stats()
+        types = ", ".join(f"{kind}={count}" for kind, count in sorted(data["blocked_by_type"].items())) or "-"
+        self.logger.log(
+            f"Ressourcen: {data['requests_blocked']} blockiert ({types}), {data['requests_allowed']} erlaubt, "
+            f"{data['bytes_loaded'] / 1024:.0f} KB geladen"
+        )
+
+    def reset(self) -> None:
+        self.blocked.clear()
+        self.allowed = 0
+        self.bytes_loaded = 0
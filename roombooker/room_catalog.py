@@ -0,0 +1,152 @@
+import hashlib
+import json
+import threading
+import time
+import urllib.error
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from roombooker.availability import room_matches
+from roombooker.config import HARDCODED_ROOMS, ROOM_CATALOG_FILE, session_file_for
+from roombooker.http_engine import FormLayoutChanged, HttpSession, SessionExpired
+from roombooker.models import Account
+from roombooker.storage import RoomStore, load_rooms, resolve_data_dir
+
+CATALOG_MAX_AGE_S = 24 * 3600
+
+# Herkunft der zuletzt gelesenen Raumliste, von frisch nach geraten
+SOURCE_CATALOG = "catalog"
+SOURCE_ROOMS_FILE = "rooms.json"
+SOURCE_STORE = "store"
+SOURCE_HARDCODED = "hardcoded"
+
+
+def catalog_hash(room_map: Dict[str, str]) -> str:
+    return hashlib.sha256(json.dumps(room_map, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def fetch_room_options(session_path: Path) -> Dict[str, str]:
+    """Raumliste aus dem #event_room Dropdown, mit gespeicherter Session statt Login."""
+    form = HttpSession(session_path, timeout=10).load_form()
+    return {label: value for label, value in form.options.get(form.ids["event_room"], []) if label}
+
+
+class RoomCatalog:
+    """Name -> ID der Räume mit Hash und Abrufzeit.
+
+    Lesen braucht nie einen Login. Aktualisiert wird im Hintergrund über eine gespeicherte
+    Session; rooms.json wird nur neu geschrieben, wenn sich die Liste wirklich geändert hat.
+    """
+
+    _refresh_lock = threading.Lock()
+
+    def __init__(
+        self,
+        logger=None,
+        max_age_s: float = CATALOG_MAX_AGE_S,
+        path: Path = ROOM_CATALOG_FILE,
+        rooms_path: Optional[Path] = None,
+    ) -> None:
+        self.logger = logger
+        self.max_age_s = max_age_s
+        self.path = path
+        self.rooms_path = rooms_path or (resolve_data_dir() / "rooms.json")
+        self._thread: Optional[threading.Thread] = None
+        self.source: Optional[str] = None
+
+    def _log(self, message: str) -> None:
+        if self.logger is not None:
+            self.logger.log(message)
+
+    def _load(self) -> Dict[str, object]:
+        if not self.path.exists():
+            return {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            return data if isinstance(data, dict) else {}
+        except (json.JSONDecodeError, OSError):
+            return {}
+
+    def rooms(self) -> Dict[str, str]:
+        """Raumliste; `source` sagt danach, woher sie kam (nur SOURCE_CATALOG ist ein echter Abruf)."""
+        rooms = self._load().get("rooms")
+        if rooms:
+            self.source = SOURCE_CATALOG
+            return dict(rooms)
+        # Noch kein Katalog: bestehende rooms.json übernehmen
+        for source, loader in (
+            (SOURCE_ROOMS_FILE, lambda: load_rooms(self.rooms_path)),
+            (SOURCE_STORE, RoomStore.load),
+        ):
+            rooms = loader()
+            if rooms:
+                self.source = source
+                return rooms
+        self.source = SOURCE_HARDCODED
+        self._log("Kein Raumkatalog vorhanden, nutze eingebaute Beispielräume.")
+        return dict(HARDCODED_ROOMS)
+
+    @property
+    def is_fallback(self) -> bool:
+        return self.source != SOURCE_CATALOG
+
+    def age(self) -> float:
+        return time.time() - float(self._load().get("fetched_at", 0))
+
+    def is_stale(self) -> bool:
+        return self.age() >= self.max_age_s
+
+    def resolve(self, short_names: Iterable[str]) -> Dict[str, str]:
+        # "D-204" -> ID des Eintrags, dessen Name das Kürzel als ganzes Wort enthält
+        room_map = self.rooms()
+        ids: Dict[str, str] = {}
+        for short in short_names:
+            for name, room_id in room_map.items():
+                if room_matches(short, name):
+                    ids[short] = room_id
+                    break
+        return ids
+
+    def update(self, room_map: Dict[str, str]) -> bool:
+        if not room_map:
+            return False
+        digest = catalog_hash(room_map)
+        changed = self._load().get("hash") != digest
+        payload = {"hash": digest, "fetched_at": time.time(), "rooms": room_map}
+        try:
+            self.path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+            if changed:
+                RoomStore.save(room_map)
+                if self.rooms_path.parent.exists():
+                    self.rooms_path.write_text(json.dumps(room_map, indent=2), encoding="utf-8")
+        except OSError as exc:
+            self._log(f"Raumkatalog nicht gespeichert: {exc}")
+            return False
+        if changed:
+            self._log(f"Raumkatalog geändert: {len(room_map)} Räume gespeichert.")
+        return changed
+
+    def refresh(
+        self,
+        accounts: List[Account],
+        fallback: Optional[Callable[[str, str], Optional[Dict[str, str]]]] = None,
+    ) -> bool:
+        with self._refresh_lock:
+            for acc in accounts:
+                if not acc.email:
+                    continue
+                try:
+                    return self.update(fetch_room_options(session_file_for(acc.email)))
+                except (SessionExpired, FormLayoutChanged, urllib.error.URLError, OSError) as exc:
+                    self._log(f"Raumkatalog über Session von {acc.email} nicht möglich: {exc}")
+            if fallback is not None and accounts:
+                # Letzte Option: Browser-Login (z.B. BookingWorker.update_room_list)
+                return self.update(fallback(accounts[0].email, accounts[0].password) or {})
+        return False
+
+    def refresh_in_background(self, accounts: List[Account], fallback=None) -> Optional[threading.Thread]:
+        if not self.is_stale() or (self._thread is not None and self._thread.is_alive()):
+            return None
+        self._thread = threading.Thread(target=self.refresh, args=(accounts, fallback), daemon=True)
+        self._thread.start()
+        return self._thread
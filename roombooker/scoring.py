@@ -0,0 +1,118 @@
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from roombooker.availability import Occupancy
+from roombooker.occupancy import OccupancyIndex
+
+GRID_MIN = 15
+MAX_BLOCK_MIN = 240
+MIN_BLOCK_MIN = 30
+# Zeitverlust beim Raumwechsel (Zusammenpacken, Umziehen), geht mit productiveLossMin in den Score
+SWITCH_LOSS_MIN = 5
+
+DEFAULT_WEIGHTS = {
+    "totalCoveredMin": 0.0141,
+    "waitPenalty": -1.453,
+    "switchBonus": 1.021,
+    "stabilityBonus": 9.352,
+    "productiveLossMin": -0.118,
+}
+
+
+class ScoreMatrix:
+    """Scores aller (Raum, Startminute)-Paare, einmal pro Scan in flachen Arrays berechnet.
+
+    Spalten sind das 15-min Raster plus exakte Zusatzminuten (Fensterstart, Zeitpunkte, an denen
+    ein Raum frei wird), damit die Planer auf den genauen Minuten bleiben.
+    duration[r][c]: längster buchbarer Block ab Spalte c (bis Belegung, Fensterende oder 240 min)
+    base[r][c]: duration * totalCoveredMin, 0 wenn der Block kürzer als 30 min ist
+    Wechsel-/Stabilitätsterme hängen nur vom Vorgänger ab und werden beim Abfragen addiert.
+    """
+
+    def __init__(
+        self,
+        rooms_data: Occupancy,
+        start: int,
+        end: int,
+        weights: Optional[Dict[str, float]] = None,
+        index: Optional[OccupancyIndex] = None,
+        grid: int = GRID_MIN,
+        extra_minutes: Iterable[int] = (),
+    ) -> None:
+        self.weights = dict(DEFAULT_WEIGHTS)
+        self.weights.update(weights or {})
+        self.index = index or OccupancyIndex(rooms_data)
+        self.rooms: List[str] = list(self.index.rooms)
+        self.room_pos = {room: pos for pos, room in enumerate(self.rooms)}
+        self.start, self.end, self.grid = start, end, grid
+        self.slots: List[int] = list(range(start, end, grid))
+        self.columns: List[int] = sorted(set(self.slots) | {m for m in extra_minutes if start <= m < end})
+        self.column_pos = {minute: col for col, minute in enumerate(self.columns)}
+        self.switch_term = self.weights["switchBonus"] + SWITCH_LOSS_MIN * self.weights["productiveLossMin"]
+        self.stability_term = self.weights["stabilityBonus"]
+
+        covered = self.weights["totalCoveredMin"]
+        self.duration: List[array] = []
+        self.base: List[array] = []
+        for room in self.rooms:
+            durations = array("H", (self._free_block(room, t) for t in self.columns))
+            self.duration.append(durations)
+            self.base.append(array("d", (d * covered if d >= MIN_BLOCK_MIN else 0.0 for d in durations)))
+        # Pro Spalte die buchbaren Räume (Reihenfolge wie rooms_data); leer -> dort bleibt nur Warten
+        self.bookable: List[List[str]] = [
+            [room for pos, room in enumerate(self.rooms) if self.base[pos][col]] for col in range(len(self.columns))
+        ]
+        self.wait = array("d", (0.0 if rooms else self.weights["waitPenalty"] for rooms in self.bookable))
+
+    def _free_block(self, room: str, minute: int) -> int:
+        return self.index.free_run(room, minute, min(self.end, minute + MAX_BLOCK_MIN))
+
+    def column(self, minute: int) -> int:
+        """Spalte genau dieser Minute (-1, wenn sie weder auf dem Raster noch unter den Zusatzminuten liegt)."""
+        return self.column_pos.get(minute, -1)
+
+    def slot(self, minute: int) -> int:
+        """Index des Rasterslots, der `minute` enthält (außerhalb des Fensters -> -1)."""
+        if not self.start <= minute < self.end:
+            return -1
+        return (minute - self.start) // self.grid
+
+    def transition(self, room: str, last_room: Optional[str]) -> float:
+        if last_room is None:
+            return 0.0
+        return self.stability_term if room == last_room else self.switch_term
+
+    def block(self, room: str, minute: int) -> int:
+        """Längster Block ab `minute`; Minuten ohne eigene Spalte (z.B. nach 240 min) direkt über den Index."""
+        pos = self.room_pos.get(room)
+        if pos is None or not self.start <= minute < self.end:
+            return 0
+        col = self.column(minute)
+        return self.duration[pos][col] if col >= 0 else self._free_block(room, minute)
+
+    def step_score(self, room: str, start: int, end: int, last_room: Optional[str] = None) -> float:
+        return (end - start) * self.weights["totalCoveredMin"] + self.transition(room, last_room)
+
+    def score(self, room: str, minute: int, last_room: Optional[str] = None) -> float:
+        """Score des längsten Blocks ab `minute` (0, wenn keine 30 min frei sind)."""
+        duration = self.block(room, minute)
+        if duration < MIN_BLOCK_MIN:
+            return 0.0
+        return self.step_score(room, minute, minute + duration, last_room)
+
+    def rooms_at(self, minute: int) -> List[str]:
+        """Räume, in denen ab `minute` mindestens 30 min frei sind."""
+        col = self.column(minute)
+        if col >= 0:
+            return self.bookable[col]
+        return [room for room in self.rooms if self.block(room, minute) >= MIN_BLOCK_MIN]
+
+    def ranked(self, minute: int, last_room: Optional[str] = None, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Buchbare Räume ab `minute`, bester Score zuerst."""
+        scored = [(room, self.score(room, minute, last_room)) for room in self.rooms_at(minute)]
+        scored.sort(key=lambda item: -item[1])
+        return scored[:limit] if limit is not None else scored
+
+    def best_block(self, minute: int) -> int:
+        """Längster Block, den irgendein Raum ab `minute` hergibt."""
+        return max((self.block(room, minute) for room in self.rooms), default=0)
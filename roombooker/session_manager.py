@@ -0,0 +1,100 @@
+import json
+import time
+import urllib.error
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from roombooker.config import SESSION_CACHE_FILE, URLS, session_file_for
+from roombooker.http_engine import LOGGED_IN_MARKER, LOGIN_URL_MARKERS, HttpSession, SessionExpired
+
+
+def cookie_expiry(session_path: Path) -> Optional[float]:
+    """Frühester Ablauf der Cookies für raumreservation (None = nur Session-Cookies / unbekannt)."""
+    if not session_path.exists():
+        return None
+    try:
+        state = json.loads(session_path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError:
+        return None
+    host = urlparse(URLS["room_base"]).hostname or ""
+    expiries = [
+        float(cookie["expires"])
+        for cookie in state.get("cookies", [])
+        if cookie.get("expires", -1) > 0 and host.endswith(cookie.get("domain", "").lstrip("."))
+    ]
+    return min(expiries) if expiries else None
+
+
+class SessionManager:
+    """Merkt sich pro Account, wann die Session zuletzt bestätigt wurde.
+
+    Reihenfolge: Cache (max_age) -> Cookie-Ablauf in der storage_state -> ein HTTP-Probe.
+    Erst wenn das alles scheitert, braucht es den SSO-Login.
+    """
+
+    def __init__(self, logger, max_age_s: float = 900, cache_path: Path = SESSION_CACHE_FILE) -> None:
+        self.logger = logger
+        self.max_age_s = max_age_s
+        self.cache_path = cache_path
+        self._cache: Dict[str, Dict[str, float]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, float]]:
+        if not self.cache_path.exists():
+            return {}
+        try:
+            data = json.loads(self.cache_path.read_text(encoding="utf-8"))
+            return data if isinstance(data, dict) else {}
+        except json.JSONDecodeError:
+            return {}
+
+    def _save(self) -> None:
+        try:
+            self.cache_path.write_text(json.dumps(self._cache, indent=2), encoding="utf-8")
+        except OSError as exc:
+            self.logger.log(f"Session-Cache nicht gespeichert: {exc}")
+
+    def mark_verified(self, email: str) -> None:
+        self._cache[email] = {
+            "verified_at": time.time(),
+            "cookie_expiry": cookie_expiry(session_file_for(email)) or 0,
+        }
+        self._save()
+
+    def invalidate(self, email: str) -> None:
+        if self._cache.pop(email, None) is not None:
+            self._save()
+
+    def is_fresh(self, email: str) -> bool:
+        entry = self._cache.get(email)
+        if not entry:
+            return False
+        now = time.time()
+        if entry.get("cookie_expiry") and entry["cookie_expiry"] <= now:
+            return False
+        return now - entry.get("verified_at", 0) < self.max_age_s
+
+    def probe(self, email: str) -> bool:
+        session_path = session_file_for(email)
+        expiry = cookie_expiry(session_path)
+        if expiry is not None and expiry <= time.time():
+            self.logger.log(f"Session-Cookies von {email} abgelaufen.")
+            return False
+        try:
+            url, html = HttpSession(session_path, timeout=8).request(URLS["event_add"])
+        except (SessionExpired, urllib.error.URLError, OSError) as exc:
+            self.logger.log(f"Session-Probe für {email} fehlgeschlagen: {exc}")
+            return False
+        if any(marker in url for marker in LOGIN_URL_MARKERS) or LOGGED_IN_MARKER not in html:
+            return False
+        self.mark_verified(email)
+        return True
+
+    def needs_login(self, email: str) -> bool:
+        if self.is_fresh(email):
+            return False
+        if self.probe(email):
+            self.logger.log(f"Session von {email} gültig (Probe).")
+            return False
+        self.invalidate(email)
+        return True
@@ -2,7 +2,7 @@ import random
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import Callable
+from typing import Callable, Dict
 
 
 def human_type(page, selector: str, text: str) -> None:
@@ -18,6 +18,13 @@ def human_sleep(min_s: float = 0.5, max_s: float = 1.5) -> None:
     time.sleep(random.uniform(min_s, max_s))
 
 
+def slot_from_task(task: Dict[str, object], room_name: str) -> Dict[str, object]:
+    date_value = datetime.strptime(task["date"], "%d.%m.%Y").date()
+    start_dt = datetime.combine(date_value, datetime.strptime(task["start"], "%H:%M").time())
+    end_dt = datetime.combine(date_value, datetime.strptime(task["end"], "%H:%M").time())
+    return {"start": start_dt, "end": end_dt, "room": room_name}
+
+
 class OutputRedirector:
     def __init__(self, callback: Callable[[str], None]):
         self.callback = callback
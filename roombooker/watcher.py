@@ -0,0 +1,228 @@
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from roombooker.availability import AvailabilityCache, AvailabilitySnapshot, Occupancy
+from roombooker.calendar_http import HttpCalendarScanner
+from roombooker.config import CANCELLATION_STATS_FILE
+from roombooker.models import Account
+from roombooker.planner import MAX_BLOCK_MIN, MIN_BLOCK_MIN, m2t
+from roombooker.scoring import ScoreMatrix
+
+
+def busy_minutes(bookings: List[Dict[str, int]], start_m: int, end_m: int) -> Set[int]:
+    busy: Set[int] = set()
+    for booking in bookings:
+        busy.update(range(max(start_m, booking["start_m"]), min(end_m, booking["end_m"])))
+    return busy
+
+
+def free_runs(bookings: List[Dict[str, int]], start_m: int, end_m: int) -> List[Tuple[int, int]]:
+    runs: List[Tuple[int, int]] = []
+    cursor = start_m
+    for booking in sorted(bookings, key=lambda b: b["start_m"]):
+        if booking["end_m"] <= cursor:
+            continue
+        if booking["start_m"] >= end_m:
+            break
+        if booking["start_m"] > cursor:
+            runs.append((cursor, booking["start_m"]))
+        cursor = max(cursor, booking["end_m"])
+    if cursor < end_m:
+        runs.append((cursor, end_m))
+    return runs
+
+
+def freed_runs(
+    before: List[Dict[str, int]], after: List[Dict[str, int]], start_m: int, end_m: int, min_len: int = MIN_BLOCK_MIN
+) -> List[Tuple[int, int]]:
+    """Freie Abschnitte im Fenster, in denen vorher mindestens eine Minute belegt war."""
+    was_busy = busy_minutes(before, start_m, end_m)
+    return [
+        (run_start, run_end)
+        for run_start, run_end in free_runs(after, start_m, end_m)
+        if run_end - run_start >= min_len and any(minute in was_busy for minute in range(run_start, run_end))
+    ]
+
+
+def split_run(run_start: int, run_end: int, max_len: int = MAX_BLOCK_MIN) -> List[Tuple[int, int]]:
+    blocks = []
+    cursor = run_start
+    while cursor < run_end:
+        blocks.append((cursor, min(cursor + max_len, run_end)))
+        cursor += max_len
+    return blocks
+
+
+def rank_freed_runs(target: "WatchTarget", previous: Occupancy, current: Occupancy) -> List[Tuple[str, Tuple[int, int]]]:
+    """Alle freigewordenen Abschnitte der Zielräume, bester Matrix-Score ab Abschnittsbeginn zuerst.
+
+    Die Matrix wird pro Tick einmal auf der aktuellen Belegung gebaut; bei gleichem Score bleibt
+    die Reihenfolge der Wunschräume.
+    """
+    runs = [
+        (room, run)
+        for room in target.rooms
+        for run in freed_runs(previous.get(room, []), current.get(room, []), target.start_m, target.end_m)
+    ]
+    if not runs:
+        return []
+    matrix = ScoreMatrix(
+        {room: current.get(room, []) for room in target.rooms},
+        target.start_m,
+        target.end_m,
+        extra_minutes=[run[0] for _, run in runs],
+    )
+    return sorted(runs, key=lambda item: -matrix.score(item[0], item[1][0]))
+
+
+@dataclass
+class WatchTarget:
+    job_id: str
+    date: str
+    start_m: int
+    end_m: int
+    rooms: List[str]
+    room_ids: Dict[str, str]
+    accounts: List[Account] = field(default_factory=list)
+
+
+class CancellationHistory:
+    """Stornos und Polls pro Stunde, daraus die erwartete Storno-Rate pro Poll."""
+
+    def __init__(self, path: Path = CANCELLATION_STATS_FILE) -> None:
+        self.path = path
+        self.data: Dict[str, Dict[str, int]] = {"cancellations": {}, "polls": {}}
+        if path.exists():
+            try:
+                loaded = json.loads(path.read_text(encoding="utf-8"))
+                if isinstance(loaded, dict):
+                    self.data.update(loaded)
+            except json.JSONDecodeError:
+                pass
+
+    def record(self, hour: int, cancellations: int) -> None:
+        key = str(hour)
+        self.data["polls"][key] = self.data["polls"].get(key, 0) + 1
+        if cancellations:
+            self.data["cancellations"][key] = self.data["cancellations"].get(key, 0) + cancellations
+        try:
+            self.path.write_text(json.dumps(self.data), encoding="utf-8")
+        except OSError:
+            pass
+
+    def rate(self, hour: int) -> float:
+        key = str(hour)
+        polls = self.data["polls"].get(key, 0)
+        return self.data["cancellations"].get(key, 0) / polls if polls else 0.0
+
+
+@dataclass
+class PollPolicy:
+    base_s: float = float(os.environ.get("ROOMBOOKER_WATCH_BASE_S", "60"))
+    min_s: float = 10.0
+    max_s: float = 600.0
+    quiet_hours: Tuple[int, int] = (0, 6)
+    busy_hours: Tuple[int, int] = (7, 19)
+
+    def interval(self, now: datetime, history: CancellationHistory) -> float:
+        if self.quiet_hours[0] <= now.hour < self.quiet_hours[1]:
+            return self.max_s
+        interval = self.base_s
+        if not self.busy_hours[0] <= now.hour < self.busy_hours[1]:
+            interval *= 3
+        # Häufige Stornos in dieser Stunde -> öfter nachsehen
+        interval /= 1.0 + 10.0 * history.rate(now.hour)
+        return min(self.max_s, max(self.min_s, interval))
+
+
+class CancellationWatcher:
+    """Pollt den Kalender der Zieltage und bucht freigewordene Abschnitte sofort über die Engine."""
+
+    def __init__(
+        self,
+        logger,
+        engine=None,
+        scanner: Optional[HttpCalendarScanner] = None,
+        cache: Optional[AvailabilityCache] = None,
+        policy: Optional[PollPolicy] = None,
+        history: Optional[CancellationHistory] = None,
+        simulation_mode: bool = True,
+        summary: str = "Lernen",
+    ) -> None:
+        self.logger = logger
+        self.engine = engine
+        self.scanner = scanner or HttpCalendarScanner(logger)
+        self.cache = cache or AvailabilityCache(logger)
+        self.policy = policy or PollPolicy()
+        self.history = history or CancellationHistory()
+        self.simulation_mode = simulation_mode
+        self.summary = summary
+        self._last: Dict[str, Occupancy] = {}
+
+    def _get_engine(self):
+        if self.engine is None:
+            from roombooker.booking_engine import BookingEngine
+
+            self.engine = BookingEngine(self.logger)
+        return self.engine
+
+    def _poll_day(self, date_str: str) -> Occupancy:
+        occupancy = self.scanner.scan_day(date_str)
+        self.cache.put(AvailabilitySnapshot(date_str, fetched_at=time.time(), rooms=occupancy))
+        return occupancy
+
+    def book_run(self, target: WatchTarget, room: str, run: Tuple[int, int]) -> List[Dict[str, object]]:
+        tasks = [
+            {"date": target.date, "start": m2t(start), "end": m2t(end), "all_rooms": target.room_ids}
+            for start, end in split_run(*run)
+        ]
+        self.logger.log(f"Storno erkannt: {room} {m2t(run[0])}-{m2t(run[1])} am {target.date} -> buche sofort.")
+        return self._get_engine().execute_booking(
+            tasks, target.accounts, [room], self.simulation_mode, self.summary
+        )
+
+    def poll_once(self, targets: List[WatchTarget]) -> Dict[str, List[Dict[str, object]]]:
+        booked: Dict[str, List[Dict[str, object]]] = {}
+        cancellations = 0
+        for date_str in sorted({target.date for target in targets}):
+            try:
+                current = self._poll_day(date_str)
+            except Exception as exc:
+                self.logger.log(f"Watcher: Kalender {date_str} nicht lesbar: {exc}")
+                continue
+            previous = self._last.get(date_str)
+            self._last[date_str] = current
+            if previous is None:
+                continue
+            for target in (t for t in targets if t.date == date_str and t.job_id not in booked):
+                candidates = rank_freed_runs(target, previous, current)
+                cancellations += len(candidates)
+                for room, run in candidates:
+                    successes = self.book_run(target, room, run)
+                    if successes:
+                        booked[target.job_id] = successes
+                        break
+        self.history.record(datetime.now().hour, cancellations)
+        return booked
+
+    def run(
+        self,
+        load_targets: Callable[[], List[WatchTarget]],
+        on_booked: Optional[Callable[[str, List[Dict[str, object]]], None]] = None,
+        stop: Optional[Callable[[], bool]] = None,
+    ) -> None:
+        self.logger.log("--- WATCHER START ---")
+        while not (stop and stop()):
+            targets = load_targets()
+            if targets:
+                for job_id, successes in self.poll_once(targets).items():
+                    if on_booked is not None:
+                        on_booked(job_id, successes)
+            interval = self.policy.interval(datetime.now(), self.history)
+            time.sleep(interval)
+        self.logger.log("--- WATCHER ENDE ---")
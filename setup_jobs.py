@@ -1,10 +1,9 @@
 import json
-import random
 import sys
-from pathlib import Path
 from roombooker.server_logger import ServerLogger
 from roombooker.storage import load_accounts, resolve_data_dir
 from roombooker.browser import BookingWorker
+from roombooker.room_catalog import SOURCE_HARDCODED, RoomCatalog
 
 # --- DEINE WUNSCHLISTE ---
 # Das System sucht nach diesen Texten in den Raumnamen
@@ -21,21 +20,25 @@ def main():
         print("❌ Keine Accounts gefunden.")
         sys.exit(1)
 
-    print(f"--- Schritt 1: Scanne Räume mit {accs[0].email} ---")
-    worker = BookingWorker(logger)
-    worker.show_browser = False # Headless
+    print(f"--- Schritt 1: Raumkatalog prüfen ({accs[0].email}) ---")
+    catalog = RoomCatalog(logger, rooms_path=data_dir / "rooms.json")
+    if catalog.is_stale():
+        worker = BookingWorker(logger)
+        worker.show_browser = False # Headless
+        # Erst über die gespeicherte Session, Browser-Login nur falls nötig
+        catalog.refresh(accs, fallback=worker.update_room_list)
+    rooms_map = catalog.rooms()
     
-    # Scan durchführen
-    rooms_map = worker.update_room_list(accs[0].email, accs[0].password)
-    
-    if not rooms_map:
+    # Eingebaute Beispielräume sind keine echte Liste -> Jobs darauf wären wertlos
+    if not rooms_map or catalog.source == SOURCE_HARDCODED:
         print("❌ Scan fehlgeschlagen. Bitte Login/Passwort prüfen.")
         sys.exit(1)
-        
-    # Räume speichern (für Referenz)
-    rooms_file = data_dir / "rooms.json"
-    rooms_file.write_text(json.dumps(rooms_map, indent=2))
-    print(f"✅ Scan erfolgreich! {len(rooms_map)} Räume gespeichert.")
+    if catalog.is_fallback:
+        print(f"⚠️ Scan fehlgeschlagen, nutze gespeicherte Raumliste ({catalog.source}, {len(rooms_map)} Räume).")
+    elif catalog.is_stale():
+        print(f"⚠️ Scan fehlgeschlagen, Raumkatalog ist {catalog.age() / 3600:.1f} h alt.")
+    else:
+        print(f"✅ Raumkatalog: {len(rooms_map)} Räume ({catalog.age() / 3600:.1f} h alt).")
 
     # 2. Wunschliste abgleichen
     print("\n--- Schritt 2: Erstelle smarte Job-Liste ---")
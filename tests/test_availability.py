@@ -0,0 +1,48 @@
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+from roombooker.availability import AvailabilityCache, AvailabilitySnapshot
+
+
+class TestAvailabilityCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = AvailabilityCache(ttl_s=60, path=Path(self.tmp.name) / "availability.json")
+        self.calls = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def scan(self, date_str):
+        self.calls.append(date_str)
+        return {"D-204": [{"start_m": 690, "end_m": 780}]}
+
+    def test_one_scan_per_day(self):
+        first = self.cache.get_or_scan("20.10.2026", self.scan)
+        second = self.cache.get_or_scan("20.10.2026", self.scan)
+        self.assertEqual(self.calls, ["20.10.2026"])
+        self.assertEqual(first.rooms, second.rooms)
+
+    def test_invalidate_after_booking(self):
+        self.cache.get_or_scan("20.10.2026", self.scan)
+        self.cache.invalidate_slots([{"start": datetime(2026, 10, 20, 8, 0), "room": "D-204"}])
+        self.assertIsNone(self.cache.get("20.10.2026"))
+        self.cache.get_or_scan("20.10.2026", self.scan)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_free_first_matches_full_room_names(self):
+        snapshot = self.cache.get_or_scan("20.10.2026", self.scan)
+        rooms = ["vonRoll: D-204", "vonRoll: D-206"]
+        self.assertEqual(snapshot.free_first(rooms, "11:00", "12:00"), ["vonRoll: D-206", "vonRoll: D-204"])
+        self.assertTrue(snapshot.is_free("vonRoll: D-204", 600, 690))
+
+    def test_short_code_matches_whole_word_only(self):
+        snapshot = AvailabilitySnapshot("20.10.2026", rooms={"D-20": [{"start_m": 600, "end_m": 700}]})
+        self.assertEqual(snapshot.bookings_for("vonRoll: D-204"), [])
+        self.assertEqual(len(snapshot.bookings_for("vonRoll: D-20 (Lounge)")), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+from roombooker.calendar_http import CalendarLayoutChanged, EventPayloadParser, check_calendar, parse_calendar_html
+
+CALENDAR_HTML = """
+<html><body><svg>
+  <rect class="slot"></rect>
+  <rect data-event-event-value="{&quot;roomName&quot;:&quot;D-204&quot;,&quot;start&quot;:&quot;2026-10-20T11:30:00&quot;,&quot;end&quot;:&quot;2026-10-20T13:00:00&quot;}"/>
+  <rect data-event-event-value='{"roomName":"D-204","start":"2026-10-20T08:00:00","end":"2026-10-20T09:00:00"}'></rect>
+  <rect data-event-event-value='{"roomName":"A-231","start":"2026-10-20T22:00:00","end":"2026-10-21T00:00:00"}'></rect>
+  <rect data-event-event-value='kaputt'></rect>
+</svg></body></html>
+"""
+
+
+class TestCalendarParser(unittest.TestCase):
+    def test_extracts_sorted_intervals(self):
+        rooms = parse_calendar_html(CALENDAR_HTML)
+        self.assertEqual(
+            rooms["D-204"],
+            [{"start_m": 480, "end_m": 540}, {"start_m": 690, "end_m": 780}],
+        )
+
+    def test_event_ending_at_midnight(self):
+        rooms = parse_calendar_html(CALENDAR_HTML)
+        self.assertEqual(rooms["A-231"], [{"start_m": 1320, "end_m": 1440}])
+        self.assertEqual(set(rooms), {"D-204", "A-231"})
+
+    def parse(self, html):
+        parser = EventPayloadParser()
+        parser.feed(html)
+        parser.close()
+        return parser
+
+    def test_empty_grid_is_a_free_day(self):
+        self.parse('<div class="timeline"><svg></svg></div>').check_calendar()
+
+    def test_page_without_grid_is_rejected(self):
+        with self.assertRaises(CalendarLayoutChanged):
+            self.parse("<html><body><p>Wartungsarbeiten</p></body></html>").check_calendar()
+
+    def test_login_page_is_rejected(self):
+        with self.assertRaises(CalendarLayoutChanged):
+            self.parse('<svg></svg><form><input id="username"></form>').check_calendar()
+
+    def test_login_redirect_is_rejected_even_with_grid(self):
+        with self.assertRaises(CalendarLayoutChanged):
+            check_calendar("https://login.eduid.ch/idp/profile/SAML2", True, False)
+
+    def test_event_without_room_is_skipped(self):
+        rooms = parse_calendar_html('<svg><rect data-event-event-value=\'{"start":"2026-10-20T08:00:00","end":"2026-10-20T09:00:00"}\'/></svg>')
+        self.assertEqual(rooms, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
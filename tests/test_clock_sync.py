@@ -0,0 +1,54 @@
+import time
+import unittest
+from unittest import mock
+
+from roombooker.clock_sync import ClockSample, ServerClock, offset_bounds
+
+
+class _Logger:
+    def log(self, msg):
+        pass
+
+
+class TestOffsetBounds(unittest.TestCase):
+    def test_samples_narrow_the_offset(self):
+        # Wahrer Offset: Server geht 2.3 s vor, RTT 40 ms
+        offset = 2.3
+        samples = []
+        for sent in (100.00, 101.35, 102.70, 103.05, 104.60):
+            received = sent + 0.04
+            server_second = float(int(sent + 0.02 + offset))
+            samples.append(ClockSample(server_second, sent, received))
+
+        lo, hi = offset_bounds(samples)
+        self.assertLessEqual(lo, offset)
+        self.assertGreaterEqual(hi, offset)
+        self.assertLess(hi - lo, 0.2)
+
+    def test_contradicting_samples(self):
+        samples = [ClockSample(10.0, 0.0, 0.1), ClockSample(20.0, 0.0, 0.1)]
+        self.assertIsNone(offset_bounds(samples))
+
+
+class TestCalibrateDeadline(unittest.TestCase):
+    def test_deadline_caps_samples(self):
+        clock = ServerClock(_Logger(), samples=8, timeout=0.1)
+        now = time.time()
+        sample = ClockSample(float(int(now)), now, now + 0.01)
+        with mock.patch.object(clock, "_sample", return_value=sample) as probe, \
+                mock.patch("roombooker.clock_sync.time.sleep"):
+            estimate = clock.calibrate(deadline=time.time() + 0.5)
+        # Nach der ersten Probe passt keine Pause von >1 s mehr vor die Deadline
+        self.assertEqual(probe.call_count, 1)
+        self.assertEqual(estimate.samples, 1)
+
+    def test_past_deadline_uses_local_clock(self):
+        clock = ServerClock(_Logger(), samples=8, timeout=0.1)
+        with mock.patch.object(clock, "_sample") as probe:
+            estimate = clock.calibrate(deadline=time.time() - 1)
+        probe.assert_not_called()
+        self.assertEqual(estimate.samples, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import unittest
+import urllib.error
+
+from roombooker.http_engine import FormLayoutChanged, HttpBookingEngine, build_payload, parse_event_form
+from roombooker.models import Account
+
+FORM_HTML = """
+<html><body>
+<form name="search" action="/event"><input name="q" value=""></form>
+<form name="event" method="post" action="/event/add">
+  <select id="event_room" name="event[room]">
+    <option value="">Bitte wählen</option>
+    <option value="1">vonRoll: Gruppenraum 001</option>
+    <option value="2" selected>vonRoll: Gruppenraum 002</option>
+  </select>
+  <input type="text" id="event_startDate" name="event[startDate]" value="">
+  <select id="event_duration" name="event[duration]"><option value="60">60</option></select>
+  <input type="text" id="event_title" name="event[title]">
+  <input type="radio" name="event[purpose]" value="Study" checked>
+  <input type="radio" name="event[purpose]" value="Other">
+  <input type="hidden" id="event__token" name="event[_token]" value="abc123">
+  <button type="submit" id="event_submit" name="event[submit]">Speichern</button>
+</form>
+</body></html>
+"""
+
+
+class TestEventForm(unittest.TestCase):
+    def test_parse_event_form(self):
+        form = parse_event_form(FORM_HTML)
+        self.assertEqual(form.action, "/event/add")
+        self.assertEqual(form.method, "post")
+        self.assertEqual(form.token_name, "event[_token]")
+        self.assertIn(("event[room]", "2"), form.fields)
+        self.assertEqual(form.radios["event[purpose]"], ["Study", "Other"])
+        self.assertEqual(
+            form.options["event[room]"],
+            [("vonRoll: Gruppenraum 001", "1"), ("vonRoll: Gruppenraum 002", "2")],
+        )
+
+    def test_build_payload_overrides_fields(self):
+        form = parse_event_form(FORM_HTML)
+        task = {"date": "02.03.2026", "start": "08:00", "end": "12:00"}
+        payload = dict(build_payload(form, task, "11", "Lernen"))
+        self.assertEqual(payload["event[room]"], "11")
+        self.assertEqual(payload["event[startDate]"], "02.03.2026 08:00")
+        self.assertEqual(payload["event[duration]"], "240")
+        self.assertEqual(payload["event[title]"], "Lernen")
+        self.assertEqual(payload["event[purpose]"], "Other")
+        self.assertEqual(payload["event[_token]"], "abc123")
+        self.assertIn("event[submit]", payload)
+
+    def test_missing_token_is_layout_change(self):
+        html = FORM_HTML.replace('name="event[_token]"', 'name="event[nonce]"')
+        with self.assertRaises(FormLayoutChanged):
+            parse_event_form(html)
+
+
+class _Log:
+    def __init__(self):
+        self.lines = []
+
+    def log(self, message):
+        self.lines.append(message)
+
+
+class _TimeoutSession:
+    def __init__(self):
+        self.form = parse_event_form(FORM_HTML)
+        self.posts = 0
+
+    def request(self, url, pairs=None):
+        self.posts += 1
+        raise TimeoutError("read timed out")
+
+
+class _ExpiredSession(_TimeoutSession):
+    def request(self, url, pairs=None):
+        self.posts += 1
+        return "https://login.example/idp", ""
+
+
+class _RejectingSession(_TimeoutSession):
+    def request(self, url, pairs=None):
+        self.posts += 1
+        raise urllib.error.HTTPError(url, 500, "Server Error", {}, None)
+
+
+class _Fallback:
+    def __init__(self):
+        self.calls = []
+
+    def execute_booking(self, tasks, accounts, rooms, simulation_mode, summary):
+        self.calls.append(rooms)
+        return []
+
+
+class TestUnknownSubmitOutcome(unittest.TestCase):
+    def setUp(self):
+        self.fallback = _Fallback()
+        self.engine = HttpBookingEngine(_Log(), fallback=self.fallback)
+        self.session = _TimeoutSession()
+        self.engine._sessions["a@x"] = self.session
+        self.task = {"date": "20.10.2026", "start": "08:00", "end": "12:00", "all_rooms": {"R1": "1", "R2": "2"}}
+
+    def run_booking(self, booked):
+        self.engine.verify_booked = lambda task, room: booked
+        self.engine.availability.invalidate_slots = lambda slots: None
+        return self.engine.execute_booking([self.task], [Account("a@x")], ["R1", "R2"], False)
+
+    def test_booked_in_calendar_counts_as_success(self):
+        successes = self.run_booking(True)
+        self.assertEqual([slot["room"] for slot in successes], ["R1"])
+        self.assertEqual(self.session.posts, 1)
+        self.assertEqual(self.fallback.calls, [])
+
+    def test_unknown_outcome_is_not_retried(self):
+        self.assertEqual(self.run_booking(None), [])
+        self.assertEqual(self.fallback.calls, [])
+
+    def test_free_in_calendar_falls_back_for_untried_rooms(self):
+        self.run_booking(False)
+        self.assertEqual(self.fallback.calls, [["R2"]])
+
+    def test_expired_session_retries_same_room(self):
+        self.engine._sessions["a@x"] = _ExpiredSession()
+        self.run_booking(None)
+        self.assertEqual(self.fallback.calls, [["R1", "R2"]])
+
+    def test_http_error_is_a_definite_failure(self):
+        session = _RejectingSession()
+        self.engine._sessions["a@x"] = session
+        self.assertEqual(self.run_booking(None), [])
+        # Beide Räume per HTTP versucht, kein Kalender-Check und kein Browser-Fallback
+        self.assertEqual(session.posts, 2)
+        self.assertEqual(self.fallback.calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+
+from roombooker.occupancy import OccupancyIndex
+
+
+class TestOccupancyIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = OccupancyIndex({
+            "D-204": [{"start_m": 690, "end_m": 780}, {"start_m": 900, "end_m": 960}],
+            "A-231": [],
+        })
+
+    def test_free_run(self):
+        self.assertEqual(self.index.free_run("D-204", 480), 210)
+        self.assertEqual(self.index.free_run("D-204", 480, limit=600), 120)
+        self.assertEqual(self.index.free_run("D-204", 700), 0)
+        self.assertEqual(self.index.free_run("A-231", 480, limit=720), 240)
+
+    def test_next_busy_and_unknown_room(self):
+        self.assertEqual(self.index.next_busy("D-204", 780), 900)
+        self.assertEqual(self.index.next_busy("D-204", 960), 1440)
+        self.assertEqual(self.index.next_busy("X-000", 0), 1440)
+
+    def test_interval_queries(self):
+        self.assertTrue(self.index.is_free("D-204", 780, 900))
+        self.assertFalse(self.index.is_free("D-204", 770, 800))
+        self.assertEqual(self.index.busy_minutes("D-204", 600, 1000), 150)
+
+
+if __name__ == "__main__":
+    unittest.main()
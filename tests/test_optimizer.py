@@ -0,0 +1,90 @@
+import unittest
+
+from roombooker.models import Account
+from roombooker.optimizer import AccountLedger, PlannedJob, assign_accounts, optimize_jobs
+
+
+class TestOptimizer(unittest.TestCase):
+    def setUp(self):
+        self.accounts = [Account("a@x"), Account("b@x"), Account("c@x")]
+
+    def test_two_jobs_share_accounts_and_rooms(self):
+        rooms = {"A": [], "B": []}
+        jobs = [
+            PlannedJob("morning", "20.10.2026", 480, 720, rooms),
+            PlannedJob("afternoon", "20.10.2026", 720, 960, rooms),
+        ]
+        plan = optimize_jobs(jobs, self.accounts, daily_cap_min=240)
+        steps = plan.steps["morning"] + plan.steps["afternoon"]
+        self.assertEqual(plan.covered_min, 480)
+        self.assertEqual(len({step["account"] for step in steps}), 2)
+        self.assertTrue(all(minutes <= 240 for minutes in plan.usage.values()))
+
+    def test_existing_reservations_count_against_cap(self):
+        jobs = [PlannedJob("job", "20.10.2026", 480, 720, {"A": []})]
+        rows = [
+            {"account": "a@x", "raw_time": "Di, 20.10.2026 08:00 - 12:00"},
+            {"account": "b@x", "raw_time": "Di, 20.10.2026 13:00 - 16:00"},
+            {"account": "c@x", "raw_time": "Mi, 21.10.2026 08:00 - 12:00"},
+        ]
+        plan = optimize_jobs(jobs, self.accounts, daily_cap_min=240, reservations=rows)
+        self.assertEqual([step["account"] for step in plan.steps["job"]], ["c@x"])
+
+    def test_ledger_truncates_to_remaining_budget(self):
+        ledger = AccountLedger(self.accounts[:1], daily_cap_min=240)
+        ledger.add("20.10.2026", "a@x", 480, 660)
+        self.assertEqual(ledger.remaining("20.10.2026", "a@x"), 60)
+        self.assertFalse(ledger.is_free("20.10.2026", "a@x", 600, 700))
+        self.assertEqual(ledger.usable("21.10.2026"), ["a@x"])
+
+    def test_truncated_tail_goes_to_next_account_or_dropped(self):
+        ledger = AccountLedger(self.accounts[:2], daily_cap_min=240)
+        ledger.add("20.10.2026", "a@x", 480, 600)
+        ledger.add("20.10.2026", "b@x", 480, 660)
+        block = {"room": "A", "start": 720, "end": 960, "duration": 240}
+        assigned, dropped = assign_accounts(ledger, "20.10.2026", [block])
+        self.assertEqual([(s["account"], s["start"], s["end"]) for s in assigned],
+                         [("a@x", 720, 840), ("b@x", 840, 900)])
+        self.assertEqual([(s["start"], s["end"], s["duration"]) for s in dropped], [(900, 960, 60)])
+
+    def test_split_tail_stays_within_job_account_limit(self):
+        # Kein Account hat noch 240 min: der Block wird gekürzt, der Rest darf aber nicht an einen zweiten Account
+        rows = [
+            {"account": "a@x", "raw_time": "Di, 20.10.2026 06:00 - 08:00"},
+            {"account": "b@x", "raw_time": "Di, 20.10.2026 06:00 - 07:00"},
+            {"account": "c@x", "raw_time": "Di, 20.10.2026 06:00 - 08:00"},
+        ]
+        job = PlannedJob("job", "20.10.2026", 480, 720, {"A": []}, max_accounts=1)
+        plan = optimize_jobs([job], self.accounts, daily_cap_min=240, reservations=rows)
+        self.assertEqual([(s["account"], s["start"], s["end"]) for s in plan.steps["job"]], [("b@x", 480, 660)])
+        self.assertEqual([(s["start"], s["end"]) for s in plan.dropped["job"]], [(660, 720)])
+
+    def test_job_only_uses_its_own_accounts(self):
+        rows = [{"account": "a@x", "raw_time": "Di, 20.10.2026 06:00 - 07:00"}]
+        job = PlannedJob("job", "20.10.2026", 480, 720, {"A": []}, max_accounts=1, accounts=["a@x"])
+        plan = optimize_jobs([job], self.accounts, daily_cap_min=240, reservations=rows)
+        self.assertEqual([(s["account"], s["start"], s["end"]) for s in plan.steps["job"]], [("a@x", 480, 660)])
+        self.assertEqual(set(plan.usage), {("20.10.2026", "a@x")})
+
+    def test_policy_picks_from_pareto_front(self):
+        rooms = {
+            "A": [{"start_m": 660, "end_m": 900}],
+            "B": [{"start_m": 0, "end_m": 660}],
+        }
+        default = optimize_jobs([PlannedJob("job", "20.10.2026", 480, 840, rooms)], self.accounts)
+        self.assertEqual(default.covered_min, 360)
+        self.assertEqual({step["room"] for step in default.steps["job"]}, {"A", "B"})
+        weights = {"policy": {"policy": "stable", "max_switches": 0}}
+        stable = optimize_jobs([PlannedJob("job", "20.10.2026", 480, 840, rooms, weights=weights)], self.accounts)
+        self.assertEqual([(s["room"], s["start"], s["end"]) for s in stable.steps["job"]], [("B", 660, 840)])
+        self.assertEqual(stable.warnings, [])
+
+    def test_invalid_policy_option_is_reported(self):
+        job = PlannedJob("job", "20.10.2026", 480, 720, {"A": []}, weights={"policy": {"max_switches": "1"}})
+        plan = optimize_jobs([job], self.accounts)
+        self.assertEqual(plan.covered_min, 240)
+        self.assertEqual(len(plan.warnings), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
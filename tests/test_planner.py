@@ -0,0 +1,97 @@
+import unittest
+
+from roombooker.planner import fallback_options, pareto_chains, plan_chain, search_chain, task_blocks
+
+
+class TestPlanChain(unittest.TestCase):
+    def test_covers_range_without_gaps(self):
+        rooms = {
+            "A": [{"start_m": 660, "end_m": 900}],
+            "B": [{"start_m": 0, "end_m": 480}, {"start_m": 720, "end_m": 900}],
+            "C": [{"start_m": 0, "end_m": 660}],
+        }
+        plan = plan_chain(rooms, 480, 840, 2, {"switchBonus": 0, "productiveLossMin": 0})
+        self.assertEqual(plan.covered_min, 360)
+        self.assertEqual(plan.chain[0]["end"], plan.chain[1]["start"])
+        self.assertGreater(plan.states, 0)
+
+    def test_same_room_continues_only_after_full_block(self):
+        rooms = {"A": [], "B": []}
+        plan = plan_chain(rooms, 480, 1080, 3, {"switchBonus": 0, "productiveLossMin": 0})
+        self.assertEqual([(s["room"], s["duration"]) for s in plan.chain], [("A", 240), ("A", 240), ("A", 120)])
+
+    def test_waits_for_a_room_to_free_up(self):
+        rooms = {"A": [{"start_m": 480, "end_m": 600}]}
+        plan = plan_chain(rooms, 480, 720, 1)
+        self.assertEqual([(s["start"], s["end"]) for s in plan.chain], [(600, 720)])
+
+
+class TestSearchChain(unittest.TestCase):
+    ROOMS = {
+        "A": [{"start_m": 600, "end_m": 660}],
+        "B": [{"start_m": 540, "end_m": 570}, {"start_m": 800, "end_m": 900}],
+        "C": [{"start_m": 700, "end_m": 760}],
+        "D": [],
+    }
+
+    def test_matches_exact_planner(self):
+        exact = plan_chain(self.ROOMS, 480, 1080, 3)
+        found = search_chain(self.ROOMS, 480, 1080, 3, budget_ms=5000)
+        self.assertTrue(found.complete)
+        self.assertAlmostEqual(found.score, exact.score)
+
+    def test_zero_budget_returns_first_dive(self):
+        found = search_chain(self.ROOMS, 480, 1080, 3, budget_ms=0)
+        self.assertTrue(found.chain)
+        self.assertGreater(found.score, 0)
+
+
+class TestParetoChains(unittest.TestCase):
+    def test_frontier_trades_coverage_for_switches(self):
+        rooms = {
+            "A": [{"start_m": 660, "end_m": 900}],
+            "B": [{"start_m": 0, "end_m": 660}],
+        }
+        frontier = pareto_chains(rooms, 480, 840, 3)
+        points = {(p.covered_min, p.switches, p.accounts) for p in frontier.plans}
+        self.assertIn((360, 1, 2), points)
+        self.assertIn((180, 0, 1), points)
+        self.assertEqual(frontier.pick().covered_min, 360)
+        self.assertEqual(frontier.pick(max_switches=0).covered_min, 180)
+        self.assertEqual(frontier.pick("lean", min_covered=200).accounts, 2)
+        self.assertEqual(frontier.pick("lean").accounts, 1)
+        self.assertIsNone(frontier.pick(min_covered=400))
+
+
+class TestFallbackOptions(unittest.TestCase):
+    def test_ranked_alternatives_per_block(self):
+        rooms = {
+            "A": [],
+            "B": [{"start_m": 500, "end_m": 520}],
+            "C": [{"start_m": 600, "end_m": 700}],
+            "D": [{"start_m": 0, "end_m": 560}],
+        }
+        chain = [{"room": "A", "start": 480, "end": 720}]
+        options = fallback_options(rooms, chain)[0]
+        self.assertEqual(options[0], [{"room": "A", "start": 480, "end": 720}])
+        self.assertNotIn("B", {part["room"] for option in options if len(option) == 1 for part in option})
+        self.assertIn(
+            [{"room": "C", "start": 480, "end": 600}, {"room": "D", "start": 600, "end": 720}], options
+        )
+
+
+class TestTaskBlocks(unittest.TestCase):
+    def test_fixed_blocks_without_availability(self):
+        self.assertEqual(task_blocks(480, 1080), [(480, 720), (720, 960), (960, 1080)])
+
+    def test_boundaries_follow_free_intervals(self):
+        rooms = {
+            "A": [{"start_m": 690, "end_m": 780}],
+            "B": [{"start_m": 400, "end_m": 560}],
+        }
+        self.assertEqual(task_blocks(480, 720, rooms), [(480, 690), (690, 720)])
+        self.assertEqual(task_blocks(480, 720, {"A": [{"start_m": 400, "end_m": 600}]}), [(600, 720)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+
+from roombooker.models import Account
+from roombooker.prearm import PreArmer
+
+
+class _Logger:
+    def log(self, msg):
+        pass
+
+
+class _FakeEngine:
+    def __init__(self):
+        self.keys = []
+
+    def open_form(self, key, acc):
+        self.keys.append(key)
+        return object()
+
+    def fill_form(self, page, task, room_id, summary):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestPreArmer(unittest.TestCase):
+    def test_each_block_of_one_account_gets_its_own_page(self):
+        engine = _FakeEngine()
+        armer = PreArmer(_Logger(), engine=engine)
+        acc = Account("a@x")
+        task = {"date": "20.10.2026", "all_rooms": {"D-204": "7"}}
+        first = armer.arm([dict(task, start="08:00", end="10:00")], [acc], ["D-204"])
+        second = armer.arm([dict(task, start="10:00", end="12:00")], [acc], ["D-204"])
+        self.assertEqual(len(set(engine.keys)), 2)
+        self.assertIsNot(first[0].page, second[0].page)
+
+
+if __name__ == "__main__":
+    unittest.main()
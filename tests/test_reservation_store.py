@@ -0,0 +1,66 @@
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from roombooker.reservation_store import ReservationStore, parse_start
+
+
+def row(zeit, raum="D-204", titel="Lernen"):
+    return {"Zeit": zeit, "Titel": titel, "Ort": "vonRoll", "Raum": raum}
+
+
+class TestReservationStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = Path(self.tmp.name)
+        self.store = ReservationStore(self.base / "reservations.db")
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_parse_start(self):
+        self.assertEqual(parse_start("Di, 20.10.2026 8:00 - 12:00"), "2026-10-20T08:00")
+
+    def test_sync_only_records_changes(self):
+        now = datetime(2026, 10, 19, 12, 0)
+        first = [row("20.10.2026 08:00 - 12:00"), row("21.10.2026 08:00 - 12:00")]
+        self.assertEqual(self.store.sync_account("a@unibe.ch", first, now)["added"], 2)
+
+        counts = self.store.sync_account("a@unibe.ch", first, now)
+        self.assertEqual(sum(counts.values()), 0)
+
+        counts = self.store.sync_account("a@unibe.ch", [row("20.10.2026 08:00 - 12:00", titel="Prüfung")], now)
+        self.assertEqual((counts["updated"], counts["cancelled"]), (1, 1))
+        statuses = {r["start"]: r["status"] for r in self.store.iter_reservations()}
+        self.assertEqual(statuses, {"2026-10-20T08:00": "active", "2026-10-21T08:00": "cancelled"})
+        self.assertEqual(
+            [h["change"] for h in self.store.iter_history()], ["added", "added", "updated", "cancelled"]
+        )
+
+    def test_exports_are_incremental(self):
+        self.store.sync_account("a@unibe.ch", [row("20.10.2026 08:00 - 12:00")])
+        csv_path, jsonl_path = self.base / "export.csv", self.base / "changes.jsonl"
+        self.assertTrue(self.store.export_csv(csv_path))
+        self.assertFalse(self.store.export_csv(csv_path))
+        self.assertEqual(self.store.export_changes_jsonl(jsonl_path), 1)
+        self.assertEqual(self.store.export_changes_jsonl(jsonl_path), 0)
+
+    def test_csv_keeps_fetch_time(self):
+        first = datetime(2026, 10, 19, 12, 0)
+        self.store.sync_account("a@unibe.ch", [row("20.10.2099 08:00 - 12:00")], first)
+        csv_path = self.base / "export.csv"
+        self.assertTrue(self.store.export_csv(csv_path))
+        header, line = csv_path.read_text(encoding="utf-8").splitlines()[:2]
+        self.assertIn("Abgerufen_am", header.split(","))
+        self.assertIn("19.10.2026 12:00", line)
+        # Neuer Abruf ohne Änderungen -> CSV trotzdem neu, sonst bliebe Abgerufen_am stehen
+        history = self.store.last_history_id()
+        self.store.sync_account("a@unibe.ch", [row("20.10.2099 08:00 - 12:00")], datetime.now() + timedelta(hours=1))
+        self.assertEqual(self.store.last_history_id(), history)
+        self.assertTrue(self.store.export_csv(csv_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
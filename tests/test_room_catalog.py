@@ -0,0 +1,48 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from roombooker.room_catalog import SOURCE_HARDCODED, RoomCatalog
+from roombooker.storage import RoomStore
+
+
+class TestRoomCatalog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        base = Path(self.tmp.name)
+        self.catalog = RoomCatalog(path=base / "room_catalog.json", rooms_path=base / "rooms.json")
+        self.saved = []
+        self._save = RoomStore.save
+        RoomStore.save = staticmethod(self.saved.append)
+
+    def tearDown(self):
+        RoomStore.save = self._save
+        self.tmp.cleanup()
+
+    def test_rewrites_rooms_only_on_change(self):
+        rooms = {"vonRoll: D-204": "7", "vonRoll: A-231": "12"}
+        self.assertTrue(self.catalog.update(rooms))
+        self.assertFalse(self.catalog.update(dict(reversed(list(rooms.items())))))
+        self.assertEqual(len(self.saved), 1)
+        self.assertTrue(self.catalog.update({**rooms, "vonRoll: D-206": "8"}))
+        self.assertEqual(len(self.saved), 2)
+
+    def test_resolve_short_names(self):
+        self.catalog.update({"vonRoll: D-204": "7", "vonRoll: A-231": "12"})
+        self.assertEqual(self.catalog.resolve(["A-231", "X-999"]), {"A-231": "12"})
+        self.assertFalse(self.catalog.is_stale())
+        self.assertFalse(self.catalog.is_fallback)
+
+    def test_reports_hardcoded_fallback(self):
+        load = RoomStore.load
+        RoomStore.load = staticmethod(dict)
+        try:
+            self.assertTrue(self.catalog.rooms())
+        finally:
+            RoomStore.load = load
+        self.assertEqual(self.catalog.source, SOURCE_HARDCODED)
+        self.assertTrue(self.catalog.is_fallback)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+
+from roombooker.planner import PlanContext
+from roombooker.scoring import ScoreMatrix
+
+
+class TestScoreMatrix(unittest.TestCase):
+    def setUp(self):
+        self.matrix = ScoreMatrix(
+            {"A": [{"start_m": 600, "end_m": 660}], "B": [{"start_m": 480, "end_m": 700}]},
+            480, 840, {"totalCoveredMin": 1.0, "switchBonus": 0.0, "productiveLossMin": 0.0, "stabilityBonus": 5.0},
+            extra_minutes=[700],
+        )
+
+    def test_durations_on_grid_and_extra_minutes(self):
+        self.assertEqual(len(self.matrix.slots), 24)
+        self.assertEqual(len(self.matrix.columns), 25)
+        self.assertEqual(self.matrix.block("A", 480), 120)
+        self.assertEqual(self.matrix.block("A", 660), 180)
+        self.assertEqual(self.matrix.block("B", 700), 140)
+        # Minute ohne Spalte -> direkt aus dem Index
+        self.assertEqual(self.matrix.block("B", 705), 135)
+        self.assertEqual(self.matrix.block("X", 480), 0)
+
+    def test_scores_and_ranking(self):
+        self.assertEqual(self.matrix.score("A", 585), 0.0)  # nur 15 min frei
+        self.assertEqual(self.matrix.score("B", 720, last_room="B"), 125.0)
+        self.assertEqual([room for room, _ in self.matrix.ranked(720)], ["A", "B"])
+        self.assertEqual(self.matrix.rooms_at(600), [])
+        self.assertEqual(self.matrix.wait[self.matrix.column(600)], self.matrix.weights["waitPenalty"])
+        self.assertEqual(self.matrix.best_block(480), 120)
+
+    def test_planner_columns_keep_exact_free_starts(self):
+        ctx = PlanContext.build({"A": [{"start_m": 480, "end_m": 517}]}, 470, 840)
+        self.assertGreaterEqual(ctx.matrix.column(517), 0)
+        self.assertEqual(ctx.block_end("A", 517), 757)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+
+from roombooker.watcher import WatchTarget, free_runs, freed_runs, rank_freed_runs, split_run
+
+
+class TestFreedRuns(unittest.TestCase):
+    def test_free_runs_in_window(self):
+        bookings = [{"start_m": 540, "end_m": 600}, {"start_m": 660, "end_m": 720}]
+        self.assertEqual(free_runs(bookings, 480, 780), [(480, 540), (600, 660), (720, 780)])
+
+    def test_cancellation_extends_to_adjacent_free_time(self):
+        before = [{"start_m": 540, "end_m": 600}, {"start_m": 660, "end_m": 720}]
+        after = [{"start_m": 660, "end_m": 720}]
+        # 09:00-10:00 storniert, 08:00-09:00 war schon frei -> ganzer Abschnitt buchbar
+        self.assertEqual(freed_runs(before, after, 480, 780), [(480, 660)])
+
+    def test_unchanged_day_frees_nothing(self):
+        bookings = [{"start_m": 540, "end_m": 600}]
+        self.assertEqual(freed_runs(bookings, bookings, 480, 780), [])
+
+    def test_split_run_respects_block_limit(self):
+        self.assertEqual(split_run(480, 900), [(480, 720), (720, 900)])
+
+    def test_longest_bookable_run_first(self):
+        target = WatchTarget("job", "20.10.2026", 480, 900, ["A", "B"], {})
+        previous = {"A": [{"start_m": 480, "end_m": 900}], "B": [{"start_m": 480, "end_m": 900}]}
+        current = {"A": [{"start_m": 540, "end_m": 900}], "B": [{"start_m": 720, "end_m": 900}]}
+        ranked = rank_freed_runs(target, previous, current)
+        self.assertEqual(ranked, [("B", (480, 720)), ("A", (480, 540))])
+
+
+if __name__ == "__main__":
+    unittest.main()